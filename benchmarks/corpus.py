@@ -0,0 +1,96 @@
+"""
+Gerador de corpus sintético e reprodutível para benchmarks.
+
+Cada chunk pertence a um tópico (distribuição de Zipf) e é formado majoritariamente por
+palavras do vocabulário desse tópico, mais palavras gerais e identificadores (códigos de
+erro), o que dá à busca vetorial e à BM25 algo realista para encontrar. A mesma semente
+gera sempre o mesmo corpus, em blocos, sem manter tudo em memória.
+"""
+
+import numpy as np
+
+_SYLLABLES = [
+    "ba", "ca", "da", "fe", "ge", "lo", "ma", "ne", "pi", "ra", "sa", "te", "vo", "xi",
+    "zu", "tra", "pro", "gen", "mor", "sul", "cri", "den", "lis", "por", "quen", "ser",
+]  # fmt: skip
+
+
+def _vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        n = int(rng.integers(2, 5))
+        words.add("".join(rng.choice(_SYLLABLES, n)))
+    return sorted(words)
+
+
+class SyntheticCorpus:
+    """Deterministic topic-structured text chunks.
+
+    Args:
+        topics: Number of topics
+        words_per_topic: Topic-specific vocabulary size
+        general_words: Vocabulary shared by every topic
+        chunk_words: Words per chunk
+        seed: Random seed (same seed, same corpus)
+    """
+
+    BLOCK = 10_000
+
+    def __init__(self, topics=200, words_per_topic=40, general_words=2000, chunk_words=120, seed=0):
+        self.seed = seed
+        self.chunk_words = chunk_words
+        rng = np.random.default_rng(seed)
+        vocab = _vocabulary(topics * words_per_topic + general_words, rng)
+        rng.shuffle(vocab)
+        self.general = np.array(vocab[:general_words])
+        self.topic_words = np.array(vocab[general_words:]).reshape(topics, words_per_topic)
+        weights = 1.0 / np.arange(1, topics + 1)
+        self.topic_p = weights / weights.sum()
+
+    def _block(self, block, count):
+        rng = np.random.default_rng([self.seed, block])
+        topics = rng.choice(len(self.topic_words), size=count, p=self.topic_p)
+        out = []
+        for n, topic in enumerate(topics):
+            own = int(self.chunk_words * 0.6)
+            words = list(rng.choice(self.topic_words[topic], own))
+            words += list(rng.choice(self.general, self.chunk_words - own))
+            rng.shuffle(words)
+            code = f"ERR-{block * self.BLOCK + n:07d}"
+            out.append((int(topic), f"{code} " + " ".join(words) + "."))
+        return out
+
+    def chunks(self, n, batch=1000):
+        """Yield ``(ids, texts, metadatas)`` batches covering the first ``n`` chunks."""
+        ids, texts, metas = [], [], []
+        for block in range((n + self.BLOCK - 1) // self.BLOCK):
+            count = min(self.BLOCK, n - block * self.BLOCK)
+            for n_in_block, (topic, text) in enumerate(self._block(block, count)):
+                i = block * self.BLOCK + n_in_block
+                ids.append(f"c{i}")
+                texts.append(text)
+                metas.append({"source": f"doc_{topic}.txt", "chunk_id": i, "topic": topic})
+                if len(ids) == batch:
+                    yield ids, texts, metas
+                    ids, texts, metas = [], [], []
+        if ids:
+            yield ids, texts, metas
+
+    def queries(self, n, seed=1):
+        """Short questions built from the vocabulary of random topics."""
+        rng = np.random.default_rng([self.seed, seed, 7])
+        topics = rng.choice(len(self.topic_words), size=n, p=self.topic_p)
+        return [
+            "o que diz o documento sobre " + " ".join(rng.choice(self.topic_words[t], 4)) + "?"
+            for t in topics
+        ]
+
+    def document(self, chars):
+        """One long plain-text document of about ``chars`` characters (for chunking)."""
+        parts, total, block = [], 0, 0
+        while total < chars:
+            for _, text in self._block(block, 100):
+                parts.append(text)
+                total += len(text) + 2
+            block += 1
+        return "\n\n".join(parts)[:chars]
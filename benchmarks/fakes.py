@@ -0,0 +1,88 @@
+"""
+Provedores determinísticos para benchmarks offline.
+
+``FakeEmbedding`` produz vetores de "saco de palavras" (média de vetores aleatórios fixos
+por palavra), então textos que compartilham palavras ficam próximos, como em embeddings
+reais. ``FakeLLM`` devolve uma resposta fixa. Ambos simulam a latência de rede/modelo
+com ``time.sleep``, de forma configurável.
+"""
+
+import re
+import time
+import zlib
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class FakeEmbedding:
+    """Deterministic bag-of-words embedding provider with simulated latency.
+
+    Args:
+        dim: Embedding dimension
+        buckets: Word hash buckets (rows of the fixed word-vector table)
+        latency_ms: Fixed cost per ``embed`` call
+        per_item_ms: Additional cost per embedded text
+        seed: Seed of the word-vector table
+    """
+
+    def __init__(self, dim=384, buckets=1 << 15, latency_ms=0.0, per_item_ms=0.0, seed=0):
+        self.dim = dim
+        self.buckets = buckets
+        self.latency_ms = latency_ms
+        self.per_item_ms = per_item_ms
+        rng = np.random.default_rng(seed)
+        self.table = rng.standard_normal((buckets, dim)).astype(np.float32)
+        self.calls = 0
+        self.items = 0
+
+    def _vector(self, text):
+        words = _WORD_RE.findall(text.lower())
+        if not words:
+            return np.zeros(self.dim, dtype=np.float32)
+        rows = [zlib.crc32(w.encode("utf-8")) % self.buckets for w in words]
+        return self.table[rows].mean(axis=0)
+
+    def embed(self, texts):
+        self.calls += 1
+        self.items += len(texts)
+        delay = self.latency_ms + self.per_item_ms * len(texts)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return [self._vector(t).tolist() for t in texts]
+
+
+class FakeLLM:
+    """LLM provider returning a fixed answer after a simulated generation delay.
+
+    Args:
+        latency_ms: Time to first token
+        per_token_ms: Additional time per generated token
+        answer: Text returned (split on whitespace when streaming)
+    """
+
+    def __init__(self, latency_ms=0.0, per_token_ms=0.0, answer=None):
+        self.latency_ms = latency_ms
+        self.per_token_ms = per_token_ms
+        self.text = answer or "Resposta sintética baseada no contexto [chunk_id=0]."
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def answer(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        delay = self.latency_ms + self.per_token_ms * len(self.text.split())
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return self.text
+
+    def stream(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        for word in self.text.split():
+            if self.per_token_ms > 0:
+                time.sleep(self.per_token_ms / 1000.0)
+            yield word + " "
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de cold start: tempo de import do pacote rag_agent (estilo ``python -X importtime``).
+
+Cada cenário roda em interpretadores novos com ``-X importtime``, após uma rodada de
+aquecimento que grava os ``.pyc``. O custo é a soma do tempo cumulativo dos imports de
+topo feitos pelo cenário (a inicialização do próprio Python, medida em um processo vazio,
+é descontada). Também verifica que nenhuma dependência pesada (chromadb, torch, numpy...)
+é carregada só por importar a API. Sai com 1 se algum cenário estourar o orçamento.
+
+Uso:
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --budget-ms 60 --repeat 9 --json importtime.json
+    python benchmarks/importtime.py --top 15  # módulos mais caros de cada cenário
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = str(Path(__file__).parent.parent / "src")
+
+SCENARIOS = {
+    "import": "import rag_agent",
+    "agent": "from rag_agent import RagAgent",
+    "numpy_pipeline": "from rag_agent import NumpyStore, RagAgent, ingest_file",
+    "chroma_pipeline": "from rag_agent import ChromaStore, OpenAIChat, OpenAIEmbedding, RagAgent",
+    "local_providers": "from rag_agent import CrossEncoderReranker, SentenceTransformerEmbedding",
+}
+
+# Loaded only when a store/provider is constructed, never by importing the API
+HEAVY_MODULES = (
+    "chromadb",
+    "numpy",
+    "torch",
+    "sentence_transformers",
+    "openai",
+    "httpx",
+    "pypdf",
+    "tiktoken",
+)
+
+_REPORT_MODULES = "import sys, json; print(json.dumps(sorted(sys.modules)))"
+
+
+def parse_importtime(stderr):
+    """``-X importtime`` lines -> list of ``(module, depth, self_us, cumulative_us)``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:       642 |      14652 |     rag_agent.storage.base"
+        head, cumulative_us, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # two spaces per nesting level
+        rows.append((name.strip(), depth, int(head.split(":")[1]), int(cumulative_us)))
+    return rows
+
+
+def run_once(statement):
+    """Run ``statement`` in a fresh interpreter; return (import rows, loaded modules)."""
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # measure loading .pyc files, not compiling
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{statement}\n{_REPORT_MODULES}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return parse_importtime(proc.stderr), set(json.loads(proc.stdout.splitlines()[-1]))
+
+
+def scenario_cost(rows, startup_modules):
+    """Cumulative microseconds of the top-level imports not done by a bare interpreter."""
+    return sum(cum for name, depth, _, cum in rows if depth == 0 and name not in startup_modules)
+
+
+def measure(statement, repeat, startup_modules, top):
+    run_once(statement)  # warm-up: writes bytecode caches, fills the OS page cache
+    costs, modules, heaviest = [], set(), []
+    for _ in range(repeat):
+        rows, modules = run_once(statement)
+        costs.append(scenario_cost(rows, startup_modules))
+        heaviest = sorted(
+            ((name, self_us) for name, _, self_us, _ in rows if name not in startup_modules),
+            key=lambda r: -r[1],
+        )[:top]
+    heavy = sorted(
+        m for m in HEAVY_MODULES if m in modules or any(k.startswith(m + ".") for k in modules)
+    )
+    return {
+        "statement": statement,
+        "median_ms": round(statistics.median(costs) / 1000, 2),
+        "min_ms": round(min(costs) / 1000, 2),
+        "modules": len(modules),
+        "heavy_modules": heavy,
+        "heaviest": [{"module": n, "self_ms": round(us / 1000, 2)} for n, us in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=5, help="Processos por cenário")
+    parser.add_argument(
+        "--budget-ms", type=float, default=100.0, help="Mediana máxima tolerada por cenário"
+    )
+    parser.add_argument("--top", type=int, default=0, help="Lista os N módulos mais caros")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    startup_rows, startup_modules = run_once("pass")
+    startup_modules |= {name for name, *_ in startup_rows}
+
+    results, failed = {}, False
+    print(f"{'cenário':<18} {'mediana':>9} {'mínimo':>9} {'módulos':>8}  status")
+    for key, statement in SCENARIOS.items():
+        res = measure(statement, max(args.repeat, 1), startup_modules, args.top)
+        results[key] = res
+        problems = []
+        if res["median_ms"] > args.budget_ms:
+            problems.append(f"acima do orçamento de {args.budget_ms:g} ms")
+        if res["heavy_modules"]:
+            problems.append("carregou " + ", ".join(res["heavy_modules"]))
+        failed |= bool(problems)
+        status = "; ".join(problems) or "ok"
+        print(
+            f"{key:<18} {res['median_ms']:>7.2f}ms {res['min_ms']:>7.2f}ms "
+            f"{res['modules']:>8}  {status}"
+        )
+        for row in res["heaviest"]:
+            print(f"    {row['self_ms']:>7.2f}ms  {row['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"budget_ms": args.budget_ms, "results": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
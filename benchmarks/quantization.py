@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de quantização do NumpyStore: memória economizada vs. recall@k perdido.
+
+Gera um corpus sintético de embeddings agrupados (clusters), indexa o mesmo corpus em
+cada modo de armazenamento e compara os top-k com a busca exata em float32.
+
+Uso:
+    python benchmarks/quantization.py --docs 100000 --dim 384 --queries 200 --k 10
+    python benchmarks/quantization.py --json resultados.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for local imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from rag_agent import NumpyStore
+
+MODES = [
+    {"dtype": "float32"},
+    {"dtype": "float16"},
+    {"dtype": "int8", "scale": "vector"},
+    {"dtype": "int8", "scale": "dimension"},
+    {"dtype": "int8", "scale": "vector", "rescore": 4},
+    {"dtype": "int8", "scale": "dimension", "rescore": 4},
+]
+
+
+class TableEmbedding:
+    """Embedding provider that looks texts up in a precomputed table."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def embed(self, texts):
+        return [self.table[t] for t in texts]
+
+
+def synthetic_corpus(n_docs, n_queries, dim, clusters, seed):
+    """Clustered Gaussian embeddings, closer to real text embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    docs = centers[rng.integers(0, clusters, n_docs)]
+    docs = docs + 0.5 * rng.standard_normal((n_docs, dim)).astype(np.float32)
+    queries = centers[rng.integers(0, clusters, n_queries)]
+    queries = queries + 0.5 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    return docs, queries
+
+
+def label(mode):
+    name = mode["dtype"]
+    if "scale" in mode:
+        name += f"/{mode['scale']}"
+    if mode.get("rescore"):
+        name += f"+rescore{mode['rescore']}"
+    return name
+
+
+def build(mode, table, n_docs, persist_dir, batch):
+    store = NumpyStore(
+        f"bench_{len(list(Path(persist_dir).iterdir()))}",
+        TableEmbedding(table),
+        persist_dir=persist_dir,
+        initial_capacity=n_docs,
+        **mode,
+    )
+    for start in range(0, n_docs, batch):
+        ids = [f"d{i}" for i in range(start, min(start + batch, n_docs))]
+        store.upsert(ids, [{"chunk_id": i} for i in range(len(ids))], ids)
+    return store
+
+
+def run(args):
+    docs, queries = synthetic_corpus(args.docs, args.queries, args.dim, args.clusters, args.seed)
+    table = {f"d{i}": v for i, v in enumerate(docs)}
+    table.update({f"q{i}": v for i, v in enumerate(queries)})
+    query_texts = [f"q{i}" for i in range(args.queries)]
+
+    results = []
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode in MODES:
+            store = build(mode, table, args.docs, tmpdir, args.batch)
+            t0 = time.perf_counter()
+            found = [set(d) for d, _, _ in store.query_many(query_texts, k=args.k)]
+            elapsed = time.perf_counter() - t0
+            stats = store.stats()
+            if baseline is None:
+                baseline = {"found": found, "bytes": stats["index_bytes"]}
+            recall = sum(len(f & b) for f, b in zip(found, baseline["found"])) / (
+                args.k * args.queries
+            )
+            results.append(
+                {
+                    "mode": label(mode),
+                    "index_mb": round(stats["index_bytes"] / 2**20, 2),
+                    "full_mb_on_disk": round(stats["full_bytes"] / 2**20, 2),
+                    "memory_saved": round(1 - stats["index_bytes"] / baseline["bytes"], 4),
+                    f"recall@{args.k}": round(recall, 4),
+                    "ms_per_query": round(elapsed * 1000 / args.queries, 3),
+                }
+            )
+            store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    header = list(results[0])
+    print(" | ".join(f"{h:>16}" for h in header))
+    for row in results:
+        print(" | ".join(f"{str(row[h]):>16}" for h in header))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput do servidor HTTP (RagServer) com provedores falsos.
+
+Sobe um ``RagServer`` local sobre um ``NumpyStore`` com o corpus sintético e dispara
+``--clients`` clientes concorrentes (conexões keep-alive) contra ``/ask`` ou
+``/ask/stream`` por ``--duration`` segundos. Reporta respostas/s, latência p50/p95/p99
+por status e quantas requisições foram recusadas (429/503) pelo controle de admissão.
+
+Uso:
+    python benchmarks/server.py --clients 16 --max-inflight 8 --llm-latency-ms 50
+    python benchmarks/server.py --clients 64 --max-queue 8 --queue-timeout 0.2 --stream
+    python benchmarks/server.py --size 100k --duration 20 --json servidor.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path for local imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from corpus import SyntheticCorpus  # noqa: E402
+from fakes import FakeEmbedding, FakeLLM  # noqa: E402
+from suite import environment, parse_size, print_table, quiet_logs, summarize  # noqa: E402
+
+from rag_agent import NumpyStore, RagAgent  # noqa: E402
+from rag_agent.server import RagServer  # noqa: E402
+
+
+def client(address, path, questions, deadline, offset, out):
+    """Send questions back to back on one keep-alive connection until ``deadline``."""
+    conn = http.client.HTTPConnection(*address, timeout=60)
+    i = offset
+    while time.perf_counter() < deadline:
+        body = json.dumps({"question": questions[i % len(questions)]}).encode()
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+            if resp.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            status = 0  # connection error
+        out.append((status, time.perf_counter() - t0))
+        if status in (429, 503):
+            time.sleep(0.001)  # a real client would honour Retry-After
+    conn.close()
+
+
+def run(args):
+    corpus = SyntheticCorpus(seed=args.seed)
+    questions = corpus.queries(1000, seed=args.seed + 1)
+    size = parse_size(args.size)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = NumpyStore(
+            "bench_server",
+            FakeEmbedding(dim=args.dim, latency_ms=args.embed_latency_ms),
+            persist_dir=os.path.join(tmpdir, "db"),
+        )
+        for ids, texts, metas in corpus.chunks(size, batch=1000):
+            store.upsert(texts, metas, ids)
+        llm = FakeLLM(latency_ms=args.llm_latency_ms, per_token_ms=args.llm_per_token_ms)
+        agent = RagAgent(store=store, llm=llm, top_k=args.k, distance_threshold=2.0)
+        with quiet_logs():  # the agent logs every answer; keep that I/O out of the latencies
+            server = RagServer(
+                agent,
+                port=0,
+                max_inflight=args.max_inflight,
+                max_queue=args.max_queue,
+                queue_timeout=args.queue_timeout,
+            ).start()
+            address = server._httpd.server_address[:2]
+            path = "/ask/stream" if args.stream else "/ask"
+            try:
+                outcomes = []
+                deadline = time.perf_counter() + args.duration
+                threads = [
+                    threading.Thread(
+                        target=client, args=(address, path, questions, deadline, n * 997, outcomes)
+                    )
+                    for n in range(args.clients)
+                ]
+                t0 = time.perf_counter()
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - t0
+            finally:
+                server.shutdown(timeout=10)
+
+    rows = []
+    common = {"clients": args.clients, "max_inflight": args.max_inflight}
+    for status in sorted({s for s, _ in outcomes}):
+        latencies = [dt for s, dt in outcomes if s == status]
+        rows.append(
+            summarize(
+                f"{path} {status or 'erro'}",
+                latencies,
+                len(latencies),
+                elapsed,
+                "req/s",
+                **common,
+            )
+        )
+    params = {k: v for k, v in vars(args).items() if k != "json"}
+    return {"environment": environment(), "params": params, "results": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--clients", type=int, default=16, help="Clientes concorrentes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga")
+    parser.add_argument("--max-inflight", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    parser.add_argument("--stream", action="store_true", help="Usa /ask/stream (NDJSON)")
+    parser.add_argument("--size", default="10k", help="Chunks no store (ex.: 10k, 100k)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-per-token-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    columns = ["stage", "count", "throughput", "unit", "p50_ms", "p95_ms", "p99_ms"]
+    print_table(report["results"], columns)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
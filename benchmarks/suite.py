@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks offline: chunking, upsert, query, query_many e ask de ponta a ponta.
+
+Usa provedores falsos determinísticos (latência configurável) e um corpus sintético
+reprodutível, então roda sem rede e sem modelos. Mede throughput e latência
+p50/p95/p99 por etapa, grava JSON e compara com um baseline salvo.
+
+Uso:
+    python benchmarks/suite.py run --sizes 1k,10k --stores numpy,chroma --json atual.json
+    python benchmarks/suite.py run --sizes 100k --llm-latency-ms 300 --baseline base.json
+    python benchmarks/suite.py compare base.json atual.json --tolerance 0.15
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path for local imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from corpus import SyntheticCorpus  # noqa: E402
+from fakes import FakeEmbedding, FakeLLM  # noqa: E402
+
+from rag_agent import (  # noqa: E402
+    AnswerNotFoundError,
+    ChromaStore,
+    NumpyStore,
+    RagAgent,
+    __version__,
+    chunk_text,
+)
+from rag_agent.utils.logging import setup_logger  # noqa: E402
+
+STORES = {"numpy": NumpyStore, "chroma": ChromaStore}
+# Metrics where a higher value is a regression (the rest: lower is a regression)
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def parse_size(text):
+    """``"10k"`` -> 10000, ``"1m"`` -> 1000000."""
+    text = text.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+@contextlib.contextmanager
+def quiet_logs(name="rag"):
+    """Send the library's log records to a ``NullHandler`` so log I/O isn't measured."""
+    logger = setup_logger(name)
+    handlers, propagate = logger.handlers, logger.propagate
+    logger.handlers, logger.propagate = [logging.NullHandler()], False
+    try:
+        yield
+    finally:
+        logger.handlers, logger.propagate = handlers, propagate
+
+
+def summarize(stage, latencies_s, items, elapsed_s, unit, **extra):
+    """One result row: throughput plus latency percentiles (milliseconds)."""
+    lat = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if len(lat) else (0.0, 0.0, 0.0)
+    return {
+        "stage": stage,
+        **extra,
+        "count": len(lat),
+        "throughput": round(items / elapsed_s, 2) if elapsed_s > 0 else None,
+        "unit": unit,
+        "mean_ms": round(float(lat.mean()), 3) if len(lat) else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "total_s": round(elapsed_s, 3),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def bench_chunking(corpus, args):
+    text = corpus.document(args.doc_chars)
+    latencies, chunks = [], 0
+    for _ in range(args.repeat):
+        out, dt = timed(chunk_text, text, max_chars=1200, overlap=120)
+        latencies.append(dt)
+        chunks += len(out)
+    elapsed = sum(latencies)
+    row = summarize("chunk_text", latencies, chunks, elapsed, "chunks/s", store=None, size=None)
+    row["mb_per_s"] = round(len(text) * args.repeat / 2**20 / elapsed, 2)
+    return [row]
+
+
+def bench_store(store_name, size, corpus, queries, args, tmpdir):
+    embedder = FakeEmbedding(
+        dim=args.dim, latency_ms=args.embed_latency_ms, per_item_ms=args.embed_per_item_ms
+    )
+    store_cls = STORES[store_name]
+    store = store_cls(
+        f"bench_{store_name}_{size}",
+        embedder,
+        persist_dir=os.path.join(tmpdir, f"{store_name}_{size}"),
+        hybrid=args.hybrid,
+    )
+    rows = []
+    common = {"store": store_name, "size": size}
+
+    # Upsert
+    latencies, t0 = [], time.perf_counter()
+    for ids, texts, metas in corpus.chunks(size, batch=args.batch):
+        _, dt = timed(store.upsert, texts, metas, ids)
+        latencies.append(dt)
+    if hasattr(store, "flush"):
+        store.flush()
+    rows.append(
+        summarize("upsert", latencies, size, time.perf_counter() - t0, "chunks/s", **common)
+    )
+
+    # Single queries
+    for q in queries[: args.warmup]:
+        store.query(q, k=args.k)
+    latencies, t0 = [], time.perf_counter()
+    for q in queries:
+        _, dt = timed(store.query, q, k=args.k)
+        latencies.append(dt)
+    elapsed = time.perf_counter() - t0
+    rows.append(summarize("query", latencies, len(queries), elapsed, "queries/s", **common))
+
+    # Batched queries
+    latencies, t0 = [], time.perf_counter()
+    for start in range(0, len(queries), args.query_batch):
+        _, dt = timed(store.query_many, queries[start : start + args.query_batch], k=args.k)
+        latencies.append(dt)
+    elapsed = time.perf_counter() - t0
+    rows.append(summarize("query_many", latencies, len(queries), elapsed, "queries/s", **common))
+
+    # End-to-end ask
+    llm = FakeLLM(latency_ms=args.llm_latency_ms, per_token_ms=args.llm_per_token_ms)
+    agent = RagAgent(store=store, llm=llm, top_k=args.k, distance_threshold=2.0)
+    asks = queries[: args.asks]
+    latencies, not_found, t0 = [], 0, time.perf_counter()
+    for q in asks:
+        t1 = time.perf_counter()
+        try:
+            agent.ask(q)
+        except AnswerNotFoundError:
+            not_found += 1
+        latencies.append(time.perf_counter() - t1)
+    elapsed = time.perf_counter() - t0
+    row = summarize("ask", latencies, len(asks), elapsed, "questions/s", **common)
+    row["mean_prompt_chars"] = round(llm.prompt_chars / llm.calls) if llm.calls else 0
+    row["not_found"] = not_found
+    rows.append(row)
+
+    close = getattr(store, "close", None)
+    if callable(close):
+        close()
+    return rows
+
+
+def environment():
+    """Machine and code identification stored alongside the results."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "rag_agent": __version__,
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": int(time.time()),
+    }
+
+
+def run(args):
+    corpus = SyntheticCorpus(seed=args.seed)
+    queries = corpus.queries(args.queries, seed=args.seed + 1)
+    results = bench_chunking(corpus, args)
+    quiet = contextlib.nullcontext() if args.logs else quiet_logs()
+    with tempfile.TemporaryDirectory() as tmpdir, quiet:
+        for size in [parse_size(s) for s in args.sizes.split(",")]:
+            for store_name in args.stores.split(","):
+                results.extend(bench_store(store_name, size, corpus, queries, args, tmpdir))
+    skip = ("func", "json", "baseline", "tolerance", "min_delta_ms", "logs")
+    params = {k: v for k, v in vars(args).items() if k not in skip}
+    return {"environment": environment(), "params": params, "results": results}
+
+
+def print_table(rows, columns):
+    cells = [["-" if r.get(c) is None else str(r[c]) for c in columns] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+    print(" | ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for row in cells:
+        print(" | ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+def _key(row):
+    return (row["stage"], row.get("store"), row.get("size"))
+
+
+def compare(baseline, current, tolerance, min_delta_ms=0.5):
+    """
+    Compare two result files row by row.
+
+    A latency only counts as a regression when it also grew by at least
+    ``min_delta_ms``, so jitter on sub-millisecond stages is not flagged.
+
+    Returns:
+        ``(rows, regressions)``: one row per metric present in both files, and the
+        subset that got worse by more than ``tolerance`` (relative)
+    """
+    base = {_key(r): r for r in baseline["results"]}
+    rows, regressions = [], []
+    for cur in current["results"]:
+        old = base.get(_key(cur))
+        if old is None:
+            continue
+        for metric in ("throughput",) + LATENCY_METRICS:
+            before, after = old.get(metric), cur.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric in LATENCY_METRICS:
+                worse = change > tolerance and after - before >= min_delta_ms
+            else:
+                worse = change < -tolerance
+            row = {
+                "stage": cur["stage"],
+                "store": cur.get("store"),
+                "size": cur.get("size"),
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": f"{change:+.1%}",
+                "status": "REGRESSÃO" if worse else "ok",
+            }
+            rows.append(row)
+            if worse:
+                regressions.append(row)
+    return rows, regressions
+
+
+def report_comparison(baseline, current, tolerance, min_delta_ms):
+    rows, regressions = compare(baseline, current, tolerance, min_delta_ms)
+    print_table(
+        rows, ["stage", "store", "size", "metric", "baseline", "current", "change", "status"]
+    )
+    print(f"\n{len(regressions)} regressão(ões) acima de {tolerance:.0%}.")
+    return 1 if regressions else 0
+
+
+def cmd_run(args):
+    data = run(args)
+    print_table(
+        data["results"],
+        ["stage", "store", "size", "throughput", "unit", "p50_ms", "p95_ms", "p99_ms"],
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    if args.baseline:
+        print()
+        with open(args.baseline, encoding="utf-8") as f:
+            return report_comparison(json.load(f), data, args.tolerance, args.min_delta_ms)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    return report_comparison(baseline, current, args.tolerance, args.min_delta_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Executa os benchmarks")
+    p.add_argument("--sizes", default="1k,10k", help="Tamanhos do corpus (ex.: 1k,10k,100k,1m)")
+    p.add_argument("--stores", default="numpy,chroma", help="Stores: numpy, chroma")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--query-batch", type=int, default=32)
+    p.add_argument("--asks", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=10)
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--batch", type=int, default=256, help="Chunks por upsert")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--hybrid", action="store_true", help="Ativa BM25 + RRF nos stores")
+    p.add_argument("--doc-chars", type=int, default=5_000_000, help="Documento do chunking")
+    p.add_argument("--repeat", type=int, default=5, help="Repetições do chunking")
+    p.add_argument("--embed-latency-ms", type=float, default=0.0)
+    p.add_argument("--embed-per-item-ms", type=float, default=0.0)
+    p.add_argument("--llm-latency-ms", type=float, default=0.0)
+    p.add_argument("--llm-per-token-ms", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--logs", action="store_true", help="Mantém os logs durante as medições")
+    p.add_argument("--json", help="Grava os resultados neste arquivo JSON")
+    p.add_argument("--baseline", help="Compara com este resultado salvo ao final")
+    p.add_argument("--tolerance", type=float, default=0.15)
+    p.add_argument("--min-delta-ms", type=float, default=0.5)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("compare", help="Compara dois resultados salvos")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--tolerance", type=float, default=0.15, help="Piora relativa tolerada")
+    p.add_argument(
+        "--min-delta-ms", type=float, default=0.5, help="Piora absoluta mínima de latência"
+    )
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from typing import Dict, Any
 DEFAULT_EMBEDDING_CONFIG = {
     "openai": {
         "model": "text-embedding-3-small",
+        "max_batch_items": 2048,
+        "max_batch_tokens": 300000,
+        "max_concurrency": 4,
     },
     "sentence_transformers": {
         "model_name": "sentence-transformers/all-MiniLM-L6-v2",
@@ -22,6 +25,12 @@ DEFAULT_LLM_CONFIG = {
         "host": "http://localhost:11434",
         "temperature": 0.0,
         "timeout": 120,
+        "keep_alive": "10m",
+        "num_ctx": None,
+        "max_ctx": 8192,
+        "num_predict": None,
+        "pool_maxsize": 10,
+        "max_retries": 2,
     },
 }
 
@@ -30,6 +39,23 @@ DEFAULT_VECTOR_STORE_CONFIG = {
         "persist_dir": "./chroma_db",
         "collection_name": "rag_documents",
         "distance_metric": "cosine",
+        "query_cache_size": 0,
+        "query_cache_ttl": 30.0,
+        "hybrid": False,
+        "hybrid_candidates": 20,
+        "rrf_k": 60,
+        "bm25_save_interval": 5.0,
+    },
+    "numpy": {
+        "persist_dir": "./numpy_db",
+        "collection_name": "rag_documents",
+        "query_cache_size": 0,
+        "query_cache_ttl": 30.0,
+        "hybrid": False,
+        "initial_capacity": 1024,
+        "dtype": "float32",
+        "scale": "vector",
+        "rescore": 0,
     },
 }
 
@@ -37,18 +63,47 @@ DEFAULT_AGENT_CONFIG = {
     "top_k": 5,
     "max_context_chars": 4000,
     "distance_threshold": 0.35,
+    "context_window": None,
+    "answer_tokens": 512,
+    "rerank_candidates": 20,
+    "rerank_top_n": 3,
+    "rerank_min_score": None,
+    "merge_adjacent": False,
+    "mmr_lambda": None,
+    "mmr_candidates": 20,
+    "mmr_duplicate_threshold": 0.95,
+}
+
+DEFAULT_RERANK_CONFIG = {
+    "cross_encoder": {
+        "model_name": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        "batch_size": 32,
+        "max_length": 512,
+        "device": "cpu",
+    },
 }
 
 DEFAULT_INGESTION_CONFIG = {
     "chunk_size": 1200,
     "chunk_overlap": 120,
     "supported_formats": [".txt", ".md", ".pdf"],
+    "include": ["*.txt", "*.md", "*.pdf"],
+    "exclude": [],
+    "workers": None,
+    "batch_size": 256,
+    "stream_threshold": 32 * 1024 * 1024,
+    "tenant": None,
+    "extra_metadata": {},
 }
 
 DEFAULT_LOGGING_CONFIG = {
     "level": "INFO",
     "format": "json",
     "logger_name": "rag",
+    "queued": False,  # background writer thread (configure_logging(queued=True))
+    "max_queue": 10000,
+    "overflow": "drop",  # "drop" or "block" when the queue is full
+    "sample_rates": {},  # e.g. {"answer_ok": 0.1}
 }
 
 
@@ -59,6 +114,7 @@ def get_default_config() -> Dict[str, Any]:
         "llm": DEFAULT_LLM_CONFIG,
         "vector_store": DEFAULT_VECTOR_STORE_CONFIG,
         "agent": DEFAULT_AGENT_CONFIG,
+        "rerank": DEFAULT_RERANK_CONFIG,
         "ingestion": DEFAULT_INGESTION_CONFIG,
         "logging": DEFAULT_LOGGING_CONFIG,
-    }
\ No newline at end of file
+    }
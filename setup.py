@@ -50,6 +50,7 @@ setup(
         "openai": ["openai"],
         "local": ["sentence-transformers"],
         "pdf": ["pypdf"],
+        "async": ["httpx"],
     },
     entry_points={
         "console_scripts": [
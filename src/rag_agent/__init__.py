@@ -4,27 +4,88 @@ RAG Agent - Retrieval-Augmented Generation Agent
 A strict document-based question answering system using ChromaDB and pluggable providers.
 """
 
-from .core.agent import RagAgent
-from .core.exceptions import (
-    AnswerNotFoundError,
-    EmbeddingError,
-    IndexNotReadyError,
-    IngestionError,
-    LLMError,
-    RagError,
-    RetrievalError,
-)
-from .providers.embeddings import OpenAIEmbedding, SentenceTransformerEmbedding
-from .providers.llm import OllamaChat, OpenAIChat
-from .storage.chroma_store import ChromaStore
-from .utils.ingestion import ingest_file, read_text_from_path
-from .utils.logging import setup_logger
-from .utils.text_processing import chunk_text
+from typing import TYPE_CHECKING
+
+from .utils.lazy import attach
+
+if TYPE_CHECKING:
+    from .core.agent import RagAgent
+    from .core.exceptions import (
+        AnswerNotFoundError,
+        EmbeddingError,
+        IndexNotReadyError,
+        IngestionError,
+        LLMError,
+        RagError,
+        RetrievalError,
+    )
+    from .core.semantic_cache import SemanticAnswerCache
+    from .providers.cached_embedding import CachedEmbedding
+    from .providers.embeddings import OpenAIEmbedding, SentenceTransformerEmbedding
+    from .providers.llm import OllamaChat, OpenAIChat
+    from .providers.registry import ModelRegistry
+    from .providers.rerank import CrossEncoderReranker
+    from .server import RagServer
+    from .storage.chroma_store import ChromaStore
+    from .storage.numpy_store import NumpyStore
+    from .utils.ingestion import (
+        ingest_directory,
+        ingest_file,
+        ingest_many,
+        iter_text_from_path,
+        read_text_from_path,
+        remove_source,
+    )
+    from .utils.logging import configure_logging, setup_logger
+    from .utils.manifest import IngestManifest
+    from .utils.metrics import MetricsRegistry, serve_metrics
+    from .utils.text_processing import chunk_text, iter_chunks
+    from .utils.tracing import JsonLinesTracer, set_tracer
 
 __version__ = "0.1.0"
 
+_EXPORTS = {
+    "RagAgent": ".core.agent",
+    "SemanticAnswerCache": ".core.semantic_cache",
+    "RagError": ".core.exceptions",
+    "IngestionError": ".core.exceptions",
+    "IndexNotReadyError": ".core.exceptions",
+    "RetrievalError": ".core.exceptions",
+    "AnswerNotFoundError": ".core.exceptions",
+    "LLMError": ".core.exceptions",
+    "EmbeddingError": ".core.exceptions",
+    "OpenAIEmbedding": ".providers.embeddings",
+    "SentenceTransformerEmbedding": ".providers.embeddings",
+    "CachedEmbedding": ".providers.cached_embedding",
+    "OpenAIChat": ".providers.llm",
+    "OllamaChat": ".providers.llm",
+    "CrossEncoderReranker": ".providers.rerank",
+    "ModelRegistry": ".providers.registry",
+    "ChromaStore": ".storage.chroma_store",
+    "NumpyStore": ".storage.numpy_store",
+    "RagServer": ".server",
+    "ingest_file": ".utils.ingestion",
+    "ingest_many": ".utils.ingestion",
+    "ingest_directory": ".utils.ingestion",
+    "remove_source": ".utils.ingestion",
+    "IngestManifest": ".utils.manifest",
+    "read_text_from_path": ".utils.ingestion",
+    "iter_text_from_path": ".utils.ingestion",
+    "chunk_text": ".utils.text_processing",
+    "iter_chunks": ".utils.text_processing",
+    "setup_logger": ".utils.logging",
+    "configure_logging": ".utils.logging",
+    "MetricsRegistry": ".utils.metrics",
+    "serve_metrics": ".utils.metrics",
+    "JsonLinesTracer": ".utils.tracing",
+    "set_tracer": ".utils.tracing",
+}
+
+__getattr__, __dir__ = attach(__name__, _EXPORTS)
+
 __all__ = [
     "RagAgent",
+    "SemanticAnswerCache",
     "RagError",
     "IngestionError",
     "IndexNotReadyError",
@@ -34,11 +95,27 @@ __all__ = [
     "EmbeddingError",
     "OpenAIEmbedding",
     "SentenceTransformerEmbedding",
+    "CachedEmbedding",
     "OpenAIChat",
     "OllamaChat",
+    "CrossEncoderReranker",
+    "ModelRegistry",
     "ChromaStore",
+    "NumpyStore",
+    "RagServer",
     "ingest_file",
+    "ingest_many",
+    "ingest_directory",
+    "remove_source",
+    "IngestManifest",
     "read_text_from_path",
+    "iter_text_from_path",
     "chunk_text",
+    "iter_chunks",
     "setup_logger",
+    "configure_logging",
+    "MetricsRegistry",
+    "serve_metrics",
+    "JsonLinesTracer",
+    "set_tracer",
 ]
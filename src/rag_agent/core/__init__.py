@@ -1,16 +1,53 @@
 """Core components of the RAG Agent."""
 
-from .agent import RagAgent
-from .exceptions import (
-    AnswerNotFoundError,
-    EmbeddingError,
-    IndexNotReadyError,
-    IngestionError,
-    LLMError,
-    RagError,
-    RetrievalError,
-)
-from .protocols import EmbeddingProvider, LLMProvider
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import attach
+
+if TYPE_CHECKING:
+    from .agent import RagAgent
+    from .exceptions import (
+        AnswerNotFoundError,
+        EmbeddingError,
+        IndexNotReadyError,
+        IngestionError,
+        LLMError,
+        RagError,
+        RetrievalError,
+    )
+    from .protocols import (
+        AsyncEmbeddingProvider,
+        AsyncLLMProvider,
+        EmbeddingProvider,
+        LLMProvider,
+        Reranker,
+        StreamingLLMProvider,
+        Tokenizer,
+        VectorStore,
+    )
+    from .semantic_cache import SemanticAnswerCache
+
+_EXPORTS = {
+    "RagAgent": ".agent",
+    "RagError": ".exceptions",
+    "IngestionError": ".exceptions",
+    "IndexNotReadyError": ".exceptions",
+    "RetrievalError": ".exceptions",
+    "AnswerNotFoundError": ".exceptions",
+    "LLMError": ".exceptions",
+    "EmbeddingError": ".exceptions",
+    "EmbeddingProvider": ".protocols",
+    "LLMProvider": ".protocols",
+    "AsyncEmbeddingProvider": ".protocols",
+    "AsyncLLMProvider": ".protocols",
+    "StreamingLLMProvider": ".protocols",
+    "Reranker": ".protocols",
+    "Tokenizer": ".protocols",
+    "VectorStore": ".protocols",
+    "SemanticAnswerCache": ".semantic_cache",
+}
+
+__getattr__, __dir__ = attach(__name__, _EXPORTS)
 
 __all__ = [
     "RagAgent",
@@ -23,4 +60,11 @@ __all__ = [
     "EmbeddingError",
     "EmbeddingProvider",
     "LLMProvider",
+    "AsyncEmbeddingProvider",
+    "AsyncLLMProvider",
+    "StreamingLLMProvider",
+    "Reranker",
+    "Tokenizer",
+    "VectorStore",
+    "SemanticAnswerCache",
 ]
@@ -2,18 +2,34 @@
 
 from __future__ import annotations
 
+import contextlib
+import contextvars
+import functools
 import time
 import uuid
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple, TypeVar, Union
 
-from ..storage.chroma_store import ChromaStore
+from ..storage.filters import scoped_where
 from ..utils.logging import setup_logger
-from .exceptions import AnswerNotFoundError, LLMError, RetrievalError
-from .protocols import LLMProvider
+from ..utils.metrics import MetricsRegistry, RagMetrics, StageTimer
+from ..utils.tokenization import HeuristicTokenizer, get_tokenizer
+from ..utils.tracing import isolate_context, span
+from .context import mmr_select, stitch_adjacent
+from .exceptions import AnswerNotFoundError, LLMError, RagError, RetrievalError
+from .protocols import LLMProvider, Reranker, Tokenizer, VectorStore
+from .semantic_cache import SemanticAnswerCache
 
 log = setup_logger("rag")
 
+NOT_FOUND_MARKER = "Não encontrado nos documentos"
+# Characters models put before a verbatim refusal (quotes, markdown emphasis, whitespace)
+_LEADING_DECORATION = " \t\r\n'\"*_`"
+# Token counts reported in character-budget mode, where no tokenizer needs to be loaded
+_ESTIMATE = HeuristicTokenizer()
+
+_E = TypeVar("_E", bound=Exception)
+
 
 @dataclass
 class RagAgent:
@@ -26,28 +42,79 @@ class RagAgent:
         top_k: Number of chunks to retrieve
         max_context_chars: Maximum characters to include in context
         distance_threshold: Cosine distance threshold for relevance filtering
+        answer_cache: Optional semantic cache answering paraphrased questions without
+            retrieval or generation
+        context_window: Model context window in tokens; when set, contexts are packed by
+            token count instead of ``max_context_chars`` so the prompt plus
+            ``answer_tokens`` fits, as counted by ``tokenizer``
+        answer_tokens: Tokens reserved for the answer in token-budget mode
+        tokenizer: Token counter for token-budget mode. Defaults to
+            ``get_tokenizer(llm.model)``, which is exact for OpenAI models and a
+            ``cl100k_base`` approximation for others. Without ``context_window`` it is only
+            used for the reported counts, which default to a character-based estimate
+        reranker: Optional reranker (e.g. ``CrossEncoderReranker``); when set,
+            ``rerank_candidates`` chunks are retrieved and only the ``rerank_top_n``
+            best-scoring ones reach the prompt
+        rerank_candidates: Chunks retrieved for reranking (at least ``top_k``)
+        rerank_top_n: Chunks kept after reranking
+        rerank_min_score: Reranker score below which a chunk is dropped; when nothing
+            passes, the question is answered as not found without calling the LLM
+        merge_adjacent: Stitch consecutive chunks of the same source into one span,
+            dropping the text they overlap on
+        mmr_lambda: When set, select chunks by maximal marginal relevance over their
+            stored vectors (1.0 = relevance only, 0.0 = diversity only); requires a store
+            with ``query_vectors``
+        mmr_candidates: Chunks retrieved for MMR selection (at least ``top_k``)
+        mmr_duplicate_threshold: Cosine similarity at which a chunk counts as a
+            near-duplicate of one already selected and is dropped
+        metrics: Registry receiving request, stage-latency, chunk and prompt-size
+            metrics (defaults to the process-wide ``REGISTRY``)
     """
 
-    store: ChromaStore
+    store: VectorStore
     llm: LLMProvider
     top_k: int = 5
     max_context_chars: int = 4000
     distance_threshold: float = 0.35
+    answer_cache: Optional[SemanticAnswerCache] = None
+    context_window: Optional[int] = None
+    answer_tokens: int = 512
+    tokenizer: Optional[Tokenizer] = None
+    reranker: Optional[Reranker] = None
+    rerank_candidates: int = 20
+    rerank_top_n: int = 3
+    rerank_min_score: Optional[float] = None
+    merge_adjacent: bool = False
+    mmr_lambda: Optional[float] = None
+    mmr_candidates: int = 20
+    mmr_duplicate_threshold: float = 0.95
+    metrics: Optional[MetricsRegistry] = None
+
+    def __post_init__(self) -> None:
+        self._metrics = RagMetrics(self.metrics)
+
+    @property
+    def _use_mmr(self) -> bool:
+        return self.mmr_lambda is not None and hasattr(self.store, "query_vectors")
+
+    @property
+    def _retrieve_k(self) -> int:
+        """Number of chunks to retrieve (over-fetched for reranking and MMR)."""
+        k = self.top_k
+        if self.reranker is not None:
+            k = max(k, self.rerank_candidates)
+        if self._use_mmr:
+            k = max(k, self.mmr_candidates)
+        return k
 
     def _format_prompt(
         self, question: str, contexts: List[Tuple[str, Dict[str, Any], float]]
     ) -> str:
         """Format the prompt with question and retrieved contexts."""
-        ctx_texts = []
-        total = 0
-        for text, meta, dist in contexts:
-            tag = f"[chunk_id={meta.get('chunk_id')} source={meta.get('source')}] (dist={round(dist, 4)})"
-            addition = f"{tag}\n{text}\n"
-            if total + len(addition) > self.max_context_chars:
-                break
-            ctx_texts.append(addition)
-            total += len(addition)
+        return self._pack_prompt(question, contexts)[0]
 
+    @staticmethod
+    def _render_prompt(question: str, ctx_texts: List[str]) -> str:
         instruction = (
             "Você é um assistente **estrito** de consulta a documentos.\n"
             "- Responda SOMENTE se a resposta estiver claramente sustentada pelos trechos no CONTEXTO.\n"
@@ -59,85 +126,822 @@ class RagAgent:
         )
         return f"{instruction}\n{context_block}\n\nPergunta: {question}\nResposta:"
 
-    def ask(self, question: str, request_id: Optional[str] = None) -> Dict[str, Any]:
+    def _tokenizer(self) -> Tokenizer:
+        """Token counter for this request; a tokenizer is only resolved in token-budget mode."""
+        if self.tokenizer is not None:
+            return self.tokenizer
+        if self.context_window is None:
+            return _ESTIMATE
+        model = getattr(self.llm, "model", None)
+        return get_tokenizer(model if isinstance(model, str) else None)
+
+    def _pack_prompt(
+        self, question: str, contexts: List[Tuple[str, Dict[str, Any], float]]
+    ) -> Tuple[str, List[Tuple[str, Dict[str, Any], float]], Dict[str, int]]:
         """
-        Ask a question and get an answer based on retrieved documents.
+        Pack retrieved contexts into the prompt within the configured budget.
 
-        Args:
-            question: The question to ask
-            request_id: Optional request ID for tracking
+        Uses ``max_context_chars`` by default, or the token budget when
+        ``context_window`` is set.
 
         Returns:
-            Dict containing answer, used chunks, and metadata
-
-        Raises:
-            RetrievalError: If document retrieval fails
-            AnswerNotFoundError: If no relevant information is found
-            LLMError: If language model generation fails
+            ``(prompt, contexts actually included, token counts)``
         """
-        rid = request_id or str(uuid.uuid4())
-        t0 = time.time()
+        tokenizer = self._tokenizer()
+        additions = []
+        for text, meta, dist in contexts:
+            ids = meta.get("chunk_ids")
+            cid = ",".join(str(i) for i in ids) if ids else meta.get("chunk_id")
+            tag = f"[chunk_id={cid} source={meta.get('source')}] (dist={round(dist, 4)})"
+            additions.append(f"{tag}\n{text}\n")
+
+        packed: List[int] = []  # indices of the contexts that fit
+        if self.context_window is None:
+            total = 0
+            for i, addition in enumerate(additions):
+                if total + len(addition) > self.max_context_chars:
+                    continue  # e.g. a long stitched span; shorter contexts may still fit
+                packed.append(i)
+                total += len(addition)
+            prompt = self._render_prompt(question, [additions[i] for i in packed])
+            prompt_tokens = tokenizer.count(prompt)
+        else:
+            limit = self.context_window - self.answer_tokens
+            budget = limit - tokenizer.count(self._render_prompt(question, []))
+            for i, addition in enumerate(additions):
+                # +1 for the newline joining consecutive chunks
+                cost = tokenizer.count(addition) + 1
+                if cost > budget:
+                    continue
+                packed.append(i)
+                budget -= cost
+            prompt = self._render_prompt(question, [additions[i] for i in packed])
+            prompt_tokens = tokenizer.count(prompt)
+            # Per-chunk counts can drift from the joined prompt's count at the boundaries
+            while packed and prompt_tokens > limit:
+                packed.pop()
+                prompt = self._render_prompt(question, [additions[i] for i in packed])
+                prompt_tokens = tokenizer.count(prompt)
+
+        tokens = {
+            "prompt_tokens": prompt_tokens,
+            "context_tokens": sum(tokenizer.count(additions[i]) for i in packed),
+        }
+        return prompt, [contexts[i] for i in packed], tokens
+
+    def _retrieval_error(self, e: Exception, rid: str) -> RetrievalError:
+        log.error(
+            "Falha na recuperação",
+            extra={"extra": {"event": "retrieval_error", "err": str(e), "rid": rid}},
+        )
+        return RetrievalError(f"Falha na recuperação: {e}")
+
+    def _llm_error(self, e: Exception, rid: str) -> LLMError:
+        log.error(
+            "Falha no LLM", extra={"extra": {"event": "llm_error", "err": str(e), "rid": rid}}
+        )
+        return LLMError(f"Falha na geração: {e}")
 
-        # Retrieval
+    def _fail(self, timer: StageTimer, e: _E) -> _E:
+        """Record a failed request in the metrics and return the error."""
+        if isinstance(e, AnswerNotFoundError):
+            self._metrics.finish(timer, "not_found")
+        else:
+            self._metrics.finish(timer, "error", error=type(e).__name__)
+        return e
+
+    @contextlib.contextmanager
+    def _observe(self, timer: StageTimer) -> Iterator[None]:
+        """Record the request as failed when the block raises."""
         try:
-            docs, metas, dists = self.store.query(question, k=self.top_k)
+            yield
         except Exception as e:
-            log.error(
-                "Falha na recuperação",
-                extra={"extra": {"event": "retrieval_error", "err": str(e), "rid": rid}},
-            )
-            raise RetrievalError(f"Falha na recuperação: {e}")
+            self._fail(timer, e)
+            raise
+
+    @staticmethod
+    def _scope(where: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Keyword arguments passing a metadata filter to the store (none when unscoped)."""
+        return {"where": where} if where else {}
+
+    def _retrieve(
+        self, question: str, where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+        """Query the store, applying MMR selection when configured."""
+        if self._use_mmr:
+            return self._retrieve_diverse([question], where)[0]
+        return self.store.query(question, k=self._retrieve_k, **self._scope(where))
+
+    def _retrieve_diverse(
+        self, questions: List[str], where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[List[str], List[Dict[str, Any]], List[float]]]:
+        store: Any = self.store
+        hits = store.query_vectors(questions, k=self._retrieve_k, **self._scope(where))
+        return [self._diversify(*h) for h in hits]
+
+    def _diversify(
+        self,
+        docs: List[str],
+        metas: List[Dict[str, Any]],
+        dists: List[float],
+        vectors: List[Any],
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+        """
+        Keep relevant chunks in maximal-marginal-relevance order, dropping near-duplicates.
+
+        Selects ``top_k`` chunks, or every non-duplicate when a reranker follows.
+        """
+        keep = [i for i, dist in enumerate(dists) if dist <= self.distance_threshold]
+        k = len(keep) if self.reranker is not None else self.top_k
+        picked = mmr_select(
+            [1.0 - dists[i] for i in keep],
+            [vectors[i] for i in keep],
+            k,
+            lambda_=self.mmr_lambda if self.mmr_lambda is not None else 1.0,
+            duplicate_threshold=self.mmr_duplicate_threshold,
+        )
+        order = [keep[i] for i in picked]
+        log.debug(
+            "Seleção MMR",
+            extra={"extra": {"event": "mmr", "candidates": len(keep), "kept": len(order)}},
+        )
+        return [docs[i] for i in order], [metas[i] for i in order], [dists[i] for i in order]
 
-        # Filter by threshold
+    def _select_contexts(
+        self, docs: List[str], metas: List[Dict[str, Any]], dists: List[float], rid: str
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Keep retrieved chunks under the distance threshold or raise AnswerNotFoundError."""
         triples: List[Tuple[str, Dict[str, Any], float]] = []
-        for d, m, dist in zip(docs, metas, dists):
-            if dist <= self.distance_threshold:
-                triples.append((d, m, dist))
+        with span("rag.select", request_id=rid, candidates=len(docs)) as sp:
+            for d, m, dist in zip(docs, metas, dists):
+                if dist <= self.distance_threshold:
+                    triples.append((d, m, dist))
+            sp.set(kept=len(triples))
+        self._metrics.retrieved_chunks.observe(len(triples))
 
         if not triples:
             log.info(
                 "Sem contexto relevante",
-                extra={"extra": {"event": "no_context", "rid": rid, "k": self.top_k}},
+                extra={"extra": {"event": "no_context", "rid": rid, "k": self._retrieve_k}},
             )
             raise AnswerNotFoundError("Não encontrado nos documentos.")
+        return triples
+
+    def _rerank(
+        self, question: str, triples: List[Tuple[str, Dict[str, Any], float]], rid: str
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        Reorder candidate chunks by reranker score and keep the best ``rerank_top_n``.
+
+        Falls back to distance order (first ``top_k``) when the reranker fails.
 
-        # Generation
-        prompt = self._format_prompt(question, triples)
+        Raises:
+            AnswerNotFoundError: If no chunk reaches ``rerank_min_score``
+        """
+        if self.reranker is None:
+            return triples
+        t0 = time.perf_counter()
         try:
-            answer = self.llm.answer(prompt).strip()
+            scores = self.reranker.score(question, [t for t, _, _ in triples])
         except Exception as e:
-            log.error(
-                "Falha no LLM", extra={"extra": {"event": "llm_error", "err": str(e), "rid": rid}}
+            log.warning(
+                "Falha no reranking",
+                extra={"extra": {"event": "rerank_error", "err": str(e), "rid": rid}},
+            )
+            return triples[: self.top_k]
+
+        ranked = sorted(zip(scores, range(len(triples))), key=lambda p: -p[0])
+        if self.rerank_min_score is not None:
+            ranked = [p for p in ranked if p[0] >= self.rerank_min_score]
+        ranked = ranked[: self.rerank_top_n]
+        log.info(
+            "Reranking concluído",
+            extra={
+                "extra": {
+                    "event": "rerank",
+                    "rid": rid,
+                    "candidates": len(triples),
+                    "kept": len(ranked),
+                    "top_score": round(ranked[0][0], 4) if ranked else None,
+                    "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+                }
+            },
+        )
+        if not ranked:
+            log.info(
+                "Sem contexto relevante",
+                extra={"extra": {"event": "no_context", "rid": rid, "stage": "rerank"}},
+            )
+            raise AnswerNotFoundError("Não encontrado nos documentos.")
+        return [triples[i] for _, i in ranked]
+
+    def _assemble(
+        self,
+        question: str,
+        triples: List[Tuple[str, Dict[str, Any], float]],
+        rid: str,
+        timer: StageTimer,
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Rerank the selected chunks and stitch adjacent ones, as configured."""
+        if self.reranker is not None:
+            with timer.stage("rerank"), span(
+                "rag.rerank", request_id=rid, candidates=len(triples)
+            ) as sp:
+                triples = self._rerank(question, triples, rid)
+                sp.set(kept=len(triples))
+        if self.merge_adjacent:
+            with timer.stage("stitch"), span("rag.stitch", request_id=rid) as sp:
+                triples = stitch_adjacent(triples)
+                sp.set(spans=len(triples))
+        return triples
+
+    def _prepare(
+        self,
+        question: str,
+        triples: List[Tuple[str, Dict[str, Any], float]],
+        rid: str,
+        timer: StageTimer,
+    ) -> Tuple[str, List[Tuple[str, Dict[str, Any], float]], Dict[str, int]]:
+        """
+        Pack the prompt (timed as stage ``pack``), recording its size.
+
+        Raises:
+            AnswerNotFoundError: If no context fits the budget
+        """
+        with timer.stage("pack"), span("rag.prompt", request_id=rid) as sp:
+            prompt, triples, tokens = self._pack_prompt(question, triples)
+            if sp.recording:
+                sp.set(chunks=len(triples), prompt_bytes=len(prompt.encode("utf-8")), **tokens)
+        if not triples:
+            log.info(
+                "Sem contexto relevante",
+                extra={"extra": {"event": "no_context", "rid": rid, "stage": "pack"}},
             )
-            raise LLMError(f"Falha na geração: {e}")
+            raise AnswerNotFoundError("Não encontrado nos documentos.")
+        self._metrics.context_chunks.observe(len(triples))
+        self._metrics.prompt_tokens.observe(tokens["prompt_tokens"])
+        return prompt, triples, tokens
+
+    def _generating(self, rid: str) -> Any:
+        """Span for one LLM call."""
+        return span("rag.generate", request_id=rid, provider=type(self.llm).__name__)
+
+    def _generate(self, prompt: str, rid: str, timer: StageTimer) -> str:
+        """Call the LLM (timed as stage ``llm``), wrapping failures in LLMError."""
+        try:
+            with timer.stage("llm"), self._generating(rid) as sp:
+                answer = self.llm.answer(prompt).strip()
+                sp.set(answer_chars=len(answer))
+        except Exception as e:
+            raise self._llm_error(e, rid)
+        return answer
+
+    def _retrieving(
+        self, rid: Optional[str], where: Optional[Dict[str, Any]], questions: int = 1
+    ) -> Any:
+        """Span for one retrieval call."""
+        return span(
+            "rag.retrieve",
+            request_id=rid,
+            k=self._retrieve_k,
+            questions=questions,
+            filtered=where is not None,
+            mmr=self._use_mmr,
+        )
 
-        # Strict adherence guardrail
-        if not answer or "Não encontrado nos documentos" in answer:
+    def _check_answer(self, answer: str, rid: str) -> None:
+        """Strict adherence guardrail."""
+        if not answer or NOT_FOUND_MARKER in answer:
             log.info(
                 "Resposta negativa (guardrail ok)",
                 extra={"extra": {"event": "answer_not_found", "rid": rid}},
             )
             raise AnswerNotFoundError("Não encontrado nos documentos.")
 
-        latency = round((time.time() - t0) * 1000, 1)
+    @staticmethod
+    def _used_chunks(triples: List[Tuple[str, Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """Describe the packed chunks, listing every chunk of a stitched span."""
+        return [
+            {"chunk_id": cid, "distance": d, "source": m.get("source")}
+            for _, m, d in triples
+            for cid in m.get("chunk_ids") or [m.get("chunk_id")]
+        ]
+
+    def _build_result(
+        self,
+        rid: str,
+        answer: str,
+        triples: List[Tuple[str, Dict[str, Any], float]],
+        timer: StageTimer,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        timings = timer.as_dict()
         log.info(
             "Resposta gerada",
             extra={
                 "extra": {
                     "event": "answer_ok",
                     "rid": rid,
-                    "latency_ms": latency,
-                    "used_chunks": [m.get("chunk_id") for _, m, _ in triples],
+                    "latency_ms": timings["total"],
+                    "timings_ms": timings,
+                    "used_chunks": [c["chunk_id"] for c in self._used_chunks(triples)],
+                    **(extra or {}),
                 }
             },
         )
+        self._metrics.finish(timer, "ok")
 
         return {
             "request_id": rid,
             "answer": answer,
-            "used_chunks": [
-                {"chunk_id": m.get("chunk_id"), "distance": d, "source": m.get("source")}
-                for _, m, d in triples
-            ],
-            "latency_ms": latency,
+            "used_chunks": self._used_chunks(triples),
+            "latency_ms": timings["total"],
+            "timings_ms": timings,
+            "cached": False,
+            **(extra or {}),
+        }
+
+    def _cache_lookup(
+        self,
+        question: str,
+        rid: str,
+        timer: StageTimer,
+        vec: Optional[List[float]] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Optional[List[float]], Any, Optional[Dict[str, Any]]]:
+        """Look ``question`` up in the answer cache.
+
+        Scoped questions (with a metadata filter) bypass the cache, since cached answers
+        are not tied to a scope.
+
+        Returns:
+            ``(question vector, store version, cached result or None)``; the vector is
+            None when no cache is configured, the question is scoped or the lookup failed
+        """
+        if self.answer_cache is None or where:
+            return None, None, None
+        version = getattr(self.store, "version", None)
+        try:
+            with timer.stage("cache"), span("rag.cache_lookup", request_id=rid) as sp:
+                if vec is None:
+                    vec = self.answer_cache.embed_question(question)
+                found = self.answer_cache.lookup(vec, version)
+                sp.set(hit=found is not None)
+        except Exception as e:
+            log.warning(
+                "Falha no cache de respostas",
+                extra={"extra": {"event": "answer_cache_error", "err": str(e), "rid": rid}},
+            )
+            return None, version, None
+        if found is None:
+            return vec, version, None
+
+        entry, similarity = found
+        timings = timer.as_dict()
+        log.info(
+            "Resposta em cache",
+            extra={
+                "extra": {
+                    "event": "answer_cached",
+                    "rid": rid,
+                    "latency_ms": timings["total"],
+                    "timings_ms": timings,
+                    "similarity": round(similarity, 4),
+                }
+            },
+        )
+        self._metrics.finish(timer, "cached")
+        return (
+            vec,
+            version,
+            {
+                "request_id": rid,
+                "answer": entry["answer"],
+                "used_chunks": entry["used_chunks"],
+                "latency_ms": timings["total"],
+                "timings_ms": timings,
+                "cached": True,
+                "cache_similarity": round(similarity, 4),
+            },
+        )
+
+    def _cache_store(
+        self, vec: Optional[List[float]], version: Any, result: Dict[str, Any]
+    ) -> None:
+        if self.answer_cache is not None and vec is not None:
+            self.answer_cache.add(vec, result["answer"], result["used_chunks"], version)
+
+    def warmup(self) -> Dict[str, bool]:
+        """
+        Run a dummy batch through the local models so the first question isn't the slow one.
+
+        Calls ``warmup()`` on the store's embedder and on the reranker when they provide
+        it; remote providers have none and are not called.
+
+        Returns:
+            Component -> whether a warm-up batch ran (False when already warm)
+        """
+        components = {
+            "embedder": getattr(self.store, "embedder", None),
+            "reranker": self.reranker,
         }
+        t0 = time.perf_counter()
+        ran = {}
+        for name, component in components.items():
+            warmup = getattr(component, "warmup", None)
+            if callable(warmup):
+                ran[name] = bool(warmup())
+        log.info(
+            "Modelos aquecidos",
+            extra={
+                "extra": {
+                    "event": "warmup",
+                    "components": ran,
+                    "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+                }
+            },
+        )
+        return ran
+
+    def ask(
+        self,
+        question: str,
+        request_id: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        source: Union[str, List[str], None] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ask a question and get an answer based on retrieved documents.
+
+        Args:
+            question: The question to ask
+            request_id: Optional request ID for tracking
+            where: Metadata filter in ChromaDB ``where`` syntax restricting retrieval
+                (e.g. ``{"tenant": "acme", "doc_type": "pdf"}``)
+            source: Restrict retrieval to one source or a list of sources
+
+        Returns:
+            Dict containing answer, used chunks, and metadata; ``timings_ms`` breaks
+            ``latency_ms`` down by stage
+
+        Raises:
+            RetrievalError: If document retrieval fails
+            AnswerNotFoundError: If no relevant information is found
+            LLMError: If language model generation fails
+        """
+        rid = request_id or str(uuid.uuid4())
+        timer = StageTimer()
+        with self._observe(timer), span("rag.ask", request_id=rid, question_chars=len(question)):
+            where = scoped_where(where, source)
+
+            vec, version, cached = self._cache_lookup(question, rid, timer, where=where)
+            if cached is not None:
+                return cached
+
+            # Retrieval
+            try:
+                with timer.stage("retrieve"), timer.activate(), self._retrieving(rid, where):
+                    docs, metas, dists = self._retrieve(question, where)
+            except Exception as e:
+                raise self._retrieval_error(e, rid)
+            triples = self._select_contexts(docs, metas, dists, rid)
+            triples = self._assemble(question, triples, rid, timer)
+
+            # Generation
+            prompt, triples, tokens = self._prepare(question, triples, rid, timer)
+            answer = self._generate(prompt, rid, timer)
+
+            self._check_answer(answer, rid)
+            result = self._build_result(rid, answer, triples, timer, extra=tokens)
+            self._cache_store(vec, version, result)
+            return result
+
+    async def aask(
+        self,
+        question: str,
+        request_id: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        source: Union[str, List[str], None] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of :meth:`ask` for serving many questions from one event loop.
+
+        Retrieval runs off the event loop (``store.aquery`` when available, otherwise the
+        default executor). Generation awaits ``llm.aanswer`` when the provider implements
+        :class:`AsyncLLMProvider` and falls back to running ``llm.answer`` in the executor.
+
+        Args:
+            question: The question to ask
+            request_id: Optional request ID for tracking
+            where: Metadata filter restricting retrieval (see :meth:`ask`)
+            source: Restrict retrieval to one source or a list of sources
+
+        Returns:
+            Dict containing answer, used chunks, and metadata
+
+        Raises:
+            RetrievalError: If document retrieval fails
+            AnswerNotFoundError: If no relevant information is found
+            LLMError: If language model generation fails
+        """
+        import asyncio  # loaded by the running event loop anyway; keeps cold start lean
+
+        rid = request_id or str(uuid.uuid4())
+        timer = StageTimer()
+        loop = asyncio.get_running_loop()
+
+        def in_executor(fn: Any, *args: Any) -> Any:
+            # Executor threads don't inherit context; carry the active span and timer over
+            ctx = contextvars.copy_context()
+            return loop.run_in_executor(None, functools.partial(ctx.run, fn, *args))
+
+        with self._observe(timer), span("rag.ask", request_id=rid, question_chars=len(question)):
+            where = scoped_where(where, source)
+
+            vec, version = None, None
+            cached: Optional[Dict[str, Any]] = None
+            if self.answer_cache is not None and not where:
+                vec, version, cached = await in_executor(self._cache_lookup, question, rid, timer)
+                if cached is not None:
+                    return cached
+
+            # Retrieval
+            try:
+                aquery = getattr(self.store, "aquery", None)
+                with timer.stage("retrieve"), timer.activate(), self._retrieving(rid, where):
+                    if not self._use_mmr and asyncio.iscoroutinefunction(aquery):
+                        docs, metas, dists = await aquery(
+                            question, k=self._retrieve_k, **self._scope(where)
+                        )
+                    else:
+                        docs, metas, dists = await in_executor(self._retrieve, question, where)
+            except Exception as e:
+                raise self._retrieval_error(e, rid)
+            triples = self._select_contexts(docs, metas, dists, rid)
+            if self.reranker is not None:
+                triples = await in_executor(self._assemble, question, triples, rid, timer)
+            else:
+                triples = self._assemble(question, triples, rid, timer)
+
+            # Generation
+            prompt, triples, tokens = self._prepare(question, triples, rid, timer)
+            aanswer = getattr(self.llm, "aanswer", None)
+            if asyncio.iscoroutinefunction(aanswer):
+                try:
+                    with timer.stage("llm"), self._generating(rid) as sp:
+                        answer = (await aanswer(prompt)).strip()
+                        sp.set(answer_chars=len(answer))
+                except Exception as e:
+                    raise self._llm_error(e, rid)
+            else:
+                answer = await in_executor(self._generate, prompt, rid, timer)
+
+            self._check_answer(answer, rid)
+            result = self._build_result(rid, answer, triples, timer, extra=tokens)
+            self._cache_store(vec, version, result)
+            return result
+
+    def ask_many(
+        self,
+        questions: List[str],
+        request_ids: Optional[List[str]] = None,
+        max_concurrency: int = 4,
+        where: Optional[Dict[str, Any]] = None,
+        source: Union[str, List[str], None] = None,
+    ) -> List[Union[Dict[str, Any], RagError]]:
+        """
+        Answer a batch of questions with vectorized retrieval.
+
+        All questions are embedded in one provider call and searched with one
+        ``store.query_many`` call; LLM generation then runs with at most
+        ``max_concurrency`` requests in flight.
+
+        Args:
+            questions: Questions to answer
+            request_ids: Optional request IDs, one per question
+            max_concurrency: Maximum number of concurrent LLM calls
+            where: Metadata filter applied to every question (see :meth:`ask`)
+            source: Restrict retrieval to one source or a list of sources
+
+        Returns:
+            One item per question, in order: the result dict (as returned by :meth:`ask`)
+            or the ``RagError`` (``AnswerNotFoundError``, ``RetrievalError``, ``LLMError``)
+            that :meth:`ask` would have raised for it
+        """
+        if request_ids is not None and len(request_ids) != len(questions):
+            raise ValueError("request_ids precisa ter o mesmo tamanho de questions.")
+        with span("rag.ask_many", questions=len(questions)):
+            rids = request_ids or [str(uuid.uuid4()) for _ in questions]
+            timers = [StageTimer() for _ in questions]
+            out: List[Union[Dict[str, Any], RagError, None]] = [None] * len(questions)
+            where = scoped_where(where, source)
+
+            vecs: List[Optional[List[float]]] = [None] * len(questions)
+            version = getattr(self.store, "version", None)
+            if self.answer_cache is not None and questions and not where:
+                shared = StageTimer()
+                try:
+                    with shared.stage("cache"):
+                        vecs = list(self.answer_cache.embed_questions(questions))
+                except Exception as e:
+                    log.warning(
+                        "Falha no cache de respostas",
+                        extra={"extra": {"event": "answer_cache_error", "err": str(e)}},
+                    )
+                for i, vec in enumerate(vecs):
+                    timers[i].merge(shared)
+                    if vec is not None:
+                        out[i] = self._cache_lookup(questions[i], rids[i], timers[i], vec=vec)[2]
+            pending = [i for i in range(len(questions)) if out[i] is None]
+
+            # Retrieval (timed once for the batch; every question reports the shared time)
+            shared = StageTimer()
+            try:
+                batch = [questions[i] for i in pending]
+                with shared.stage("retrieve"), shared.activate(), self._retrieving(
+                    None, where, len(batch)
+                ):
+                    if not batch:
+                        retrieved = []
+                    elif self._use_mmr:
+                        retrieved = self._retrieve_diverse(batch, where)
+                    elif hasattr(self.store, "query_many"):
+                        store: Any = self.store
+                        retrieved = store.query_many(
+                            batch, k=self._retrieve_k, **self._scope(where)
+                        )
+                    else:
+                        retrieved = [self._retrieve(q, where) for q in batch]
+            except Exception as e:
+                for i in pending:
+                    timers[i].merge(shared)
+                    out[i] = self._fail(timers[i], self._retrieval_error(e, rids[i]))
+                return out  # type: ignore[return-value]
+
+            prompts: Dict[
+                int, Tuple[str, List[Tuple[str, Dict[str, Any], float]], Dict[str, int]]
+            ] = {}
+            for i, (docs, metas, dists) in zip(pending, retrieved):
+                timers[i].merge(shared)
+                try:
+                    triples = self._select_contexts(docs, metas, dists, rids[i])
+                    triples = self._assemble(questions[i], triples, rids[i], timers[i])
+                    prompts[i] = self._prepare(questions[i], triples, rids[i], timers[i])
+                except AnswerNotFoundError as e:
+                    out[i] = self._fail(timers[i], e)
+
+            # Generation
+            def generate(i: int) -> Union[Dict[str, Any], RagError]:
+                prompt, triples, tokens = prompts[i]
+                try:
+                    answer = self._generate(prompt, rids[i], timers[i])
+                except LLMError as e:
+                    return self._fail(timers[i], e)
+                try:
+                    self._check_answer(answer, rids[i])
+                except AnswerNotFoundError as e:
+                    return self._fail(timers[i], e)
+                result = self._build_result(rids[i], answer, triples, timers[i], extra=tokens)
+                self._cache_store(vecs[i], version, result)
+                return result
+
+            if prompts:
+                from concurrent.futures import ThreadPoolExecutor
+
+                workers = max(1, min(max_concurrency, len(prompts)))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    # One context copy per task keeps worker spans under this batch's span
+                    futures = [
+                        pool.submit(contextvars.copy_context().run, generate, i) for i in prompts
+                    ]
+                    for i, fut in zip(prompts, futures):
+                        out[i] = fut.result()
+            return out  # type: ignore[return-value]
+
+    def ask_stream(
+        self,
+        question: str,
+        request_id: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        source: Union[str, List[str], None] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Ask a question and stream the answer as it is generated.
+
+        Yields ``{"type": "token", "text": ...}`` events while the model generates and a
+        final ``{"type": "done", ...}`` event carrying the same fields as :meth:`ask` plus
+        ``ttft_ms`` (time to first model token). Output that could still turn into the
+        strict refusal is held back; if the model opens with the refusal, generation is
+        cancelled immediately. Providers without ``stream`` fall back to ``answer``.
+
+        Args:
+            question: The question to ask
+            request_id: Optional request ID for tracking
+            where: Metadata filter restricting retrieval (see :meth:`ask`)
+            source: Restrict retrieval to one source or a list of sources
+
+        Raises:
+            RetrievalError: If document retrieval fails
+            AnswerNotFoundError: If no relevant information is found or the model refuses
+            LLMError: If language model generation fails
+        """
+        # Spans and timers opened inside the stream stay out of the consumer's context
+        return isolate_context(self._ask_stream(question, request_id, where, source))
+
+    def _ask_stream(
+        self,
+        question: str,
+        request_id: Optional[str],
+        where: Optional[Dict[str, Any]],
+        source: Union[str, List[str], None],
+    ) -> Generator[Dict[str, Any], None, None]:
+        rid = request_id or str(uuid.uuid4())
+        timer = StageTimer()
+        with self._observe(timer), span(
+            "rag.ask_stream", request_id=rid, question_chars=len(question)
+        ):
+            where = scoped_where(where, source)
+
+            vec, version, cached = self._cache_lookup(question, rid, timer, where=where)
+            if cached is not None:
+                yield {"type": "token", "text": cached["answer"]}
+                yield {"type": "done", **cached, "ttft_ms": cached["latency_ms"]}
+                return
+
+            # Retrieval
+            try:
+                with timer.stage("retrieve"), timer.activate(), self._retrieving(rid, where):
+                    docs, metas, dists = self._retrieve(question, where)
+            except Exception as e:
+                raise self._retrieval_error(e, rid)
+            triples = self._select_contexts(docs, metas, dists, rid)
+            triples = self._assemble(question, triples, rid, timer)
+
+            # Generation (the ``llm`` stage includes time the consumer spends between tokens)
+            prompt, triples, tokens = self._prepare(question, triples, rid, timer)
+            with timer.stage("llm"), self._generating(rid) as sp:
+                answer, held, released, ttft = yield from self._stream_answer(prompt, rid, timer)
+                sp.set(answer_chars=len(answer), ttft_ms=ttft)
+
+            self._check_answer(answer, rid)
+            if not released:
+                yield {"type": "token", "text": held}
+            result = self._build_result(
+                rid, answer, triples, timer, extra={**tokens, "ttft_ms": ttft}
+            )
+            self._cache_store(vec, version, result)
+            yield {"type": "done", **result}
+
+    def _stream_answer(
+        self, prompt: str, rid: str, timer: StageTimer
+    ) -> Generator[Dict[str, Any], None, Tuple[str, str, bool, Optional[float]]]:
+        """
+        Stream model tokens, holding back output that could still become the refusal.
+
+        Returns:
+            ``(answer, held-back text, whether output was released, ttft_ms)``
+        """
+        stream = getattr(self.llm, "stream", None)
+        try:
+            pieces = iter(stream(prompt) if callable(stream) else [self.llm.answer(prompt)])
+        except Exception as e:
+            raise self._llm_error(e, rid)
+
+        parts: List[str] = []
+        held = ""
+        released = False
+        ttft: Optional[float] = None
+        try:
+            for piece in pieces:
+                if not piece:
+                    continue
+                if ttft is None:
+                    ttft = timer.elapsed_ms()
+                parts.append(piece)
+                if released:
+                    yield {"type": "token", "text": piece}
+                    continue
+                held += piece
+                head = held.lstrip(_LEADING_DECORATION)
+                if head.startswith(NOT_FOUND_MARKER):
+                    log.info(
+                        "Resposta negativa (guardrail ok)",
+                        extra={
+                            "extra": {"event": "answer_not_found", "rid": rid, "early_abort": True}
+                        },
+                    )
+                    raise AnswerNotFoundError("Não encontrado nos documentos.")
+                if NOT_FOUND_MARKER.startswith(head):
+                    continue
+                released = True
+                yield {"type": "token", "text": held}
+        except AnswerNotFoundError:
+            raise
+        except Exception as e:
+            raise self._llm_error(e, rid)
+        finally:
+            # Closing the provider generator cancels the underlying HTTP stream
+            close = getattr(pieces, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts).strip(), held, released, ttft
@@ -0,0 +1,127 @@
+"""Context assembly: stitching adjacent chunks and redundancy-aware selection."""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+Context = Tuple[str, Dict[str, Any], float]
+
+
+def overlap_length(left: str, right: str, min_overlap: int = 16, max_overlap: int = 2000) -> int:
+    """
+    Length of the longest suffix of ``left`` that is also a prefix of ``right``.
+
+    Overlaps shorter than ``min_overlap`` are treated as coincidental and ignored.
+    """
+    limit = min(len(left), len(right), max_overlap)
+    for n in range(limit, min_overlap - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+
+def stitch_adjacent(contexts: Sequence[Context], min_overlap: int = 16) -> List[Context]:
+    """
+    Merge consecutive chunks of the same source into single spans.
+
+    Chunks whose integer ``chunk_id`` values are consecutive within one ``source`` are
+    joined in document order with their shared overlap removed. Each span takes the
+    position of its best-ranked member and the smallest distance among its members;
+    its metadata lists every merged ID under ``chunk_ids``.
+
+    Args:
+        contexts: ``(text, metadata, distance)`` triples in rank order
+        min_overlap: Shortest suffix/prefix match treated as chunking overlap
+
+    Returns:
+        The stitched triples, in rank order
+    """
+    positions: Dict[Tuple[Any, int], int] = {}
+    for pos, (_, meta, _) in enumerate(contexts):
+        cid = meta.get("chunk_id")
+        if isinstance(cid, int) and not isinstance(cid, bool):
+            positions.setdefault((meta.get("source"), cid), pos)
+
+    used = set()
+    out: List[Context] = []
+    for pos, (text, meta, dist) in enumerate(contexts):
+        if pos in used:
+            continue
+        cid = meta.get("chunk_id")
+        source = meta.get("source")
+        if not isinstance(cid, int) or positions.get((source, cid)) != pos:
+            out.append((text, meta, dist))
+            continue
+        first = cid
+        while (source, first - 1) in positions and positions[(source, first - 1)] not in used:
+            first -= 1
+        members = []
+        n = first
+        while (source, n) in positions and positions[(source, n)] not in used:
+            members.append(positions[(source, n)])
+            n += 1
+        if len(members) == 1:
+            used.add(pos)
+            out.append((text, meta, dist))
+            continue
+
+        merged = contexts[members[0]][0]
+        for m in members[1:]:
+            nxt = contexts[m][0]
+            merged += nxt[overlap_length(merged, nxt, min_overlap) :]
+        used.update(members)
+        span_meta = {
+            **contexts[members[0]][1],
+            "chunk_ids": [contexts[m][1]["chunk_id"] for m in members],
+        }
+        out.append((merged, span_meta, min(contexts[m][2] for m in members)))
+    return out
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[int]:
+    """
+    Choose up to ``k`` candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda_ * relevance - (1 - lambda_) * max cosine similarity to the picks so far``.
+    Candidates at least ``duplicate_threshold`` similar to an earlier pick are dropped
+    outright.
+
+    Args:
+        relevance: Relevance of each candidate to the query (e.g. ``1 - distance``)
+        vectors: Candidate embeddings
+        k: Maximum number of candidates to keep
+        lambda_: Trade-off between relevance (1.0) and diversity (0.0)
+        duplicate_threshold: Cosine similarity above which a candidate is a duplicate
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    import numpy as np
+
+    n = len(relevance)
+    if not n or k <= 0:
+        return []
+    raw = np.asarray(vectors, dtype=np.float32).reshape(n, -1)
+    norms = np.linalg.norm(raw, axis=1, keepdims=True)
+    mat = raw / np.where(norms == 0, 1.0, norms)
+    sims = mat @ mat.T
+    rel = np.asarray(relevance, dtype=np.float32)
+
+    selected: List[int] = []
+    available = np.ones(n, dtype=bool)
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+        scores = lambda_ * rel - (1.0 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_sim = np.maximum(max_sim, sims[best])
+        available &= max_sim < duplicate_threshold
+    return selected
@@ -1,6 +1,6 @@
 """Protocol definitions for pluggable providers."""
 
-from typing import List, Protocol
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
 
 
 class EmbeddingProvider(Protocol):
@@ -31,3 +31,120 @@ class LLMProvider(Protocol):
             Generated response text
         """
         ...
+
+
+class AsyncEmbeddingProvider(Protocol):
+    """Protocol for embedding providers with a native asyncio path."""
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts without blocking the event loop.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embedding vectors (one per text)
+        """
+        ...
+
+
+class AsyncLLMProvider(Protocol):
+    """Protocol for language model providers with a native asyncio path."""
+
+    async def aanswer(self, prompt: str) -> str:
+        """Generate a response for the given prompt without blocking the event loop.
+
+        Args:
+            prompt: The input prompt
+
+        Returns:
+            Generated response text
+        """
+        ...
+
+
+class StreamingLLMProvider(Protocol):
+    """Protocol for language model providers that can stream their output."""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Generate a response incrementally.
+
+        Closing the returned iterator must cancel the underlying generation.
+
+        Args:
+            prompt: The input prompt
+
+        Returns:
+            Iterator over response text fragments, in order
+        """
+        ...
+
+
+class Tokenizer(Protocol):
+    """Protocol for token counters used to budget prompts."""
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens ``text`` encodes to.
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Token count
+        """
+        ...
+
+
+class Reranker(Protocol):
+    """Protocol for rerankers that rescore retrieved chunks against the question."""
+
+    def score(self, query: str, passages: List[str]) -> List[float]:
+        """Score each passage's relevance to ``query``.
+
+        Args:
+            query: The user question
+            passages: Candidate chunk texts
+
+        Returns:
+            One score per passage; higher means more relevant
+        """
+        ...
+
+
+class VectorStore(Protocol):
+    """Protocol for document stores the agent retrieves from."""
+
+    def upsert(
+        self, texts: List[str], metadatas: List[Dict[str, Any]], ids: Optional[List[str]] = None
+    ) -> Any:
+        """Insert or update documents.
+
+        Args:
+            texts: Document texts
+            metadatas: One metadata dict per text
+            ids: Optional document IDs (generated when omitted)
+        """
+        ...
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete documents by ID (unknown IDs are ignored).
+
+        Args:
+            ids: Document IDs to remove
+        """
+        ...
+
+    def query(
+        self, text: str, k: int = 5, where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
+        """Retrieve the documents most similar to ``text``.
+
+        Args:
+            text: Query text
+            k: Number of results
+            where: Optional metadata filter in ChromaDB ``where`` syntax
+
+        Returns:
+            ``(documents, metadatas, cosine distances)`` sorted by increasing distance
+        """
+        ...
@@ -0,0 +1,160 @@
+"""Semantic answer cache keyed by question embedding similarity."""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .protocols import EmbeddingProvider
+
+
+class SemanticAnswerCache:
+    """
+    Cache of final answers looked up by cosine similarity between question embeddings.
+
+    Question vectors are kept L2-normalized in one contiguous float32 matrix, so a lookup
+    is a single matrix-vector product. The cache remembers the store ``version`` its
+    entries were produced against and drops everything when the collection changes.
+
+    Args:
+        embedder: Provider used to embed questions (usually the store's embedder)
+        threshold: Minimum cosine similarity for a cache hit
+        max_entries: Capacity; the least recently used entry is replaced when full
+    """
+
+    def __init__(
+        self, embedder: EmbeddingProvider, threshold: float = 0.95, max_entries: int = 1000
+    ):
+        import numpy as np
+
+        if max_entries <= 0:
+            raise ValueError("max_entries precisa ser maior que zero.")
+        self.np = np
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: Any = None
+        self._entries: List[Dict[str, Any]] = []
+        self._last_used: List[float] = []
+        self._version: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def embed_question(self, question: str) -> List[float]:
+        """Embed a single question with the cache's embedder."""
+        return self.embedder.embed([question])[0]
+
+    def embed_questions(self, questions: List[str]) -> List[List[float]]:
+        """Embed several questions in one provider call."""
+        return self.embedder.embed(questions)
+
+    def _normalize(self, vec: List[float]) -> Any:
+        arr = self.np.asarray(vec, dtype=self.np.float32)
+        norm = float(self.np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+
+    def _sync_version(self, version: Any) -> bool:
+        """Move to ``version`` if it is newer; returns False for a stale version."""
+        if version == self._version:
+            return True
+        if version is not None and self._version is not None:
+            try:
+                if version < self._version:
+                    return False
+            except TypeError:
+                pass  # unordered versions: any change invalidates
+        if self._entries:
+            self.invalidations += 1
+        self._vectors = None
+        self._entries = []
+        self._last_used = []
+        self._version = version
+        return True
+
+    @staticmethod
+    def _copy(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {"answer": entry["answer"], "used_chunks": [dict(c) for c in entry["used_chunks"]]}
+
+    def lookup(
+        self, vec: List[float], version: Any = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Find a cached answer for a question vector.
+
+        Args:
+            vec: Question embedding
+            version: Current store version; a newer value invalidates the cache and an
+                older one (a reader racing a write) is a miss
+
+        Returns:
+            ``(entry, similarity)`` for the most similar cached question at or above the
+            threshold, or None. The entry is a copy.
+        """
+        q = self._normalize(vec)
+        with self._lock:
+            if not self._sync_version(version) or not self._entries:
+                self.misses += 1
+                return None
+            n = len(self._entries)
+            sims = self._vectors[:n] @ q
+            best = int(self.np.argmax(sims))
+            sim = float(sims[best])
+            if sim < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[best] = time.monotonic()
+            self.hits += 1
+            return self._copy(self._entries[best]), sim
+
+    def add(
+        self,
+        vec: List[float],
+        answer: str,
+        used_chunks: List[Dict[str, Any]],
+        version: Any = None,
+    ) -> None:
+        """Store a final answer for a question vector.
+
+        Answers computed against an older store version than the cache's are dropped.
+        """
+        q = self._normalize(vec)
+        entry = self._copy({"answer": answer, "used_chunks": used_chunks})
+        with self._lock:
+            if not self._sync_version(version):
+                return
+            n = len(self._entries)
+            if self._vectors is None:
+                self._vectors = self.np.zeros((min(64, self.max_entries), q.shape[0]), "float32")
+            if n < self.max_entries:
+                if n == self._vectors.shape[0]:
+                    extra = self.np.zeros((min(n, self.max_entries - n), q.shape[0]), "float32")
+                    self._vectors = self.np.vstack([self._vectors, extra])
+                slot = n
+                self._entries.append(entry)
+                self._last_used.append(time.monotonic())
+            else:
+                slot = min(range(n), key=self._last_used.__getitem__)
+                self._entries[slot] = entry
+                self._last_used[slot] = time.monotonic()
+            self._vectors[slot] = q
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._vectors = None
+            self._entries = []
+            self._last_used = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/invalidation counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
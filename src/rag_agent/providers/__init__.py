@@ -1,11 +1,36 @@
 """Provider implementations for embeddings and LLMs."""
 
-from .embeddings import OpenAIEmbedding, SentenceTransformerEmbedding
-from .llm import OllamaChat, OpenAIChat
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import attach
+
+if TYPE_CHECKING:
+    from .cached_embedding import CachedEmbedding
+    from .embeddings import OpenAIEmbedding, SentenceTransformerEmbedding
+    from .llm import OllamaChat, OpenAIChat
+    from .registry import MODEL_REGISTRY, ModelRegistry
+    from .rerank import CrossEncoderReranker
+
+_EXPORTS = {
+    "OpenAIEmbedding": ".embeddings",
+    "SentenceTransformerEmbedding": ".embeddings",
+    "OpenAIChat": ".llm",
+    "OllamaChat": ".llm",
+    "CachedEmbedding": ".cached_embedding",
+    "CrossEncoderReranker": ".rerank",
+    "ModelRegistry": ".registry",
+    "MODEL_REGISTRY": ".registry",
+}
+
+__getattr__, __dir__ = attach(__name__, _EXPORTS)
 
 __all__ = [
     "OpenAIEmbedding",
     "SentenceTransformerEmbedding",
     "OpenAIChat",
     "OllamaChat",
+    "CachedEmbedding",
+    "CrossEncoderReranker",
+    "ModelRegistry",
+    "MODEL_REGISTRY",
 ]
@@ -0,0 +1,231 @@
+"""Content-addressed caching wrapper for embedding providers."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..core.exceptions import EmbeddingError
+from ..core.protocols import EmbeddingProvider
+from ..utils.cache import LRUCache
+
+# SQLite limits the number of bound parameters per statement (999 on older builds)
+_SQL_BATCH = 500
+
+
+def embedder_model_name(embedder: Any) -> str:
+    """Best-effort stable identifier of the model behind an embedding provider."""
+    for attr in ("model_name", "model"):
+        value = getattr(embedder, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embedder).__name__
+
+
+class CachedEmbedding:
+    """
+    Embedding provider wrapper with an in-memory LRU tier and an optional SQLite tier.
+
+    Entries are keyed by ``sha256(model name + text)``, so identical texts embedded
+    by the same model are only ever sent to the wrapped provider once. Vectors are
+    stored on disk as float32.
+
+    Args:
+        embedder: Wrapped embedding provider
+        cache_path: SQLite file for the persistent tier (None keeps the cache in memory only)
+        max_memory_entries: Capacity of the in-memory LRU tier
+        max_disk_bytes: Size budget of the persistent tier; least recently used vectors are
+            evicted once it is exceeded
+        model_name: Override for the model identifier used in cache keys
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingProvider,
+        cache_path: Optional[str] = None,
+        max_memory_entries: int = 10_000,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        model_name: Optional[str] = None,
+    ):
+        self.embedder = embedder
+        self.model_name = model_name or embedder_model_name(embedder)
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: LRUCache[Tuple[float, ...]] = LRUCache(max_memory_entries)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.provider_calls = 0
+
+        if cache_path:
+            self._open(cache_path)
+
+    def _open(self, cache_path: str) -> None:
+        parent = os.path.dirname(os.path.abspath(cache_path))
+        os.makedirs(parent, exist_ok=True)
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vec BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL, atime REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_atime ON embeddings(atime)")
+        row = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+        self._disk_bytes = int(row[0])
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        h = hashlib.sha256()
+        h.update(self.model_name.encode("utf-8"))
+        h.update(b"\x00")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def _disk_get(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        if self._db is None or not keys:
+            return found
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                part = list(keys[i : i + _SQL_BATCH])
+                marks = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embeddings SET atime = ? WHERE key = ?", [(now, k) for k in found]
+                )
+                self._db.commit()
+        return found
+
+    def _disk_put(self, items: Dict[str, Tuple[float, ...]]) -> None:
+        if self._db is None or not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vec in items.items():
+            blob = array("f", vec).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec, nbytes, atime) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._disk_bytes += sum(r[2] for r in rows)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        assert self._db is not None
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        # Recount: INSERT OR REPLACE of existing keys over-counts the running total
+        row = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+        self._disk_bytes = int(row[0])
+        while self._disk_bytes > self.max_disk_bytes:
+            victims = self._db.execute(
+                "SELECT key, nbytes FROM embeddings ORDER BY atime LIMIT ?", (_SQL_BATCH,)
+            ).fetchall()
+            if not victims:
+                break
+            dropped = []
+            for key, nbytes in victims:
+                dropped.append((key,))
+                self._disk_bytes -= nbytes
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", dropped)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return embeddings for ``texts``, sending only cache misses to the wrapped provider.
+
+        Cached vectors are stored as tuples and every call returns fresh lists, so callers
+        may mutate the result without touching the cache.
+        """
+        keys = [self._key(t) for t in texts]
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        memory_hits = disk_hits = 0
+
+        pending: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            vec = self._memory.get(key)
+            if vec is not None:
+                out[i] = list(vec)
+                memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            for key, found in self._disk_get(list(pending)).items():
+                vec = tuple(found)
+                self._memory.put(key, vec)
+                for i in pending.pop(key):
+                    out[i] = list(vec)
+                    disk_hits += 1
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            if pending:
+                self.misses += sum(len(idx) for idx in pending.values())
+                self.provider_calls += 1
+
+        if pending:
+            miss_keys = list(pending)
+            miss_texts = [texts[pending[k][0]] for k in miss_keys]
+            vectors = self.embedder.embed(miss_texts)
+            if len(vectors) != len(miss_texts):
+                raise EmbeddingError(
+                    f"Provedor retornou {len(vectors)} embeddings para {len(miss_texts)} textos"
+                )
+            fresh: Dict[str, Tuple[float, ...]] = {}
+            for key, raw in zip(miss_keys, vectors):
+                vec = tuple(raw)
+                fresh[key] = vec
+                self._memory.put(key, vec)
+                for i in pending[key]:
+                    out[i] = list(vec)
+            self._disk_put(fresh)
+
+        return out  # type: ignore[return-value]
+
+    def warmup(self) -> bool:
+        """Warm up the wrapped provider (bypassing the cache) if it supports it."""
+        warmup = getattr(self.embedder, "warmup", None)
+        return bool(warmup()) if callable(warmup) else False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers and the size of the persistent tier."""
+        with self._lock:
+            memory_hits, disk_hits = self.memory_hits, self.disk_hits
+            misses, provider_calls = self.misses, self.provider_calls
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "provider_calls": provider_calls,
+            "hit_rate": (memory_hits + disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def close(self) -> None:
+        """Close the persistent tier."""
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
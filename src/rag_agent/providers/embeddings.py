@@ -1,43 +1,215 @@
 """Embedding provider implementations."""
 
-from typing import List
+import functools
+from typing import Any, Callable, List, Optional
 
 from ..core.exceptions import EmbeddingError
+from ..utils.tokenization import get_tokenizer
+from .registry import WARMUP_TEXT, ModelRegistry, load_shared
+
+# OpenAI embeddings endpoint limits per request
+OPENAI_MAX_BATCH_ITEMS = 2048
+OPENAI_MAX_BATCH_TOKENS = 300_000
+
+
+def _token_counter(model: str) -> Callable[[str], int]:
+    return get_tokenizer(model).count
+
+
+def batch_by_limits(
+    texts: List[str],
+    count_tokens: Callable[[str], int],
+    max_items: int,
+    max_tokens: int,
+) -> List[List[int]]:
+    """
+    Group text indexes into consecutive batches that respect item and token limits.
+
+    Args:
+        texts: Texts to split
+        count_tokens: Function returning the token count of a text
+        max_items: Maximum number of texts per batch
+        max_tokens: Maximum summed token count per batch
+
+    Returns:
+        List of batches, each a list of indexes into ``texts`` in input order
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if current and (len(current) >= max_items or tokens + n > max_tokens):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
 
 
 class OpenAIEmbedding:
-    """OpenAI embedding provider using text-embedding-3-small by default."""
+    """
+    OpenAI embedding provider using text-embedding-3-small by default.
 
-    def __init__(self, model: str = "text-embedding-3-small"):
+    Inputs are split into batches that respect the endpoint item and token limits;
+    batches are sent concurrently and results are returned in input order. ``aembed``
+    does the same on the event loop through the async OpenAI client.
+
+    Args:
+        model: Embedding model name
+        max_batch_items: Maximum number of inputs per request
+        max_batch_tokens: Maximum summed input tokens per request
+        max_concurrency: Maximum number of requests in flight
+    """
+
+    def __init__(
+        self,
+        model: str = "text-embedding-3-small",
+        max_batch_items: int = OPENAI_MAX_BATCH_ITEMS,
+        max_batch_tokens: int = OPENAI_MAX_BATCH_TOKENS,
+        max_concurrency: int = 4,
+    ):
         from openai import OpenAI
 
         self.client = OpenAI()
         self.model = model
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self._count_tokens: Optional[Callable[[str], int]] = None
+        self._async_client: Any = None
+
+    def _batches(self, texts: List[str]) -> List[List[int]]:
+        if self._count_tokens is None:
+            self._count_tokens = _token_counter(self.model)
+        return batch_by_limits(
+            texts, self._count_tokens, self.max_batch_items, self.max_batch_tokens
+        )
+
+    @staticmethod
+    def _reassemble(
+        n: int, batches: List[List[int]], results: List[List[List[float]]]
+    ) -> List[List[float]]:
+        out: List[List[float]] = [[] for _ in range(n)]
+        for batch, vectors in zip(batches, results):
+            for i, vec in zip(batch, vectors):
+                out[i] = vec
+        return out
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        resp = self.client.embeddings.create(model=self.model, input=texts)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using OpenAI API."""
+        if not texts:
+            return []
+        try:
+            batches = self._batches(texts)
+            payloads = [[texts[i] for i in batch] for batch in batches]
+            if len(payloads) == 1 or self.max_concurrency == 1:
+                results = [self._embed_batch(p) for p in payloads]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+
+                workers = min(self.max_concurrency, len(payloads))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(self._embed_batch, payloads))
+        except Exception as e:
+            raise EmbeddingError(f"OpenAI embedding failed: {e}")
+        return self._reassemble(len(texts), batches, results)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using the async OpenAI client."""
+        if not texts:
+            return []
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI()
+        import asyncio
+
+        client = self._async_client
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def one(payload: List[str]) -> List[List[float]]:
+            async with sem:
+                resp = await client.embeddings.create(model=self.model, input=payload)
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
         try:
-            resp = self.client.embeddings.create(model=self.model, input=texts)
-            return [d.embedding for d in resp.data]
+            batches = self._batches(texts)
+            results = await asyncio.gather(*(one([texts[i] for i in b]) for b in batches))
         except Exception as e:
             raise EmbeddingError(f"OpenAI embedding failed: {e}")
+        return self._reassemble(len(texts), batches, list(results))
 
 
 class SentenceTransformerEmbedding:
-    """Local embedding provider using SentenceTransformers."""
+    """
+    Local embedding provider using SentenceTransformers.
+
+    Instances with the same model name and device share one loaded model through the
+    model registry; it is unloaded once every instance is closed or garbage collected.
+
+    Args:
+        model_name: SentenceTransformers checkpoint
+        device: Torch device (None lets the library choose)
+        registry: Model registry (defaults to the process-wide ``MODEL_REGISTRY``)
+        shared: False loads a private copy outside the registry
+        warmup: Run :meth:`warmup` right after loading
+    """
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        device: Optional[str] = None,
+        registry: Optional[ModelRegistry] = None,
+        shared: bool = True,
+        warmup: bool = False,
+    ):
         try:
             from sentence_transformers import SentenceTransformer
         except ImportError as e:
             raise EmbeddingError(f"sentence-transformers não instalado: {e}")
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model, self._handle = load_shared(
+            self,
+            "sentence_transformer",
+            model_name,
+            lambda: SentenceTransformer(model_name, device=device),
+            registry,
+            shared,
+            device=device,
+        )
+        if warmup:
+            self.warmup()
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings using local SentenceTransformer model."""
         try:
             return self.model.encode(
-                texts, convert_to_numpy=False, normalize_embeddings=True
+                texts, convert_to_numpy=True, normalize_embeddings=True
             ).tolist()
         except Exception as e:
             raise EmbeddingError(f"ST embedding failed: {e}")
+
+    def warmup(self) -> bool:
+        """
+        Embed a dummy batch so the first real call doesn't pay lazy initialization.
+
+        Runs once per shared model. Returns False if the model was already warm.
+        """
+        run = functools.partial(self.embed, [WARMUP_TEXT])
+        if self._handle is None:
+            run()
+            return True
+        return self._handle.warmup(run)
+
+    def close(self) -> None:
+        """Release this instance's reference to the shared model."""
+        if self._handle is not None:
+            self._handle.release()
+        self.model = None
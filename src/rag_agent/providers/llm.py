@@ -1,5 +1,9 @@
 """Language model provider implementations."""
 
+import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
 from ..core.exceptions import LLMError
 
 
@@ -11,6 +15,19 @@ class OpenAIChat:
 
         self.client = OpenAI()
         self.model = model
+        self._async_client: Any = None
+
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "Responda somente com base no contexto. Se não houver informação "
+                    "suficiente, diga explicitamente que não foi encontrado no documento."
+                ),
+            },
+            {"role": "user", "content": prompt},
+        ]
 
     def answer(self, prompt: str) -> str:
         """Generate response using OpenAI Chat API."""
@@ -18,50 +35,230 @@ class OpenAIChat:
             resp = self.client.chat.completions.create(
                 model=self.model,
                 temperature=0.0,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Responda somente com base no contexto. Se não houver informação suficiente, diga explicitamente que não foi encontrado no documento.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                messages=self._messages(prompt),
             )
             return resp.choices[0].message.content or ""
         except Exception as e:
             raise LLMError(f"OpenAI chat failed: {e}")
 
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream response fragments from the OpenAI Chat API."""
+        try:
+            resp = self.client.chat.completions.create(
+                model=self.model,
+                temperature=0.0,
+                messages=self._messages(prompt),
+                stream=True,
+            )
+        except Exception as e:
+            raise LLMError(f"OpenAI chat failed: {e}")
+        try:
+            for chunk in resp:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise LLMError(f"OpenAI chat failed: {e}")
+        finally:
+            close = getattr(resp, "close", None)
+            if close is not None:
+                close()
+
+    async def aanswer(self, prompt: str) -> str:
+        """Generate response using the async OpenAI Chat API."""
+        try:
+            if self._async_client is None:
+                from openai import AsyncOpenAI
+
+                self._async_client = AsyncOpenAI()
+            resp = await self._async_client.chat.completions.create(
+                model=self.model,
+                temperature=0.0,
+                messages=self._messages(prompt),
+            )
+            return resp.choices[0].message.content or ""
+        except Exception as e:
+            raise LLMError(f"OpenAI chat failed: {e}")
+
+
+_SESSIONS: Dict[Tuple[int, int], Any] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _shared_session(pool_maxsize: int, max_retries: int) -> Any:
+    """Return the process-wide pooled ``requests.Session`` for the given pool settings."""
+    key = (pool_maxsize, max_retries)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=0,
+                backoff_factor=0.2,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[key] = session
+        return session
+
 
 class OllamaChat:
-    """Local LLM provider via Ollama (http://localhost:11434)."""
+    """Local LLM provider via Ollama (http://localhost:11434).
+
+    Requests go through a process-wide pooled keep-alive session shared by every
+    instance with the same pool settings. ``aanswer`` uses a lazily created
+    ``httpx.AsyncClient`` (``pip install httpx``), which is bound to the event loop
+    of its first call.
+
+    Args:
+        model: Ollama model tag
+        host: Ollama server URL
+        keep_alive: How long Ollama keeps the model loaded after a request (e.g. "10m",
+            -1 for forever); None leaves the server default
+        num_ctx: Fixed context window; None sizes it from the prompt length, rounded up
+            to a power of two between 2048 and ``max_ctx`` so the model is only reloaded
+            when a prompt crosses a bucket
+        max_ctx: Upper bound for the automatically sized context window
+        num_predict: Maximum number of generated tokens (None = unlimited)
+        pool_maxsize: Maximum pooled connections to the server
+        max_retries: Retries for connection failures and 502/503/504 responses
+        timeout: Request timeout in seconds
+    """
 
-    def __init__(self, model: str = "llama3.1:8b", host: str = "http://localhost:11434"):
-        import requests
+    SYSTEM_PROMPT = (
+        "Responda SOMENTE com base no contexto. Se não houver informação suficiente no "
+        "contexto, diga: 'Não encontrado nos documentos.'"
+    )
 
-        self.requests = requests
+    def __init__(
+        self,
+        model: str = "llama3.1:8b",
+        host: str = "http://localhost:11434",
+        keep_alive: Optional[Union[str, int]] = "10m",
+        num_ctx: Optional[int] = None,
+        max_ctx: int = 8192,
+        num_predict: Optional[int] = None,
+        pool_maxsize: int = 10,
+        max_retries: int = 2,
+        timeout: float = 120,
+    ):
+        self.session = _shared_session(pool_maxsize, max_retries)
         self.model = model
         self.url = f"{host}/api/chat"
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.max_ctx = max_ctx
+        self.num_predict = num_predict
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._async_client: Any = None
+
+    def _context_size(self, prompt: str) -> int:
+        if self.num_ctx is not None:
+            return self.num_ctx
+        # ~3 characters per token for Portuguese, plus chat template overhead
+        needed = len(self.SYSTEM_PROMPT) // 3 + len(prompt) // 3 + 64 + (self.num_predict or 512)
+        size = 2048
+        while size < needed and size < self.max_ctx:
+            size *= 2
+        return min(size, self.max_ctx)
+
+    def _payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"temperature": 0.0, "num_ctx": self._context_size(prompt)}
+        if self.num_predict is not None:
+            options["num_predict"] = self.num_predict
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "stream": stream,
+            "options": options,
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
 
     def answer(self, prompt: str) -> str:
         """Generate response using local Ollama model."""
         try:
-            r = self.requests.post(
-                self.url,
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "Responda SOMENTE com base no contexto. Se não houver informação suficiente no contexto, diga: 'Não encontrado nos documentos.'",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    "stream": False,
-                    "options": {"temperature": 0.0},
-                },
-                timeout=120,
+            r = self.session.post(self.url, json=self._payload(prompt), timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+            content: str = data.get("message", {}).get("content", "")
+            return content
+        except Exception as e:
+            raise LLMError(f"Ollama chat failed: {e}")
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream response fragments from the local Ollama model."""
+        try:
+            r = self.session.post(
+                self.url, json=self._payload(prompt, stream=True), timeout=self.timeout, stream=True
             )
             r.raise_for_status()
+        except Exception as e:
+            raise LLMError(f"Ollama chat failed: {e}")
+        try:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise LLMError(f"Ollama chat failed: {data['error']}")
+                content = data.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if data.get("done"):
+                    break
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(f"Ollama chat failed: {e}")
+        finally:
+            # Dropping the connection makes Ollama stop generating
+            r.close()
+
+    async def aanswer(self, prompt: str) -> str:
+        """Generate response using local Ollama model without blocking the event loop."""
+        try:
+            if self._async_client is None:
+                import httpx
+
+                self._async_client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize,
+                        max_keepalive_connections=self.pool_maxsize,
+                    ),
+                    transport=httpx.AsyncHTTPTransport(retries=self.max_retries),
+                )
+            r = await self._async_client.post(self.url, json=self._payload(prompt))
+            r.raise_for_status()
             data = r.json()
-            return data.get("message", {}).get("content", "")
+            content: str = data.get("message", {}).get("content", "")
+            return content
         except Exception as e:
             raise LLMError(f"Ollama chat failed: {e}")
+
+    async def aclose(self) -> None:
+        """Close the async HTTP client, if one was created."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -0,0 +1,179 @@
+"""Process-wide registry of loaded local models, shared by reference count."""
+
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ModelKey = Tuple[str, str, Tuple[Tuple[str, Any], ...]]
+
+# Input of the dummy batch providers run in ``warmup()``
+WARMUP_TEXT = "warm-up"
+
+
+def model_key(kind: str, model_name: str, **options: Any) -> ModelKey:
+    """Registry key: model class, checkpoint name and the options it is loaded with."""
+    return (kind, model_name, tuple(sorted(options.items())))
+
+
+class _Entry:
+    __slots__ = ("model", "refs", "lock", "load_seconds", "warm")
+
+    def __init__(self) -> None:
+        self.model: Any = None
+        self.refs = 0
+        self.lock = threading.Lock()
+        self.load_seconds = 0.0
+        self.warm = False
+
+
+class ModelHandle:
+    """
+    One reference to a registry model. Release it when the owner is done.
+
+    Args:
+        registry: Registry holding the model
+        key: Registry key of the model
+        model: The loaded model
+    """
+
+    def __init__(self, registry: "ModelRegistry", key: ModelKey, model: Any):
+        self.registry = registry
+        self.key = key
+        self.model = model
+        self._released = False
+
+    def warmup(self, run: Callable[[], Any]) -> bool:
+        """Run ``run`` once per loaded model. Returns False if it was already warm."""
+        return self.registry._warmup(self.key, run)
+
+    def release(self) -> None:
+        """Drop this reference (idempotent); the model unloads with the last one."""
+        if not self._released:
+            self._released = True
+            self.registry.release(self.key)
+
+
+class ModelRegistry:
+    """
+    Loads each ``(kind, model name, options)`` once and shares it between providers.
+
+    Every :meth:`acquire` adds a reference and the model is unloaded when the last
+    one is released. Loads of different models run in parallel; concurrent requests
+    for the same model wait for a single load.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[ModelKey, _Entry] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def acquire(self, key: ModelKey, loader: Callable[[], Any]) -> ModelHandle:
+        """
+        Return a handle to the model under ``key``, calling ``loader()`` if not loaded.
+
+        Raises:
+            Exception: Whatever ``loader`` raises (the failed load is not cached)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.refs += 1
+        try:
+            with entry.lock:
+                if entry.model is None:
+                    t0 = time.perf_counter()
+                    entry.model = loader()
+                    entry.load_seconds = time.perf_counter() - t0
+                    with self._lock:
+                        self.loads += 1
+        except BaseException:
+            self.release(key)
+            raise
+        return ModelHandle(self, key, entry.model)
+
+    def release(self, key: ModelKey) -> bool:
+        """
+        Drop one reference to ``key``.
+
+        Returns:
+            True if that was the last reference and the model was unloaded
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry.refs -= 1
+            if entry.refs > 0:
+                return False
+            del self._entries[key]
+        return True
+
+    def _warmup(self, key: ModelKey, run: Callable[[], Any]) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+        with entry.lock:
+            if entry.warm:
+                return False
+            run()
+            entry.warm = True
+        return True
+
+    def get(self, key: ModelKey) -> Optional[Any]:
+        """The loaded model under ``key``, or None (does not add a reference)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.model if entry is not None else None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """One row per loaded model: key parts, reference count, load time and warm state."""
+        with self._lock:
+            items = list(self._entries.items())
+        return [
+            {
+                "kind": key[0],
+                "model": key[1],
+                "options": dict(key[2]),
+                "refs": entry.refs,
+                "load_seconds": round(entry.load_seconds, 3),
+                "warm": entry.warm,
+            }
+            for key, entry in items
+            if entry.model is not None
+        ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for e in self._entries.values() if e.model is not None)
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+def load_shared(
+    owner: Any,
+    kind: str,
+    model_name: str,
+    loader: Callable[[], Any],
+    registry: Optional[ModelRegistry] = None,
+    shared: bool = True,
+    **options: Any,
+) -> Tuple[Any, Optional[ModelHandle]]:
+    """
+    Load a model for ``owner``, through the registry unless ``shared`` is False.
+
+    The reference is released when ``owner`` is garbage collected (or earlier through
+    the returned handle).
+
+    Returns:
+        ``(model, handle)``; ``handle`` is None for a private copy
+    """
+    if not shared:
+        return loader(), None
+    registry = registry if registry is not None else MODEL_REGISTRY
+    handle = registry.acquire(model_key(kind, model_name, **options), loader)
+    weakref.finalize(owner, handle.release)
+    return handle.model, handle
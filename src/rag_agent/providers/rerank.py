@@ -0,0 +1,88 @@
+"""Local cross-encoder reranking of retrieved chunks."""
+
+import functools
+from typing import List, Optional
+
+from ..core.exceptions import RetrievalError
+from .registry import WARMUP_TEXT, ModelRegistry, load_shared
+
+
+class CrossEncoderReranker:
+    """
+    Scores ``(query, passage)`` pairs with a local SentenceTransformers cross-encoder.
+
+    All passages for a query are scored in one batched forward pass, so reranking a
+    few dozen candidates costs a single model call on CPU. Instances with the same
+    checkpoint, ``max_length`` and device share one loaded model through the model
+    registry.
+
+    Args:
+        model_name: Cross-encoder checkpoint
+        batch_size: Pairs per forward pass
+        max_length: Maximum tokens per ``(query, passage)`` pair (longer pairs are truncated)
+        device: Torch device (``"cpu"`` by default; None lets the library choose)
+        registry: Model registry (defaults to the process-wide ``MODEL_REGISTRY``)
+        shared: False loads a private copy outside the registry
+        warmup: Run :meth:`warmup` right after loading
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        max_length: int = 512,
+        device: Optional[str] = "cpu",
+        registry: Optional[ModelRegistry] = None,
+        shared: bool = True,
+        warmup: bool = False,
+    ):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise RetrievalError(f"sentence-transformers não instalado: {e}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model, self._handle = load_shared(
+            self,
+            "cross_encoder",
+            model_name,
+            lambda: CrossEncoder(model_name, max_length=max_length, device=device),
+            registry,
+            shared,
+            max_length=max_length,
+            device=device,
+        )
+        if warmup:
+            self.warmup()
+
+    def score(self, query: str, passages: List[str]) -> List[float]:
+        """Return one relevance score per passage (higher is more relevant)."""
+        if not passages:
+            return []
+        try:
+            scores = self.model.predict(
+                [(query, p) for p in passages],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+        except Exception as e:
+            raise RetrievalError(f"Falha no reranking: {e}")
+        return [float(s) for s in scores]
+
+    def warmup(self) -> bool:
+        """
+        Score a dummy pair so the first real rerank doesn't pay lazy initialization.
+
+        Runs once per shared model. Returns False if the model was already warm.
+        """
+        run = functools.partial(self.score, WARMUP_TEXT, [WARMUP_TEXT])
+        if self._handle is None:
+            run()
+            return True
+        return self._handle.warmup(run)
+
+    def close(self) -> None:
+        """Release this instance's reference to the shared model."""
+        if self._handle is not None:
+            self._handle.release()
+        self.model = None
@@ -0,0 +1,653 @@
+"""Threaded HTTP server for a RagAgent: ask, streaming ask, ingest, health and metrics."""
+
+import argparse
+import itertools
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .core.agent import RagAgent
+from .core.exceptions import (
+    AnswerNotFoundError,
+    EmbeddingError,
+    IndexNotReadyError,
+    IngestionError,
+    LLMError,
+    RagError,
+    RetrievalError,
+)
+from .storage.filters import scoped_where
+from .utils.ingestion import ingest_file
+from .utils.logging import setup_logger
+from .utils.manifest import IngestManifest
+from .utils.metrics import CONTENT_TYPE, REGISTRY, MetricsRegistry
+
+log = setup_logger("rag")
+
+# HTTP status per agent error (first match wins); other RagErrors are 500
+_ERROR_STATUS: Tuple[Tuple[Any, int], ...] = (
+    (AnswerNotFoundError, 404),
+    (IndexNotReadyError, 503),
+    (IngestionError, 422),
+    ((RetrievalError, EmbeddingError, LLMError), 502),
+)
+
+_ROUTES = ("/ask", "/ask/stream", "/ingest", "/healthz", "/readyz", "/metrics")
+
+# Seconds between shutdown checks of the accept loop
+_POLL_INTERVAL = 0.1
+
+# Extensions kept for text sent inline to /ingest (anything else is stored as .txt)
+_TEXT_SUFFIXES = (".txt", ".md")
+
+
+def _error_status(error: Exception) -> int:
+    """HTTP status answering a failed request."""
+    for types, status in _ERROR_STATUS:
+        if isinstance(error, types):
+            return status
+    return 500
+
+
+class ConcurrencyLimiter:
+    """
+    Admits at most ``max_inflight`` requests at a time, with up to ``max_queue`` waiting.
+
+    Requests beyond the queue are rejected at once (``"queue_full"``); queued requests
+    that don't get a slot within ``queue_timeout`` seconds are rejected too
+    (``"queue_timeout"``).
+
+    Args:
+        max_inflight: Requests processed concurrently
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Maximum wait for a slot in seconds (None = wait indefinitely)
+    """
+
+    def __init__(
+        self, max_inflight: int = 8, max_queue: int = 32, queue_timeout: Optional[float] = 10.0
+    ):
+        if max_inflight <= 0:
+            raise ValueError("max_inflight precisa ser maior que zero.")
+        if max_queue < 0:
+            raise ValueError("max_queue não pode ser negativo.")
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Optional[str]:
+        """
+        Wait for a slot.
+
+        Returns:
+            None once admitted, otherwise the rejection reason
+        """
+        with self._cond:
+            if self.in_flight < self.max_inflight and not self.queued:
+                self.in_flight += 1
+                return None
+            if self.queued >= self.max_queue:
+                return "queue_full"
+            self.queued += 1
+            try:
+                admitted = self._cond.wait_for(
+                    lambda: self.in_flight < self.max_inflight, self.queue_timeout
+                )
+            finally:
+                self.queued -= 1
+                self._cond.notify_all()
+            if not admitted:
+                return "queue_timeout"
+            self.in_flight += 1
+            return None
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no request is running or queued. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.in_flight and not self.queued, timeout)
+
+
+class _HTTPError(Exception):
+    """Request rejected before reaching the agent (bad body, unknown route...)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _question_args(body: Dict[str, Any]) -> Tuple[str, Any, Any]:
+    question = body.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise _HTTPError(400, "Campo 'question' obrigatório.")
+    where = body.get("where")
+    if where is not None and not isinstance(where, dict):
+        raise _HTTPError(400, "Campo 'where' precisa ser um objeto.")
+    source = body.get("source")
+    if source is not None and not (
+        isinstance(source, str)
+        or (isinstance(source, list) and all(isinstance(s, str) for s in source))
+    ):
+        raise _HTTPError(400, "Campo 'source' precisa ser texto ou lista de textos.")
+    try:
+        scoped_where(where, source)
+    except ValueError as e:
+        raise _HTTPError(400, str(e)) from None
+    return question, where, source
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; streamed responses use chunked encoding
+    server: "_HTTPServer"
+
+    status = 0
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # requests are counted in metrics; the agent logs each question
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        self.status = code
+        super().send_response(code, message)
+
+    def send_json(
+        self,
+        status: int,
+        body: Any,
+        rid: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        data = _dumps(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if rid is not None:
+            self.send_header("X-Request-ID", rid)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, error: Exception, rid: Optional[str] = None) -> None:
+        name = HTTPStatus(status).phrase if isinstance(error, _HTTPError) else type(error).__name__
+        body = {"error": name, "message": str(error)}
+        if rid is not None:
+            body["request_id"] = rid
+        self.send_json(status, body, rid)
+
+    def write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def read_json(self) -> Optional[Dict[str, Any]]:
+        """Parse the request body; sends the error response and returns None if invalid."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > self.server.app.max_body_bytes:
+            self.close_connection = True  # the body is left unread
+            status = 400 if length < 0 else 413
+            self.send_error_json(
+                status, _HTTPError(status, "Content-Length inválido ou grande demais.")
+            )
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self.send_error_json(400, _HTTPError(400, "Corpo precisa ser um objeto JSON."))
+            return None
+        return body
+
+    def _handle(self, method: str) -> None:
+        route = self.path.split("?", 1)[0]
+        label = route if route in _ROUTES else "other"
+        self.status = 0  # the handler instance is reused across keep-alive requests
+        t0 = time.perf_counter()
+        try:
+            self.server.app._route(self, method, route)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            log.error(
+                "Falha no servidor HTTP",
+                extra={"extra": {"event": "http_error", "route": route, "err": repr(e)}},
+            )
+            if not self.status:
+                self.send_error_json(500, _HTTPError(500, "Erro interno."))
+            self.close_connection = True
+        finally:
+            self.server.app._observe(label, self.status, time.perf_counter() - t0)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog; admission control happens per request
+
+    def __init__(self, address: Tuple[str, int], app: "RagServer"):
+        self.app = app
+        super().__init__(address, _Handler)
+
+
+class RagServer:
+    """
+    Threaded HTTP front end for a :class:`RagAgent`, built on the standard library.
+
+    Routes:
+        ``POST /ask``: ``{"question", "where"?, "source"?, "request_id"?}`` -> the
+        :meth:`RagAgent.ask` result.
+        ``POST /ask/stream``: same body; NDJSON events of :meth:`RagAgent.ask_stream`.
+        ``POST /ingest``: ``{"text", "source"}`` or ``{"path"}`` (relative to
+        ``ingest_root``), plus optional ``tenant``, ``metadata``, ``max_chars`` and
+        ``overlap``.
+        ``GET /healthz``, ``GET /readyz``, ``GET /metrics`` (Prometheus text).
+
+    ``/ask`` and ``/ask/stream`` share one :class:`ConcurrencyLimiter`; ``/ingest`` runs
+    one document at a time behind its own, so ingestion never holds question slots.
+    A full queue is answered with 429 and a queue timeout (or a draining server) with
+    503, both with ``Retry-After``. Agent errors map to 404 (answer not found), 502
+    (embedding, retrieval or LLM failure), 422 (ingestion) and 503 (index not ready).
+
+    Args:
+        agent: Agent answering the questions (its store receives ingested documents)
+        host: Bind address
+        port: Bind port (0 picks a free one; see :attr:`url`)
+        max_inflight: Requests processed concurrently
+        max_queue: Requests allowed to wait for a slot
+        queue_timeout: Maximum wait for a slot in seconds
+        max_ingest_queue: ``/ingest`` requests allowed to wait for the running one
+        manifest: Manifest for incremental ``/ingest`` (unchanged documents are skipped)
+        ingest_root: Directory ``/ingest`` may read ``path`` from (None disables paths)
+        max_body_bytes: Largest accepted request body
+        warmup: Run :meth:`RagAgent.warmup` before reporting ready
+        registry: Registry for the HTTP metrics and ``/metrics`` (defaults to ``REGISTRY``)
+    """
+
+    def __init__(
+        self,
+        agent: RagAgent,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_inflight: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 10.0,
+        max_ingest_queue: int = 8,
+        manifest: Optional[IngestManifest] = None,
+        ingest_root: Optional[str] = None,
+        max_body_bytes: int = 10 * 1024 * 1024,
+        warmup: bool = True,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.agent = agent
+        self.limiter = ConcurrencyLimiter(max_inflight, max_queue, queue_timeout)
+        # The manifest and BM25 flushes aren't concurrent: one ingestion at a time
+        self.ingest_limiter = ConcurrencyLimiter(1, max_ingest_queue, queue_timeout)
+        self.manifest = manifest
+        self.ingest_root = os.path.realpath(ingest_root) if ingest_root else None
+        self.max_body_bytes = max_body_bytes
+        self.warmup = warmup
+        self.ready = False
+        self.draining = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.registry = registry if registry is not None else REGISTRY
+        self._requests = self.registry.counter(
+            "rag_http_requests_total", "Requisições HTTP, por rota e status.", ["route", "status"]
+        )
+        self._latency = self.registry.histogram(
+            "rag_http_request_seconds", "Latência das requisições HTTP.", ["route"]
+        )
+        self._rejected = self.registry.counter(
+            "rag_http_rejected_total", "Requisições recusadas por sobrecarga.", ["reason"]
+        )
+        self._queue_wait = self.registry.histogram(
+            "rag_http_queue_seconds", "Espera na fila de admissão."
+        )
+        self._httpd = _HTTPServer((host, port), self)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{str(host)}:{port}"
+
+    def _prepare(self) -> None:
+        if self.warmup:
+            self.agent.warmup()
+        self.ready = True
+        log.info("Servidor HTTP pronto", extra={"extra": {"event": "http_ready", "url": self.url}})
+
+    def start(self) -> "RagServer":
+        """Warm up, then serve from a background thread."""
+        self._prepare()
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(_POLL_INTERVAL,), name="rag-http", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Warm up, then serve on the calling thread until :meth:`shutdown`."""
+        self._prepare()
+        self._httpd.serve_forever(_POLL_INTERVAL)
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> bool:
+        """
+        Stop accepting requests and wait for the admitted ones to finish.
+
+        Must be called from another thread than :meth:`serve_forever`.
+
+        Returns:
+            False if requests were still running after ``timeout`` seconds
+        """
+        self.ready = False
+        self.draining = True
+        self._httpd.shutdown()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        idle = self.limiter.wait_idle(timeout)
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        idle = self.ingest_limiter.wait_idle(remaining) and idle
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        return idle
+
+    def __enter__(self) -> "RagServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+
+    # -- request handling -------------------------------------------------
+
+    def _observe(self, route: str, status: int, seconds: float) -> None:
+        self._requests.inc(route=route, status=str(status))
+        self._latency.observe(seconds, route=route)
+
+    def _route(self, h: _Handler, method: str, route: str) -> None:
+        if method == "GET":
+            if route == "/healthz":
+                h.send_json(200, {"status": "ok"})
+            elif route == "/readyz":
+                self._readyz(h)
+            elif route == "/metrics":
+                data = self.registry.render().encode("utf-8")
+                h.send_response(200)
+                h.send_header("Content-Type", CONTENT_TYPE)
+                h.send_header("Content-Length", str(len(data)))
+                h.end_headers()
+                h.wfile.write(data)
+            elif route in _ROUTES:
+                h.send_error_json(405, _HTTPError(405, f"Use POST em {route}."))
+            else:
+                h.send_error_json(404, _HTTPError(404, f"Rota desconhecida: {route}"))
+            return
+
+        work = {"/ask": self._ask, "/ask/stream": self._ask_stream, "/ingest": self._ingest}
+        handler = work.get(route)
+        if handler is None:
+            status = 405 if route in _ROUTES else 404
+            h.close_connection = True  # the body is left unread
+            h.send_error_json(status, _HTTPError(status, f"Rota inválida para POST: {route}"))
+            return
+        body = h.read_json()
+        if body is None:
+            return
+        rid = str(body.get("request_id") or h.headers.get("X-Request-ID") or uuid.uuid4())
+
+        limiter = self.ingest_limiter if route == "/ingest" else self.limiter
+        if self.draining:
+            reason: Optional[str] = "draining"
+        else:
+            t0 = time.perf_counter()
+            reason = limiter.acquire()
+            self._queue_wait.observe(time.perf_counter() - t0)
+        if reason is not None:
+            self._reject(h, reason, rid)
+            return
+        try:
+            handler(h, body, rid)
+        except _HTTPError as e:
+            h.send_error_json(e.status, e, rid)
+        finally:
+            limiter.release()
+
+    def _reject(self, h: _Handler, reason: str, rid: str) -> None:
+        self._rejected.inc(reason=reason)
+        log.info(
+            "Requisição recusada por sobrecarga",
+            extra={"extra": {"event": "http_rejected", "reason": reason, "rid": rid}},
+        )
+        status = 429 if reason == "queue_full" else 503
+        body = {"error": "Overloaded", "message": reason, "request_id": rid}
+        h.send_json(status, body, rid, {"Retry-After": "1"})
+
+    def _readyz(self, h: _Handler) -> None:
+        state = "ready" if self.ready else ("draining" if self.draining else "starting")
+        body = {
+            "status": state,
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            "ingesting": self.ingest_limiter.in_flight + self.ingest_limiter.queued,
+        }
+        h.send_json(200 if self.ready else 503, body)
+
+    def _ask(self, h: _Handler, body: Dict[str, Any], rid: str) -> None:
+        question, where, source = _question_args(body)
+        try:
+            result = self.agent.ask(question, request_id=rid, where=where, source=source)
+        except RagError as e:
+            h.send_error_json(_error_status(e), e, rid)
+            return
+        h.send_json(200, result, rid)
+
+    def _ask_stream(self, h: _Handler, body: Dict[str, Any], rid: str) -> None:
+        question, where, source = _question_args(body)
+        events = self.agent.ask_stream(question, request_id=rid, where=where, source=source)
+        try:
+            # Errors raised before the first event (retrieval, not found) get a real status
+            first = next(events)
+        except StopIteration:
+            first = None
+        except RagError as e:
+            h.send_error_json(_error_status(e), e, rid)
+            return
+        h.send_response(200)
+        h.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        h.send_header("Transfer-Encoding", "chunked")
+        h.send_header("X-Request-ID", rid)
+        h.end_headers()
+        try:
+            for event in itertools.chain([first] if first is not None else [], events):
+                h.write_chunk(_dumps(event) + b"\n")
+        except RagError as e:
+            error = {"type": "error", "error": type(e).__name__, "message": str(e)}
+            h.write_chunk(_dumps(error) + b"\n")
+        finally:
+            # Closing the generator cancels generation if the client went away
+            close = getattr(events, "close", None)
+            if close is not None:
+                close()
+        h.write_chunk(b"")
+
+    def _ingest_target(self, body: Dict[str, Any]) -> Tuple[str, str, bool]:
+        """``(path, source, temporary)`` of the document to ingest."""
+        if isinstance(body.get("text"), str):
+            source = body.get("source")
+            if not isinstance(source, str) or not os.path.basename(source):
+                raise _HTTPError(400, "Campo 'source' obrigatório com 'text'.")
+            suffix = os.path.splitext(source)[1].lower()
+            fd, path = tempfile.mkstemp(suffix=suffix if suffix in _TEXT_SUFFIXES else ".txt")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(body["text"])
+            return path, source, True
+        if isinstance(body.get("path"), str):
+            if self.ingest_root is None:
+                raise _HTTPError(400, "Ingestão por caminho desativada (configure ingest_root).")
+            path = os.path.realpath(os.path.join(self.ingest_root, body["path"]))
+            if not path.startswith(self.ingest_root + os.sep) or not os.path.isfile(path):
+                raise _HTTPError(400, f"Arquivo fora de ingest_root ou inexistente: {body['path']}")
+            source = body.get("source") or os.path.relpath(path, self.ingest_root)
+            return path, str(source), False
+        raise _HTTPError(400, "Informe 'text' e 'source', ou 'path'.")
+
+    def _ingest(self, h: _Handler, body: Dict[str, Any], rid: str) -> None:
+        options: Dict[str, Any] = {}
+        for key in ("max_chars", "overlap"):
+            if key in body:
+                if not isinstance(body[key], int) or body[key] < 0:
+                    raise _HTTPError(400, f"Campo '{key}' precisa ser um inteiro não negativo.")
+                options[key] = body[key]
+        tenant = body.get("tenant")
+        if tenant is not None and not isinstance(tenant, str):
+            raise _HTTPError(400, "Campo 'tenant' precisa ser texto.")
+        metadata = body.get("metadata")
+        if metadata is not None and not isinstance(metadata, dict):
+            raise _HTTPError(400, "Campo 'metadata' precisa ser um objeto.")
+        path, source, temporary = self._ingest_target(body)
+        try:
+            chunks = ingest_file(
+                path,
+                self.agent.store,
+                source_name=source,
+                manifest=self.manifest,
+                tenant=tenant,
+                extra_metadata=metadata,
+                **options,
+            )
+        except RagError as e:
+            h.send_error_json(_error_status(e), e, rid)
+            return
+        finally:
+            if temporary:
+                os.unlink(path)
+        h.send_json(200, {"request_id": rid, "source": source, "chunks": chunks}, rid)
+
+
+def _build_agent(args: argparse.Namespace) -> RagAgent:
+    from .providers.embeddings import OpenAIEmbedding, SentenceTransformerEmbedding
+    from .providers.llm import OllamaChat, OpenAIChat
+
+    embedder: Union[OpenAIEmbedding, SentenceTransformerEmbedding]
+    if args.embedder == "openai":
+        embedder = OpenAIEmbedding(args.embedding_model or "text-embedding-3-small")
+    else:
+        embedder = SentenceTransformerEmbedding(
+            args.embedding_model or "sentence-transformers/all-MiniLM-L6-v2"
+        )
+    if args.store == "numpy":
+        from .storage.numpy_store import NumpyStore
+
+        store: Any = NumpyStore(args.collection, embedder, persist_dir=args.persist_dir)
+    else:
+        from .storage.chroma_store import ChromaStore
+
+        store = ChromaStore(args.collection, embedder, persist_dir=args.persist_dir)
+    llm: Union[OpenAIChat, OllamaChat]
+    if args.llm == "openai":
+        llm = OpenAIChat(args.llm_model or "gpt-4o-mini")
+    else:
+        llm = OllamaChat(args.llm_model or "llama3.1:8b")
+    return RagAgent(store=store, llm=llm, top_k=args.top_k)
+
+
+def _serve_until_signal(server: RagServer, timeout: Optional[float] = 30.0) -> bool:
+    """
+    Serve on the main thread until SIGTERM or SIGINT, then drain the admitted requests.
+
+    The handler only starts :meth:`RagServer.shutdown` on another thread (it waits for
+    :meth:`RagServer.serve_forever` to return); the previous handlers are restored after.
+
+    Returns:
+        False if requests were still running after ``timeout`` seconds
+    """
+    drained: List[bool] = []
+    stopper: List[threading.Thread] = []
+
+    def drain(signum: int) -> None:
+        log.info(
+            "Encerrando servidor HTTP",
+            extra={"extra": {"event": "http_shutdown", "signal": signal.Signals(signum).name}},
+        )
+        drained.append(server.shutdown(timeout))
+
+    def stop(signum: int, frame: Any) -> None:
+        if not stopper:
+            stopper.append(threading.Thread(target=drain, args=(signum,), name="rag-http-stop"))
+            stopper[0].start()
+
+    previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        server.serve_forever()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    for t in stopper:
+        t.join()
+    return all(drained)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point (``rag-agent-serve`` / ``python -m rag_agent.server``)."""
+    parser = argparse.ArgumentParser(description="Servidor HTTP do RAG Agent.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--store", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--collection", default="docs")
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    parser.add_argument("--embedder", choices=["local", "openai"], default="local")
+    parser.add_argument("--embedding-model")
+    parser.add_argument("--llm", choices=["ollama", "openai"], default="ollama")
+    parser.add_argument("--llm-model")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-inflight", type=int, default=8, help="Requisições simultâneas")
+    parser.add_argument("--max-queue", type=int, default=32, help="Requisições em espera")
+    parser.add_argument("--queue-timeout", type=float, default=10.0, help="Espera máxima (s)")
+    parser.add_argument("--max-ingest-queue", type=int, default=8, help="Ingestões em espera")
+    parser.add_argument("--manifest", help="Manifesto para ingestão incremental")
+    parser.add_argument("--ingest-root", help="Diretório permitido para /ingest por caminho")
+    parser.add_argument("--no-warmup", action="store_true", help="Não aquece os modelos")
+    args = parser.parse_args(argv)
+
+    server = RagServer(
+        _build_agent(args),
+        host=args.host,
+        port=args.port,
+        max_inflight=args.max_inflight,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout,
+        max_ingest_queue=args.max_ingest_queue,
+        manifest=IngestManifest(args.manifest) if args.manifest else None,
+        ingest_root=args.ingest_root,
+        warmup=not args.no_warmup,
+    )
+    _serve_until_signal(server)
+
+
+if __name__ == "__main__":
+    main()
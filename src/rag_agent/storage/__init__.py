@@ -1,5 +1,34 @@
 """Vector storage implementations."""
 
-from .chroma_store import ChromaStore
+from typing import TYPE_CHECKING
 
-__all__ = ["ChromaStore"]
+from ..utils.lazy import attach
+
+if TYPE_CHECKING:
+    from .base import BaseVectorStore
+    from .bm25 import BM25Index
+    from .chroma_store import ChromaStore
+    from .filters import matches_where, normalize_where, scoped_where
+    from .numpy_store import NumpyStore
+
+_EXPORTS = {
+    "ChromaStore": ".chroma_store",
+    "NumpyStore": ".numpy_store",
+    "BaseVectorStore": ".base",
+    "BM25Index": ".bm25",
+    "normalize_where": ".filters",
+    "scoped_where": ".filters",
+    "matches_where": ".filters",
+}
+
+__getattr__, __dir__ = attach(__name__, _EXPORTS)
+
+__all__ = [
+    "ChromaStore",
+    "NumpyStore",
+    "BaseVectorStore",
+    "BM25Index",
+    "normalize_where",
+    "scoped_where",
+    "matches_where",
+]
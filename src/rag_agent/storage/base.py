@@ -0,0 +1,476 @@
+"""Backend-independent vector store behaviour (caching, hybrid fusion, async queries)."""
+
+import abc
+import contextvars
+import functools
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.protocols import EmbeddingProvider
+from ..utils.cache import LRUCache
+from ..utils.logging import setup_logger
+from ..utils.metrics import stage
+from ..utils.tracing import span
+from .bm25 import BM25Index
+from .filters import Where, matches_where, normalize_where, where_key
+
+QueryResult = Tuple[List[str], List[Dict[str, Any]], List[float]]
+# Query result plus the stored embedding of each hit
+VectorQueryResult = Tuple[List[str], List[Dict[str, Any]], List[float], List[Any]]
+# Dense hits for one query: (ids, documents, metadatas, cosine distances)
+DenseHits = Tuple[List[str], List[str], List[Dict[str, Any]], List[float]]
+
+log = setup_logger("rag")
+
+
+def _copy_result(result: Any) -> Tuple[List[Any], ...]:
+    """Copy a query result down to the per-hit metadata dicts and vectors."""
+    return tuple(
+        [item.copy() if hasattr(item, "copy") else item for item in part] for part in result
+    )
+
+
+class BaseVectorStore(abc.ABC):
+    """
+    Shared implementation of the store interface on top of a few backend primitives.
+
+    Subclasses implement ``_write``, ``_remove``, ``_dense_search_many``, ``_fetch``,
+    ``_count`` and ``_iter_documents``; this class provides ``upsert``/``delete``,
+    ``query``/``aquery``/``query_many``/``query_vectors``, the query result cache,
+    ``version`` tracking and optional BM25 hybrid retrieval.
+
+    Args:
+        name: Collection name
+        embedder: Embedding provider used for documents and queries
+        persist_dir: Directory holding the persisted collection
+        query_cache_size: Capacity of the query result cache (0 disables it)
+        query_cache_ttl: Seconds a cached query result stays valid (None = until the next write)
+        hybrid: Maintain a BM25 index and fuse lexical results into queries by default
+        hybrid_candidates: Candidates taken from each ranking before fusion
+        rrf_k: Reciprocal-rank fusion constant
+        bm25_save_interval: Minimum seconds between automatic index saves (see ``flush``)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        embedder: EmbeddingProvider,
+        persist_dir: str,
+        query_cache_size: int = 0,
+        query_cache_ttl: Optional[float] = 30.0,
+        hybrid: bool = False,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+        bm25_save_interval: float = 5.0,
+    ):
+        self.name = name
+        self.embedder = embedder
+        self.persist_dir = persist_dir
+        self.version = 0
+        self._query_cache: Optional[LRUCache[Any]] = (
+            LRUCache(query_cache_size, ttl=query_cache_ttl) if query_cache_size > 0 else None
+        )
+        self.hybrid = hybrid
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self.bm25_save_interval = bm25_save_interval
+        self.bm25: Optional[BM25Index] = None
+
+    # -- backend primitives -------------------------------------------------------------
+
+    @abc.abstractmethod
+    def _write(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: List[List[float]],
+    ) -> None:
+        """Insert or replace documents with their embeddings."""
+
+    @abc.abstractmethod
+    def _remove(self, ids: List[str]) -> None:
+        """Delete documents by ID (unknown IDs are ignored)."""
+
+    @abc.abstractmethod
+    def _dense_search_many(
+        self, vecs: List[List[float]], n: int, where: Optional[Where] = None
+    ) -> List[DenseHits]:
+        """Return the ``n`` nearest documents to each vector among those matching ``where``."""
+
+    @abc.abstractmethod
+    def _fetch(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any], Any]]:
+        """Return ``{id: (document, metadata, embedding)}`` for the IDs that exist."""
+
+    @abc.abstractmethod
+    def _count(self) -> int:
+        """Return the number of documents in the collection."""
+
+    @abc.abstractmethod
+    def _iter_documents(self, page_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+        """Yield ``(ids, documents)`` pages covering the whole collection."""
+
+    # -- lexical index ------------------------------------------------------------------
+
+    def _init_bm25(self) -> None:
+        """
+        Open the BM25 index and reconcile it with the collection; call once the backend is ready.
+
+        The saved index can lag behind the collection (a crash between throttled saves, or
+        writes made without ``hybrid=True``), so it is rebuilt whenever its document count
+        differs from the collection's.
+        """
+        if not self.hybrid:
+            return
+        self.bm25 = BM25Index(os.path.join(self.persist_dir, f"{self.name}.bm25.npz"))
+        indexed, count = len(self.bm25), self._count()
+        if indexed != count:
+            if indexed:
+                log.warning(
+                    "Índice BM25 divergente da coleção, reconstruindo",
+                    extra={
+                        "extra": {
+                            "event": "bm25_rebuild",
+                            "collection": self.name,
+                            "indexed": indexed,
+                            "documents": count,
+                        }
+                    },
+                )
+            self._rebuild_bm25()
+
+    def _rebuild_bm25(self, page_size: int = 5000) -> None:
+        """Re-index every document in the collection from scratch."""
+        assert self.bm25 is not None
+        self.bm25.clear()
+        for ids, docs in self._iter_documents(page_size):
+            self.bm25.add(ids, [d or "" for d in docs])
+        self.bm25.flush()
+
+    def flush(self) -> None:
+        """Persist pending index changes."""
+        if self.bm25 is not None:
+            self.bm25.flush()
+
+    # -- query cache --------------------------------------------------------------------
+
+    def _bump_version(self) -> None:
+        self.version += 1
+        if self._query_cache is not None:
+            self._query_cache.clear()
+
+    def _cache_key(
+        self,
+        version: int,
+        text: str,
+        k: int,
+        hybrid: bool = False,
+        vectors: bool = False,
+        where: Optional[Where] = None,
+    ) -> Tuple[Any, ...]:
+        return (self.name, text, k, hybrid, vectors, where_key(where), version)
+
+    def _cache_get(
+        self,
+        version: int,
+        text: str,
+        k: int,
+        hybrid: bool = False,
+        vectors: bool = False,
+        where: Optional[Where] = None,
+    ) -> Optional[Any]:
+        if self._query_cache is None:
+            return None
+        hit = self._query_cache.get(self._cache_key(version, text, k, hybrid, vectors, where))
+        if hit is None:
+            return None
+        return _copy_result(hit)
+
+    def _cache_put(
+        self,
+        version: int,
+        text: str,
+        k: int,
+        result: Any,
+        hybrid: bool = False,
+        vectors: bool = False,
+        where: Optional[Where] = None,
+    ) -> None:
+        """Cache ``result``, computed from the collection at ``version``.
+
+        ``version`` must be read before the search: a write that lands in between leaves
+        the result stale, so it is dropped rather than filed under the newer version.
+        """
+        if self._query_cache is not None and version == self.version:
+            self._query_cache.put(
+                self._cache_key(version, text, k, hybrid, vectors, where), _copy_result(result)
+            )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return query result cache statistics (empty when the cache is disabled)."""
+        if self._query_cache is None:
+            return {}
+        return {**self._query_cache.stats(), "version": self.version}
+
+    # -- writes -------------------------------------------------------------------------
+
+    def upsert(
+        self, texts: List[str], metadatas: List[Dict[str, Any]], ids: Optional[List[str]] = None
+    ) -> None:
+        """Insert or update documents in the vector store."""
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        with span("store.upsert", store=type(self).__name__, chunks=len(texts)):
+            vectors = self._embed(texts)
+            with span("store.write"):
+                self._write(ids, texts, metadatas, vectors)
+                if self.bm25 is not None:
+                    self.bm25.add(ids, texts)
+                    self.bm25.save_if_due(self.bm25_save_interval)
+            self._bump_version()
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete documents by ID (unknown IDs are ignored)."""
+        if not ids:
+            return
+        self._remove(list(ids))
+        if self.bm25 is not None:
+            self.bm25.delete(ids)
+            self.bm25.save_if_due(self.bm25_save_interval)
+        self._bump_version()
+
+    # -- reads --------------------------------------------------------------------------
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts (timed as stage ``embed`` and traced as ``store.embed``)."""
+        with stage("embed"), span(
+            "store.embed", provider=type(self.embedder).__name__, texts=len(texts)
+        ):
+            return self.embedder.embed(texts)
+
+    def _searching(self, queries: int, k: int, hybrid: bool, where: Optional[Where]) -> Any:
+        """Span for a vector search (timed as stage ``search``)."""
+        return span(
+            "store.search",
+            store=type(self).__name__,
+            queries=queries,
+            k=k,
+            hybrid=hybrid,
+            filtered=where is not None,
+        )
+
+    def _use_hybrid(self, hybrid: Optional[bool]) -> bool:
+        use = self.hybrid if hybrid is None else hybrid
+        if use and self.bm25 is None:
+            raise ValueError(f"Busca híbrida requer {type(self).__name__}(..., hybrid=True).")
+        return use
+
+    def query(
+        self,
+        text: str,
+        k: int = 5,
+        hybrid: Optional[bool] = None,
+        where: Optional[Where] = None,
+    ) -> QueryResult:
+        """Query the vector store for similar documents.
+
+        Args:
+            text: Query text
+            k: Number of results
+            hybrid: Fuse BM25 results into the ranking (None = the store default)
+            where: Metadata filter in ChromaDB syntax (e.g. ``{"source": "manual.pdf"}``)
+        """
+        use_hybrid = self._use_hybrid(hybrid)
+        where = normalize_where(where)
+        version = self.version
+        cached: Optional[QueryResult] = self._cache_get(version, text, k, use_hybrid, where=where)
+        if cached is not None:
+            return cached
+        vec = self._embed([text])[0]
+        with stage("search"), self._searching(1, k, use_hybrid, where):
+            result = self._search_many([vec], k, [text] if use_hybrid else None, where)[0]
+        self._cache_put(version, text, k, result, use_hybrid, where=where)
+        return result
+
+    async def aquery(
+        self,
+        text: str,
+        k: int = 5,
+        hybrid: Optional[bool] = None,
+        where: Optional[Where] = None,
+    ) -> QueryResult:
+        """Query the vector store without blocking the event loop.
+
+        Uses the embedder's ``aembed`` when available; the search itself runs in the
+        default executor, in a copy of the caller's context so stage timings and spans
+        stay attached to the calling request.
+        """
+        use_hybrid = self._use_hybrid(hybrid)
+        where = normalize_where(where)
+        version = self.version
+        cached: Optional[QueryResult] = self._cache_get(version, text, k, use_hybrid, where=where)
+        if cached is not None:
+            return cached
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        aembed = getattr(self.embedder, "aembed", None)
+        if not asyncio.iscoroutinefunction(aembed):
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(
+                None, functools.partial(ctx.run, self.query, text, k, use_hybrid, where)
+            )
+        with stage("embed"), span("store.embed", provider=type(self.embedder).__name__, texts=1):
+            vec = (await aembed([text]))[0]
+        texts = [text] if use_hybrid else None
+        with stage("search"), self._searching(1, k, use_hybrid, where):
+            ctx = contextvars.copy_context()
+            search = functools.partial(ctx.run, self._search_many, [vec], k, texts, where)
+            result = (await loop.run_in_executor(None, search))[0]
+        self._cache_put(version, text, k, result, use_hybrid, where=where)
+        return result
+
+    def query_many(
+        self,
+        texts: List[str],
+        k: int = 5,
+        hybrid: Optional[bool] = None,
+        where: Optional[Where] = None,
+    ) -> List[QueryResult]:
+        """Query several texts with one embedding call and one vector search.
+
+        Cached texts are served from the query cache; only the rest are embedded and
+        searched. ``where`` applies to every text.
+
+        Returns:
+            One ``(docs, metas, dists)`` triple per input text, in input order
+        """
+        use_hybrid = self._use_hybrid(hybrid)
+        where = normalize_where(where)
+        version = self.version
+        out: List[Optional[QueryResult]] = [
+            self._cache_get(version, t, k, use_hybrid, where=where) for t in texts
+        ]
+        missing = [i for i, r in enumerate(out) if r is None]
+        if missing:
+            batch = [texts[i] for i in missing]
+            vecs = self._embed(batch)
+            with stage("search"), self._searching(len(batch), k, use_hybrid, where):
+                results = self._search_many(vecs, k, batch if use_hybrid else None, where)
+            for i, result in zip(missing, results):
+                out[i] = result
+                self._cache_put(version, texts[i], k, result, use_hybrid, where=where)
+        return out  # type: ignore[return-value]
+
+    def query_vectors(
+        self,
+        texts: List[str],
+        k: int = 5,
+        hybrid: Optional[bool] = None,
+        where: Optional[Where] = None,
+    ) -> List[VectorQueryResult]:
+        """Like :meth:`query_many`, also returning the stored embedding of every hit.
+
+        Returns:
+            One ``(docs, metas, dists, embeddings)`` tuple per input text, in input order
+        """
+        use_hybrid = self._use_hybrid(hybrid)
+        where = normalize_where(where)
+        version = self.version
+        out: List[Optional[VectorQueryResult]] = [
+            self._cache_get(version, t, k, use_hybrid, vectors=True, where=where) for t in texts
+        ]
+        missing = [i for i, r in enumerate(out) if r is None]
+        if missing:
+            batch = [texts[i] for i in missing]
+            vecs = self._embed(batch)
+            with stage("search"), self._searching(len(batch), k, use_hybrid, where):
+                hits = self._search_hits(vecs, k, batch if use_hybrid else None, where)
+                found = [self._fetch(ids) for ids, _, _, _ in hits]
+            for i, (ids, docs, metas, dists), rows in zip(missing, hits, found):
+                result = (docs, metas, dists, [rows[d][2] for d in ids])
+                out[i] = result
+                self._cache_put(version, texts[i], k, result, use_hybrid, vectors=True, where=where)
+        return out  # type: ignore[return-value]
+
+    def _search_many(
+        self,
+        vecs: List[List[float]],
+        k: int,
+        texts: Optional[List[str]] = None,
+        where: Optional[Where] = None,
+    ) -> List[QueryResult]:
+        """Dense search for each vector; with ``texts``, fuse in BM25 results by RRF."""
+        hits = self._search_hits(vecs, k, texts, where)
+        return [(docs, metas, dists) for _, docs, metas, dists in hits]
+
+    def _search_hits(
+        self,
+        vecs: List[List[float]],
+        k: int,
+        texts: Optional[List[str]] = None,
+        where: Optional[Where] = None,
+    ) -> List[DenseHits]:
+        """Like :meth:`_search_many`, keeping the document IDs."""
+        n = max(k, self.hybrid_candidates) if texts is not None else k
+        out = []
+        for i, (ids, docs, metas, dists) in enumerate(self._dense_search_many(vecs, n, where)):
+            if texts is None:
+                out.append((ids, docs, metas, dists))
+            else:
+                dense = {d: (doc, m, dist) for d, doc, m, dist in zip(ids, docs, metas, dists)}
+                out.append(self._fuse(texts[i], vecs[i], ids, dense, k, where))
+        return out
+
+    def _fuse(
+        self,
+        text: str,
+        vec: List[float],
+        dense_ids: List[str],
+        dense: Dict[str, Tuple[str, Dict[str, Any], float]],
+        k: int,
+        where: Optional[Where] = None,
+    ) -> DenseHits:
+        """Merge dense and BM25 rankings by reciprocal-rank fusion."""
+        assert self.bm25 is not None
+        lexical_ids = [d for d, _ in self.bm25.search(text, max(k, self.hybrid_candidates))]
+        fetched: Dict[str, Tuple[str, Dict[str, Any], Any]] = {}
+        if where is not None:
+            # Lexical hits outside the filter must not take part in the fusion
+            outside = [d for d in lexical_ids if d not in dense]
+            fetched = self._fetch(outside) if outside else {}
+            lexical_ids = [
+                d
+                for d in lexical_ids
+                if d in dense or (d in fetched and matches_where(fetched[d][1], where))
+            ]
+        scores: Dict[str, float] = {}
+        for ranking in (dense_ids, lexical_ids):
+            for rank, doc_id in enumerate(ranking):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        top = sorted(scores, key=lambda d: -scores[d])[:k]
+
+        missing = [d for d in top if d not in dense]
+        if missing:
+            import numpy as np
+
+            q = np.asarray(vec, dtype=np.float32)
+            q_norm = float(np.linalg.norm(q)) or 1.0
+            unfetched = [d for d in missing if d not in fetched]
+            if unfetched:
+                fetched.update(self._fetch(unfetched))
+            for doc_id in missing:
+                if doc_id not in fetched:
+                    continue
+                doc, meta, emb = fetched[doc_id]
+                e = np.asarray(emb, dtype=np.float32)
+                cos = float(q @ e) / (q_norm * (float(np.linalg.norm(e)) or 1.0))
+                dense[doc_id] = (doc, meta, 1.0 - cos)
+        top = [d for d in top if d in dense]
+        return (
+            top,
+            [dense[d][0] for d in top],
+            [dense[d][1] for d in top],
+            [dense[d][2] for d in top],
+        )
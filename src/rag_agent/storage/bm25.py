@@ -0,0 +1,245 @@
+"""Compact BM25 inverted index for lexical retrieval."""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Words, plus compound identifiers such as "ERR-404", "PN-12.34B" or "v1.2/x"
+_TOKEN_RE = re.compile(r"\w+(?:[-./:]\w+)*")
+_SPLIT_RE = re.compile(r"[-./:]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into BM25 terms.
+
+    Terms are lowercased and accent-folded. Compound identifiers are kept whole and
+    also indexed by their parts, so "ERR-404" matches both "err-404" and "404".
+    """
+    folded = text.lower()
+    if not folded.isascii():
+        folded = unicodedata.normalize("NFKD", folded)
+        folded = "".join(c for c in folded if not unicodedata.combining(c))
+    terms: List[str] = _TOKEN_RE.findall(folded)
+    for token in [t for t in terms if not t.isalnum()]:
+        terms.extend(p for p in _SPLIT_RE.split(token) if p)
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index with array-backed postings.
+
+    Each term maps to one ``array('i')`` of interleaved ``(doc, tf)`` pairs, so a
+    posting costs 8 bytes and queries score whole posting lists with NumPy.
+    Replaced or deleted documents are tombstoned and compacted away once they
+    dominate the index.
+
+    Args:
+        path: File the index is persisted to (``.npz``); loaded when it exists
+        k1: BM25 term-frequency saturation
+        b: BM25 length normalization
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        import numpy as np
+
+        self.np = np
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, array] = {}
+        self._ids: List[Optional[str]] = []
+        self._docno: Dict[str, int] = {}
+        self._doc_len = array("i")
+        self._live = bytearray()
+        self._total_len = 0
+        self._dirty = False
+        self._saved_at = 0.0
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._docno)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index documents, replacing any previous version of the same IDs."""
+        with self._lock:
+            self._remove(ids)
+            for doc_id, text in zip(ids, texts):
+                docno = len(self._ids)
+                self._ids.append(doc_id)
+                self._docno[doc_id] = docno
+                self._live.append(1)
+                terms = tokenize(text)
+                self._doc_len.append(len(terms))
+                self._total_len += len(terms)
+                for term, tf in Counter(terms).items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = array("i")
+                    postings.extend((docno, tf))
+            self._dirty = True
+
+    def clear(self) -> None:
+        """Remove every document (the file is rewritten on the next save)."""
+        with self._lock:
+            self._postings = {}
+            self._ids = []
+            self._docno = {}
+            self._doc_len = array("i")
+            self._live = bytearray()
+            self._total_len = 0
+            self._dirty = True
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove documents from the index (unknown IDs are ignored)."""
+        with self._lock:
+            self._remove(ids)
+            self._dirty = True
+
+    def _remove(self, ids: Sequence[str]) -> None:
+        for doc_id in ids:
+            docno = self._docno.pop(doc_id, None)
+            if docno is not None:
+                self._ids[docno] = None
+                self._live[docno] = 0
+                self._total_len -= self._doc_len[docno]
+        if len(self._ids) > 1024 and len(self._docno) < len(self._ids) // 2:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop tombstoned documents and renumber the survivors."""
+        np = self.np
+        live = np.frombuffer(bytes(self._live), dtype=bool)
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        for term in list(self._postings):
+            pairs = np.frombuffer(self._postings[term], dtype=np.int32).reshape(-1, 2)
+            keep = pairs[live[pairs[:, 0]]]
+            if not len(keep):
+                del self._postings[term]
+                continue
+            keep = np.column_stack([remap[keep[:, 0]], keep[:, 1]]).astype(np.int32)
+            self._postings[term] = array("i", keep.tobytes())
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int32)[live]
+        self._doc_len = array("i", doc_len.tobytes())
+        self._ids = [i for i in self._ids if i is not None]
+        self._live = bytearray(b"\x01" * len(self._ids))
+        self._docno = {doc_id: n for n, doc_id in enumerate(self._ids)}  # type: ignore[misc]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return the ``k`` best-scoring documents for ``query``.
+
+        Returns:
+            ``(id, score)`` pairs sorted by descending BM25 score
+        """
+        np = self.np
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._docno)
+            if not n_docs or not terms:
+                return []
+            avgdl = max(self._total_len / n_docs, 1e-9)
+            doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+            live = np.frombuffer(self._live, dtype=bool) if n_docs < len(self._ids) else None
+            docs_parts, score_parts = [], []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                pairs = np.frombuffer(postings, dtype=np.int32).reshape(-1, 2)
+                if live is not None:
+                    pairs = pairs[live[pairs[:, 0]]]
+                df = len(pairs)
+                if not df:
+                    continue
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                tf = pairs[:, 1].astype(np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * doc_len[pairs[:, 0]] / avgdl)
+                docs_parts.append(pairs[:, 0])
+                score_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+            if not docs_parts:
+                return []
+            docs = np.concatenate(docs_parts)
+            uniq, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            top = min(k, len(uniq))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [(self._ids[int(uniq[i])], float(scores[i])) for i in best]  # type: ignore[misc]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Atomically write the index to ``path`` (defaults to the configured path)."""
+        np = self.np
+        path = path or self.path
+        if not path:
+            raise ValueError("Nenhum caminho configurado para o índice BM25.")
+        with self._lock:
+            terms = list(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self._postings[t]) for t in terms])
+            postings = (
+                np.concatenate([np.frombuffer(self._postings[t], dtype=np.int32) for t in terms])
+                if terms
+                else np.zeros(0, dtype=np.int32)
+            )
+            meta = json.dumps({"terms": terms, "ids": self._ids, "k1": self.k1, "b": self.b})
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8),
+                    offsets=offsets,
+                    postings=postings,
+                    doc_len=np.frombuffer(self._doc_len, dtype=np.int32),
+                )
+            os.replace(tmp, path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def save_if_due(self, interval: float) -> bool:
+        """Save pending changes once ``interval`` seconds have passed since the last save."""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return False
+            if time.monotonic() - self._saved_at < interval:
+                return False
+            self.save()
+            return True
+
+    def flush(self) -> None:
+        """Save pending changes, if any."""
+        with self._lock:
+            if self._dirty and self.path:
+                self.save()
+
+    def _load(self, path: str) -> None:
+        np = self.np
+        with np.load(path) as data:
+            meta = json.loads(bytes(data["meta"]).decode("utf-8"))
+            offsets = data["offsets"]
+            postings = data["postings"]
+            doc_len = data["doc_len"]
+        self.k1 = meta.get("k1", self.k1)
+        self.b = meta.get("b", self.b)
+        self._ids = meta["ids"]
+        self._docno = {doc_id: n for n, doc_id in enumerate(self._ids) if doc_id is not None}
+        self._doc_len = array("i", doc_len.astype(np.int32).tobytes())
+        self._live = bytearray(i is not None for i in self._ids)
+        live = np.frombuffer(bytes(self._live), dtype=bool)
+        self._total_len = int(doc_len[live].sum()) if len(live) else 0
+        for n, term in enumerate(meta["terms"]):
+            self._postings[term] = array(
+                "i", postings[offsets[n] : offsets[n + 1]].astype(np.int32).tobytes()
+            )
+        self._saved_at = time.monotonic()
@@ -1,21 +1,60 @@
 """ChromaDB vector store implementation."""
 
-import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..core.protocols import EmbeddingProvider
+from .base import BaseVectorStore, DenseHits
+from .filters import Where
 
 
-class ChromaStore:
-    """Vector store wrapper using ChromaDB for document storage and similarity search."""
+class ChromaStore(BaseVectorStore):
+    """Vector store wrapper using ChromaDB for document storage and similarity search.
+
+    ``version`` is bumped on every write so callers can detect collection changes.
+
+    With ``hybrid=True`` a BM25 index is kept in sync with the collection and persisted
+    next to the Chroma directory (``<persist_dir>/<collection>.bm25.npz``). Queries then
+    merge the dense and lexical rankings by reciprocal-rank fusion; returned distances
+    stay the true cosine distances, so relevance thresholds keep their meaning.
+
+    Args:
+        collection: Collection name
+        embedder: Embedding provider used for documents and queries
+        persist_dir: Directory of the persistent Chroma database
+        query_cache_size: Capacity of the query result cache (0 disables it)
+        query_cache_ttl: Seconds a cached query result stays valid (None = until the next write)
+        hybrid: Maintain a BM25 index and fuse lexical results into queries by default
+        hybrid_candidates: Candidates taken from each ranking before fusion
+        rrf_k: Reciprocal-rank fusion constant
+        bm25_save_interval: Minimum seconds between automatic index saves (see ``flush``)
+    """
 
     def __init__(
-        self, collection: str, embedder: EmbeddingProvider, persist_dir: str = "./chroma_db"
+        self,
+        collection: str,
+        embedder: EmbeddingProvider,
+        persist_dir: str = "./chroma_db",
+        query_cache_size: int = 0,
+        query_cache_ttl: Optional[float] = 30.0,
+        hybrid: bool = False,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+        bm25_save_interval: float = 5.0,
     ):
         import chromadb
         from chromadb.config import Settings
 
-        self.embedder = embedder
+        super().__init__(
+            collection,
+            embedder,
+            persist_dir,
+            query_cache_size=query_cache_size,
+            query_cache_ttl=query_cache_ttl,
+            hybrid=hybrid,
+            hybrid_candidates=hybrid_candidates,
+            rrf_k=rrf_k,
+            bm25_save_interval=bm25_save_interval,
+        )
         self.client = chromadb.PersistentClient(
             path=persist_dir, settings=Settings(allow_reset=False)
         )
@@ -23,23 +62,59 @@ class ChromaStore:
         self.col = self.client.get_or_create_collection(
             name=collection, metadata={"hnsw:space": "cosine"}
         )
+        self._init_bm25()
 
-    def upsert(
-        self, texts: List[str], metadatas: List[Dict[str, Any]], ids: Optional[List[str]] = None
-    ):
-        """Insert or update documents in the vector store."""
-        if ids is None:
-            ids = [str(uuid.uuid4()) for _ in texts]
-        vectors = self.embedder.embed(texts)
+    def _write(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: List[List[float]],
+    ) -> None:
         self.col.upsert(documents=texts, metadatas=metadatas, embeddings=vectors, ids=ids)
 
-    def query(self, text: str, k: int = 5) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
-        """Query the vector store for similar documents."""
-        vec = self.embedder.embed([text])[0]
+    def _remove(self, ids: List[str]) -> None:
+        self.col.delete(ids=ids)
+
+    def _count(self) -> int:
+        return self.col.count()
+
+    def _iter_documents(self, page_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+        offset = 0
+        while True:
+            page = self.col.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page["ids"], page["documents"] or []
+            offset += len(page["ids"])
+
+    def _fetch(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any], Any]]:
+        got = self.col.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        embeddings = got["embeddings"]
+        if embeddings is None:
+            return {}
+        return {
+            doc_id: (doc, dict(meta or {}), emb)
+            for doc_id, doc, meta, emb in zip(
+                got["ids"], got["documents"] or [], got["metadatas"] or [], embeddings
+            )
+        }
+
+    def _dense_search_many(
+        self, vecs: List[List[float]], n: int, where: Optional[Where] = None
+    ) -> List[DenseHits]:
+        # The filter is applied inside Chroma, so top-k is taken among matching chunks only
         res = self.col.query(
-            query_embeddings=[vec], n_results=k, include=["documents", "metadatas", "distances"]
+            query_embeddings=vecs,
+            n_results=n,
+            where=where,
+            include=["documents", "metadatas", "distances"],
         )
-        docs = res["documents"][0] if res["documents"] else []
-        metas = res["metadatas"][0] if res["metadatas"] else []
-        dists = res["distances"][0] if res["distances"] else []
-        return docs, metas, dists
+        out = []
+        for i in range(len(vecs)):
+            ids = res["ids"][i] if res["ids"] else []
+            docs = res["documents"][i] if res["documents"] else []
+            metas = res["metadatas"][i] if res["metadatas"] else []
+            dists = res["distances"][i] if res["distances"] else []
+            out.append((ids, docs, metas, dists))
+        return out
@@ -0,0 +1,116 @@
+"""Metadata filters in ChromaDB ``where`` syntax, evaluable in Python for other stores."""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+Where = Dict[str, Any]
+
+_COMPARISONS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin"}
+_LOGICAL = {"$and", "$or"}
+
+
+def _clauses(where: Where) -> List[Where]:
+    """Split a filter into single-key clauses (implicit AND of top-level fields)."""
+    out = []
+    for key, value in where.items():
+        if key in _LOGICAL:
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"{key} espera uma lista não vazia de filtros.")
+            value = [normalize_where(v) for v in value]
+        elif key.startswith("$"):
+            raise ValueError(f"Operador de filtro desconhecido: {key}")
+        elif isinstance(value, dict):
+            if len(value) != 1 or next(iter(value)) not in _COMPARISONS:
+                raise ValueError(f"Condição inválida para '{key}': {value}")
+        out.append({key: value})
+    return out
+
+
+def normalize_where(where: Optional[Where]) -> Optional[Where]:
+    """
+    Validate a filter and rewrite it into the form ChromaDB accepts.
+
+    Several top-level fields (``{"source": "a.pdf", "tenant": "acme"}``) become an
+    explicit ``$and``; single-element ``$and``/``$or`` lists are unwrapped.
+
+    Raises:
+        ValueError: If the filter uses an unknown operator or malformed condition
+    """
+    if not where:
+        return None
+    if not isinstance(where, dict):
+        raise ValueError(f"Filtro inválido: {where!r}")
+    clauses = _clauses(where)
+    for i, clause in enumerate(clauses):
+        ((key, value),) = clause.items()
+        if key in _LOGICAL and len(value) == 1:
+            clauses[i] = value[0]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def scoped_where(
+    where: Optional[Where] = None, source: Union[str, Sequence[str], None] = None
+) -> Optional[Where]:
+    """Combine a metadata filter with a restriction to one or more sources."""
+    clauses = []
+    if where:
+        clauses.append(where)
+    if isinstance(source, str):
+        clauses.append({"source": source})
+    elif source is not None:
+        clauses.append({"source": {"$in": list(source)}})
+    if not clauses:
+        return None
+    return normalize_where(clauses[0] if len(clauses) == 1 else {"$and": clauses})
+
+
+def where_key(where: Optional[Where]) -> Optional[str]:
+    """Canonical hashable form of a filter (for cache keys)."""
+    return json.dumps(where, sort_keys=True, default=str) if where else None
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    if op == "$eq":
+        return bool(value == operand)
+    if op == "$ne":
+        return bool(value != operand)
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    try:
+        if op == "$gt":
+            return bool(value > operand)
+        if op == "$gte":
+            return bool(value >= operand)
+        if op == "$lt":
+            return bool(value < operand)
+        return bool(value <= operand)
+    except TypeError:
+        return False
+
+
+def matches_where(meta: Optional[Dict[str, Any]], where: Optional[Where]) -> bool:
+    """Whether a metadata dict satisfies a (normalized or raw) filter."""
+    if not where:
+        return True
+    if meta is None:
+        return False
+    for key, value in where.items():
+        if key == "$and":
+            if not all(matches_where(meta, w) for w in value):
+                return False
+        elif key == "$or":
+            if not any(matches_where(meta, w) for w in value):
+                return False
+        elif isinstance(value, dict):
+            ((op, operand),) = value.items()
+            if op in ("$eq", "$in", "$gt", "$gte", "$lt", "$lte") and key not in meta:
+                return False
+            if not _compare(meta.get(key), op, operand):
+                return False
+        elif key not in meta or meta[key] != value:
+            return False
+    return True
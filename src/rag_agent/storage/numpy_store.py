@@ -0,0 +1,487 @@
+"""In-process exact-search vector store on a memory-mapped NumPy matrix."""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.exceptions import EmbeddingError
+from ..core.protocols import EmbeddingProvider
+from .base import BaseVectorStore, DenseHits
+from .filters import Where, matches_where, where_key
+
+
+class NumpyStore(BaseVectorStore):
+    """Flat vector store with exact cosine search, for small and medium collections.
+
+    Vectors are L2-normalized and kept in one contiguous float32 matrix memory-mapped
+    from ``<persist_dir>/<collection>.vectors``; a query is a single batched matmul
+    followed by ``argpartition`` top-k, so results are exact. Documents and metadata
+    live in memory and are persisted as an append-only JSON-lines log
+    (``<collection>.log.jsonl``) that is replayed on open and compacted by ``flush``.
+    Deleted rows are reused by later inserts.
+
+    ``dtype`` selects an opt-in compact representation: ``"float16"`` halves the
+    matrix and ``"int8"`` quarters it, with a scale factor per vector
+    (``scale="vector"``) or per dimension (``scale="dimension"``, calibrated on the
+    first batch written). Similarities are computed on the compact matrix in bounded
+    row blocks. ``rescore=r`` additionally keeps a float32 copy on disk (only the
+    touched rows are paged in) and re-ranks the top ``k * r`` approximate candidates
+    with it, recovering most of the recall lost to quantization.
+
+    Same interface as :class:`ChromaStore` (``upsert``/``delete``/``query``/``aquery``/
+    ``query_many``, ``where`` filters, query cache, ``version``, optional BM25 ``hybrid``
+    mode). Filters are matched in Python once per distinct filter and write; selective
+    ones restrict scoring to the matching rows.
+
+    Args:
+        collection: Collection name
+        embedder: Embedding provider used for documents and queries
+        persist_dir: Directory holding the collection files
+        query_cache_size: Capacity of the query result cache (0 disables it)
+        query_cache_ttl: Seconds a cached query result stays valid (None = until the next write)
+        hybrid: Maintain a BM25 index and fuse lexical results into queries by default
+        hybrid_candidates: Candidates taken from each ranking before fusion
+        rrf_k: Reciprocal-rank fusion constant
+        bm25_save_interval: Minimum seconds between automatic index saves (see ``flush``)
+        initial_capacity: Rows allocated when the matrix file is created
+        dtype: Stored vector type: ``"float32"``, ``"float16"`` or ``"int8"``
+        scale: int8 scale granularity: ``"vector"`` or ``"dimension"``
+        rescore: Re-rank ``k * rescore`` candidates with full-precision vectors (0 = off)
+    """
+
+    DTYPES = ("float32", "float16", "int8")
+    SCALES = ("vector", "dimension")
+    # Rows dequantized at a time when scoring a compact matrix
+    BLOCK_ROWS = 65536
+    # Filtered queries score only the matching rows when they are at most this share
+    SUBSET_FRACTION = 0.25
+    # Row masks of recent where-filters kept until the next write
+    WHERE_MASKS = 32
+
+    def __init__(
+        self,
+        collection: str,
+        embedder: EmbeddingProvider,
+        persist_dir: str = "./numpy_db",
+        query_cache_size: int = 0,
+        query_cache_ttl: Optional[float] = 30.0,
+        hybrid: bool = False,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+        bm25_save_interval: float = 5.0,
+        initial_capacity: int = 1024,
+        dtype: str = "float32",
+        scale: str = "vector",
+        rescore: int = 0,
+    ):
+        import numpy as np
+
+        if dtype not in self.DTYPES:
+            raise ValueError(f"dtype inválido: {dtype} (use {', '.join(self.DTYPES)}).")
+        if scale not in self.SCALES:
+            raise ValueError(f"scale inválido: {scale} (use {', '.join(self.SCALES)}).")
+
+        super().__init__(
+            collection,
+            embedder,
+            persist_dir,
+            query_cache_size=query_cache_size,
+            query_cache_ttl=query_cache_ttl,
+            hybrid=hybrid,
+            hybrid_candidates=hybrid_candidates,
+            rrf_k=rrf_k,
+            bm25_save_interval=bm25_save_interval,
+        )
+        self.np = np
+        self.initial_capacity = max(1, initial_capacity)
+        os.makedirs(persist_dir, exist_ok=True)
+        base = os.path.join(persist_dir, collection)
+        self._header_path = f"{base}.json"
+        self._log_path = f"{base}.log.jsonl"
+        self._base_path = base
+        self._lock = threading.RLock()
+        self.dtype = dtype
+        self.scale = scale
+        self.rescore = rescore
+        self.dim: Optional[int] = None
+        self._dim_scale: Any = None
+        # name -> memmap; "vectors" (stored dtype), "scales" (int8/vector), "full" (rescore)
+        self._maps: Dict[str, Any] = {}
+        self._capacity = 0
+        self._live: Any = np.zeros(0, dtype=bool)
+        self._rows = 0
+        self._row_of: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._docs: List[Optional[str]] = []
+        self._metas: List[Optional[Dict[str, Any]]] = []
+        self._free: List[int] = []
+        self._where_masks: Dict[str, Any] = {}
+        self._log_lines = 0
+        self._log: Any = None
+        self._load()
+        self._init_bm25()
+
+    # -- persistence --------------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not os.path.exists(self._header_path):
+            return
+        with open(self._header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        stored = (header.get("dtype", "float32"), header.get("scale", "vector"))
+        if stored != (self.dtype, self.scale) or bool(header.get("full")) != bool(self.rescore):
+            raise ValueError(
+                f"Coleção {self.name} foi criada com dtype={stored[0]}, scale={stored[1]}, "
+                f"rescore={'sim' if header.get('full') else 'não'}."
+            )
+        if header.get("dim_scale") is not None:
+            self._dim_scale = self.np.asarray(header["dim_scale"], dtype=self.np.float32)
+        self._open_matrix(header["dim"])
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final line from an interrupted write
+                    self._log_lines += 1
+                    if entry.get("del"):
+                        self._drop(entry["id"])
+                    else:
+                        self._place(entry["id"], entry["row"], entry["doc"], entry["meta"])
+        self._free = [r for r in range(self._rows) if not self._live[r]]
+
+    def _layout(self) -> Dict[str, Tuple[Any, int]]:
+        """Backing arrays as ``name -> (dtype, columns)``."""
+        assert self.dim is not None
+        np = self.np
+        layout: Dict[str, Tuple[Any, int]] = {"vectors": (np.dtype(self.dtype), self.dim)}
+        if self.dtype == "int8" and self.scale == "vector":
+            layout["scales"] = (np.dtype(np.float32), 1)
+        if self.rescore:
+            layout["full"] = (np.dtype(np.float32), self.dim)
+        return layout
+
+    def _map(self, name: str, capacity: int) -> Any:
+        dtype, cols = self._layout()[name]
+        path = f"{self._base_path}.{name}"
+        size = capacity * cols * dtype.itemsize
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            with open(path, "ab") as f:
+                f.truncate(size)
+        return self.np.memmap(path, dtype=dtype, mode="r+", shape=(capacity, cols))
+
+    def _open_matrix(self, dim: int) -> None:
+        self.dim = dim
+        dtype, cols = self._layout()["vectors"]
+        path = f"{self._base_path}.vectors"
+        capacity = max(os.path.getsize(path) // (cols * dtype.itemsize), 1)
+        self._maps = {name: self._map(name, capacity) for name in self._layout()}
+        self._capacity = capacity
+        self._live = self.np.zeros(capacity, dtype=bool)
+
+    def _create(self, dim: int, sample: Any) -> None:
+        np = self.np
+        self.dim = dim
+        if self.dtype == "int8" and self.scale == "dimension":
+            # Floor at ~3 standard deviations of a unit vector's component so a small
+            # first batch does not clip later vectors
+            peak = np.maximum(np.abs(sample).max(axis=0), 3.0 / np.sqrt(dim))
+            self._dim_scale = peak.astype(np.float32)
+        with open(f"{self._base_path}.vectors", "wb") as f:
+            f.truncate(self.initial_capacity * dim * np.dtype(self.dtype).itemsize)
+        header = {
+            "dim": dim,
+            "dtype": self.dtype,
+            "scale": self.scale,
+            "full": bool(self.rescore),
+            "dim_scale": None if self._dim_scale is None else self._dim_scale.tolist(),
+        }
+        with open(self._header_path, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        self._open_matrix(dim)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        np = self.np
+        capacity = self._capacity
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2)
+        for name, mm in list(self._maps.items()):
+            mm.flush()
+            self._maps[name] = None
+            self._maps[name] = self._map(name, new_capacity)
+        self._capacity = new_capacity
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:capacity] = self._live
+        self._live = live
+
+    def _encode(self, mat: Any) -> Tuple[Any, Any]:
+        """Convert normalized float32 rows to the stored representation and row scales."""
+        np = self.np
+        if self.dtype == "float32":
+            return mat, None
+        if self.dtype == "float16":
+            return mat.astype(np.float16), None
+        if self.scale == "dimension":
+            q = np.clip(np.rint(mat / self._dim_scale * 127.0), -127, 127)
+            return q.astype(np.int8), None
+        peak = np.abs(mat).max(axis=1, keepdims=True)
+        peak[peak == 0] = 1.0
+        return np.rint(mat / peak * 127.0).astype(np.int8), peak.astype(np.float32)
+
+    def _decode(self, rows: Any) -> Any:
+        """Approximate float32 vectors for the given row indexes."""
+        np = self.np
+        vecs = np.asarray(self._maps["vectors"][rows], dtype=np.float32)
+        if self.dtype != "int8":
+            return vecs
+        if self.scale == "dimension":
+            return vecs * (self._dim_scale / 127.0)
+        return vecs * (np.asarray(self._maps["scales"][rows]) / 127.0)
+
+    def _scores(self, queries: Any, rows: int) -> Any:
+        """Cosine similarities between normalized queries and the first ``rows`` rows."""
+        np = self.np
+        mat = self._maps["vectors"]
+        if self.dtype == "float32":
+            return queries @ mat[:rows].T
+        q = queries
+        if self.dtype == "int8" and self.scale == "dimension":
+            q = queries * (self._dim_scale / 127.0)
+        out = np.empty((len(queries), rows), dtype=np.float32)
+        for start in range(0, rows, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, rows)
+            out[:, start:end] = q @ np.asarray(mat[start:end], dtype=np.float32).T
+        if self.dtype == "int8" and self.scale == "vector":
+            out *= self._maps["scales"][:rows, 0] / 127.0
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """Return collection size and the bytes used by the search matrix."""
+        count = len(self._row_of)
+        index_bytes = 0
+        full_bytes = 0
+        if self.dim is not None:
+            for name, (dtype, cols) in self._layout().items():
+                nbytes = self._rows * cols * dtype.itemsize
+                if name == "full":
+                    full_bytes = nbytes
+                else:
+                    index_bytes += nbytes
+        return {
+            "count": count,
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "scale": self.scale if self.dtype == "int8" else None,
+            "index_bytes": index_bytes,
+            "full_bytes": full_bytes,
+        }
+
+    def _append_log(self, entries: List[Dict[str, Any]]) -> None:
+        if self._log is None:
+            self._log = open(self._log_path, "a", encoding="utf-8")
+        self._log.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+        self._log.flush()
+        self._log_lines += len(entries)
+
+    def _compact_log(self) -> None:
+        """Rewrite the log with one line per live document."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        tmp = f"{self._log_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for doc_id, row in self._row_of.items():
+                entry = {"id": doc_id, "row": row, "doc": self._docs[row], "meta": self._metas[row]}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._log_path)
+        self._log_lines = len(self._row_of)
+
+    def flush(self) -> None:
+        """Flush the matrix to disk, compact the document log and persist indexes."""
+        with self._lock:
+            for mm in self._maps.values():
+                mm.flush()
+            if self._log_lines > 2 * len(self._row_of) + 1000:
+                self._compact_log()
+            elif self._log is not None:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+        super().flush()
+
+    def close(self) -> None:
+        """Flush and release the underlying files."""
+        self.flush()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # -- in-memory bookkeeping ----------------------------------------------------------
+
+    def _place(self, doc_id: str, row: int, doc: str, meta: Dict[str, Any]) -> None:
+        old = self._row_of.get(doc_id)
+        if old is not None and old != row:
+            self._live[old] = False
+            self._ids[old] = self._docs[old] = self._metas[old] = None
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._docs.append(None)
+            self._metas.append(None)
+        self._ensure_capacity(row + 1)
+        self._row_of[doc_id] = row
+        self._ids[row], self._docs[row], self._metas[row] = doc_id, doc, meta
+        self._live[row] = True
+        self._rows = max(self._rows, row + 1)
+        self._where_masks.clear()
+
+    def _drop(self, doc_id: str) -> Optional[int]:
+        row = self._row_of.pop(doc_id, None)
+        if row is not None:
+            self._live[row] = False
+            self._ids[row] = self._docs[row] = self._metas[row] = None
+            self._where_masks.clear()
+        return row
+
+    def _where_mask(self, where: Where) -> Any:
+        """Boolean mask of the live rows whose metadata matches ``where``."""
+        key = where_key(where)
+        mask = self._where_masks.get(key)  # type: ignore[arg-type]
+        if mask is None:
+            rows = self._rows
+            mask = self.np.fromiter(
+                (matches_where(m, where) for m in self._metas[:rows]), dtype=bool, count=rows
+            )
+            if len(self._where_masks) >= self.WHERE_MASKS:
+                self._where_masks.clear()
+            self._where_masks[key] = mask  # type: ignore[index]
+        return mask
+
+    def _normalize(self, vectors: List[List[float]]) -> Any:
+        np = self.np
+        mat = np.asarray(vectors, dtype=np.float32)
+        if mat.ndim != 2:
+            raise EmbeddingError("Embeddings precisam formar uma matriz 2D.")
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return mat / norms
+
+    # -- backend primitives -------------------------------------------------------------
+
+    def _write(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: List[List[float]],
+    ) -> None:
+        if not ids:
+            return
+        mat = self._normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self._create(mat.shape[1], mat)
+            elif mat.shape[1] != self.dim:
+                raise EmbeddingError(
+                    f"Dimensão do embedding ({mat.shape[1]}) difere da coleção ({self.dim})."
+                )
+            entries = []
+            rows = []
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                row = self._row_of.get(doc_id)
+                if row is None:
+                    row = self._free.pop() if self._free else self._rows
+                self._place(doc_id, row, text, meta)
+                rows.append(row)
+                entries.append({"id": doc_id, "row": row, "doc": text, "meta": meta})
+            stored, scales = self._encode(mat)
+            self._maps["vectors"][rows] = stored
+            if scales is not None:
+                self._maps["scales"][rows] = scales
+            if "full" in self._maps:
+                self._maps["full"][rows] = mat
+            self._append_log(entries)
+
+    def _remove(self, ids: List[str]) -> None:
+        with self._lock:
+            entries = []
+            for doc_id in ids:
+                row = self._drop(doc_id)
+                if row is not None:
+                    self._free.append(row)
+                    entries.append({"id": doc_id, "del": 1})
+            if entries:
+                self._append_log(entries)
+
+    def _count(self) -> int:
+        return len(self._row_of)
+
+    def _iter_documents(self, page_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+        with self._lock:
+            items = [(d, self._docs[r] or "") for d, r in self._row_of.items()]
+        for start in range(0, len(items), page_size):
+            page = items[start : start + page_size]
+            yield [d for d, _ in page], [t for _, t in page]
+
+    def _fetch(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any], Any]]:
+        with self._lock:
+            out: Dict[str, Tuple[str, Dict[str, Any], Any]] = {}
+            for doc_id in ids:
+                row = self._row_of.get(doc_id)
+                if row is not None:
+                    vec = (
+                        self.np.array(self._maps["full"][row])
+                        if "full" in self._maps
+                        else self._decode([row])[0]
+                    )
+                    out[doc_id] = (self._docs[row] or "", self._metas[row] or {}, vec)
+            return out
+
+    def _dense_search_many(
+        self, vecs: List[List[float]], n: int, where: Optional[Where] = None
+    ) -> List[DenseHits]:
+        np = self.np
+        queries = self._normalize(vecs)
+        with self._lock:
+            rows = self._rows
+            subset = None
+            if where is None:
+                n_live = len(self._row_of)
+            else:
+                mask = self._where_mask(where)
+                n_live = int(mask.sum())
+            if not n_live or n <= 0:
+                return [([], [], [], []) for _ in range(len(queries))]
+            if where is not None and n_live <= rows * self.SUBSET_FRACTION:
+                # Selective filter: score only the matching rows
+                subset = np.flatnonzero(mask)
+                sims = queries @ self._decode(subset).T
+            else:
+                sims = self._scores(queries, rows)
+                if where is not None:
+                    sims[:, ~mask] = -np.inf
+                elif n_live < rows:
+                    sims[:, ~self._live[:rows]] = -np.inf
+            top = min(n, n_live)
+            pool = min(top * self.rescore, n_live) if self.rescore else top
+            idx = np.argpartition(-sims, pool - 1, axis=1)[:, :pool]
+            out = []
+            for q in range(len(queries)):
+                cand_sims = sims[q, idx[q]]
+                cand = idx[q] if subset is None else subset[idx[q]]
+                if self.rescore:
+                    order = np.argsort(cand)  # sorted rows read the memmap sequentially
+                    cand = cand[order]
+                    cand_sims = np.asarray(self._maps["full"][cand]) @ queries[q]
+                best = np.argsort(-cand_sims, kind="stable")[:top]
+                out.append(
+                    (
+                        [self._ids[r] for r in cand[best]],
+                        [self._docs[r] for r in cand[best]],
+                        [self._metas[r] for r in cand[best]],
+                        [float(1.0 - s) for s in cand_sims[best]],
+                    )
+                )
+            return out
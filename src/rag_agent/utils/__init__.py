@@ -1,12 +1,83 @@
 """Utility functions and helpers."""
 
-from .ingestion import ingest_file, read_text_from_path
-from .logging import setup_logger
-from .text_processing import chunk_text
+from typing import TYPE_CHECKING
+
+from .lazy import attach
+
+if TYPE_CHECKING:
+    from .ingestion import (
+        chunk_ids,
+        document_metadata,
+        ingest_directory,
+        ingest_file,
+        ingest_many,
+        iter_files,
+        iter_text_from_path,
+        read_text_from_path,
+        remove_source,
+    )
+    from .logging import QueuedJsonHandler, configure_logging, setup_logger
+    from .manifest import IngestManifest
+    from .metrics import REGISTRY, MetricsRegistry, RagMetrics, StageTimer, serve_metrics
+    from .text_processing import chunk_text, iter_chunks
+    from .tracing import JsonLinesTracer, Tracer, folded_stacks, get_tracer, set_tracer, span
+
+_EXPORTS = {
+    "ingest_file": ".ingestion",
+    "ingest_many": ".ingestion",
+    "ingest_directory": ".ingestion",
+    "iter_files": ".ingestion",
+    "remove_source": ".ingestion",
+    "chunk_ids": ".ingestion",
+    "document_metadata": ".ingestion",
+    "IngestManifest": ".manifest",
+    "read_text_from_path": ".ingestion",
+    "iter_text_from_path": ".ingestion",
+    "setup_logger": ".logging",
+    "configure_logging": ".logging",
+    "QueuedJsonHandler": ".logging",
+    "MetricsRegistry": ".metrics",
+    "RagMetrics": ".metrics",
+    "StageTimer": ".metrics",
+    "REGISTRY": ".metrics",
+    "serve_metrics": ".metrics",
+    "Tracer": ".tracing",
+    "JsonLinesTracer": ".tracing",
+    "set_tracer": ".tracing",
+    "get_tracer": ".tracing",
+    "span": ".tracing",
+    "folded_stacks": ".tracing",
+    "chunk_text": ".text_processing",
+    "iter_chunks": ".text_processing",
+}
+
+__getattr__, __dir__ = attach(__name__, _EXPORTS)
 
 __all__ = [
     "ingest_file",
+    "ingest_many",
+    "ingest_directory",
+    "iter_files",
+    "remove_source",
+    "chunk_ids",
+    "document_metadata",
+    "IngestManifest",
     "read_text_from_path",
+    "iter_text_from_path",
     "setup_logger",
+    "configure_logging",
+    "QueuedJsonHandler",
+    "MetricsRegistry",
+    "RagMetrics",
+    "StageTimer",
+    "REGISTRY",
+    "serve_metrics",
+    "Tracer",
+    "JsonLinesTracer",
+    "set_tracer",
+    "get_tracer",
+    "span",
+    "folded_stacks",
     "chunk_text",
+    "iter_chunks",
 ]
@@ -1,25 +1,51 @@
 """Document ingestion utilities."""
 
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import itertools
 import os
-from typing import Optional
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from ..core.exceptions import IngestionError
-from ..storage.chroma_store import ChromaStore
 from .logging import setup_logger
-from .text_processing import chunk_text
+from .manifest import IngestManifest, file_sha256
+from .text_processing import iter_chunks
+from .tracing import span
+
+if TYPE_CHECKING:
+    from ..core.protocols import VectorStore
 
 log = setup_logger("rag")
 
 
-def read_text_from_path(path: str) -> str:
+def iter_text_from_path(path: str, block_size: int = 1 << 20) -> Iterator[str]:
     """
-    Read text content from various file formats.
+    Read text content incrementally from various file formats.
+
+    Text files are read in blocks of ``block_size`` characters and PDFs one page at a
+    time, so the whole document is never held in memory. Concatenating the yielded
+    pieces gives the same text as ``read_text_from_path``.
 
     Args:
         path: Path to the file
+        block_size: Characters per block for text files
 
-    Returns:
-        Extracted text content
+    Yields:
+        Consecutive pieces of the extracted text
 
     Raises:
         IngestionError: If file reading fails
@@ -29,69 +55,536 @@ def read_text_from_path(path: str) -> str:
 
     ext = os.path.splitext(path)[1].lower()
     try:
-        if ext in (".txt", ".md"):
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        elif ext == ".pdf":
+        if ext == ".pdf":
             try:
                 import pypdf  # pip install pypdf
             except ImportError as e:
                 raise IngestionError(f"Para PDF, instale pypdf: {e}")
             reader = pypdf.PdfReader(path)
-            texts = []
             for i, page in enumerate(reader.pages):
-                t = page.extract_text() or ""
-                texts.append(t)
-            return "\n".join(texts)
+                if i:
+                    yield "\n"
+                yield page.extract_text() or ""
         else:
-            # Simple fallback: try to open as text
+            # .txt, .md and a simple fallback for anything else: read as text
             with open(path, "r", encoding="utf-8") as f:
-                return f.read()
+                for block in iter(lambda: f.read(block_size), ""):
+                    yield block
+    except IngestionError:
+        raise
     except Exception as e:
         raise IngestionError(f"Falha lendo {path}: {e}")
 
 
+def read_text_from_path(path: str) -> str:
+    """
+    Read text content from various file formats.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Extracted text content
+
+    Raises:
+        IngestionError: If file reading fails
+    """
+    return "".join(iter_text_from_path(path))
+
+
+def chunk_id(source: str, index: int, chunk: str) -> str:
+    """Derive the deterministic ID of one chunk (see ``chunk_ids``)."""
+    content = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    key = f"{source}\x00{index}\x00{content}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+def chunk_ids(source: str, chunks: List[str]) -> List[str]:
+    """
+    Derive deterministic chunk IDs from source, chunk index and content hash.
+
+    Re-ingesting identical content yields identical IDs, so upserts overwrite instead
+    of duplicating.
+
+    Args:
+        source: Source name the chunks belong to
+        chunks: Chunk texts in document order
+
+    Returns:
+        One hex ID per chunk
+    """
+    return [chunk_id(source, i, chunk) for i, chunk in enumerate(chunks)]
+
+
+_RESERVED_METADATA = ("source", "chunk_id", "chunk_ids", "ingested_at")
+
+
+def document_metadata(
+    path: str,
+    tenant: Optional[str] = None,
+    extra_metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Filterable metadata shared by every chunk of one file.
+
+    Holds ``doc_type`` (the lowercase file extension, e.g. ``"pdf"``), ``tenant`` when
+    given and any ``extra_metadata``. Ingestion adds ``source``, ``chunk_id`` and
+    ``ingested_at`` (Unix seconds) to each chunk.
+
+    Raises:
+        IngestionError: If ``extra_metadata`` uses a reserved key or a non-scalar value
+    """
+    meta: Dict[str, Any] = dict(extra_metadata or {})
+    for key, value in meta.items():
+        if key in _RESERVED_METADATA:
+            raise IngestionError(f"Metadado reservado: {key}")
+        if not isinstance(value, (str, int, float, bool)):
+            raise IngestionError(f"Metadado '{key}' precisa ser str, int, float ou bool.")
+    meta["doc_type"] = os.path.splitext(path)[1].lower().lstrip(".") or "txt"
+    if tenant is not None:
+        meta["tenant"] = tenant
+    return meta
+
+
+def _flush(store: VectorStore) -> None:
+    """Persist store-side indexes (e.g. BM25) once a file or run is done."""
+    flush = getattr(store, "flush", None)
+    if callable(flush):
+        with span("ingest.flush"):
+            flush()
+
+
+def _upsert_chunks(
+    store: VectorStore, source: str, chunks: List[str], ids: List[str], base: Dict[str, Any]
+) -> None:
+    """Upsert the next batch of a source's chunks, appending their IDs to ``ids``."""
+    first = len(ids)
+    batch_ids = [chunk_id(source, first + n, c) for n, c in enumerate(chunks)]
+    metadatas = [{**base, "chunk_id": first + n} for n in range(len(chunks))]
+    with span("ingest.upsert", chunks=len(chunks), first_chunk=first):
+        store.upsert(chunks, metadatas, ids=batch_ids)
+    ids.extend(batch_ids)
+
+
 def ingest_file(
     path: str,
-    store: ChromaStore,
+    store: VectorStore,
     source_name: Optional[str] = None,
     max_chars: int = 1200,
     overlap: int = 120,
-):
+    manifest: Optional[IngestManifest] = None,
+    batch_size: int = 256,
+    tenant: Optional[str] = None,
+    extra_metadata: Optional[Dict[str, Any]] = None,
+) -> int:
     """
     Ingest a file into the vector store.
 
+    The file is read and chunked as a stream and upserted ``batch_size`` chunks at a
+    time, so memory stays flat regardless of file size. With a ``manifest``, files whose
+    content, chunking parameters and metadata are unchanged are skipped without any
+    embedding call, and chunks left over from a previous version of the file are deleted.
+
+    Every chunk carries filterable metadata (see ``document_metadata``): ``source``,
+    ``chunk_id``, ``doc_type``, ``ingested_at`` and, when given, ``tenant`` and
+    ``extra_metadata``.
+
     Args:
         path: Path to the file to ingest
         store: Vector store instance
         source_name: Optional source name override
         max_chars: Maximum characters per chunk
         overlap: Character overlap between chunks
+        manifest: Optional manifest of previously ingested files
+        batch_size: Chunks per embedding/upsert call
+        tenant: Optional tenant recorded on every chunk
+        extra_metadata: Additional scalar metadata recorded on every chunk
+
+    Returns:
+        Number of chunks upserted (0 when the file was skipped)
 
     Raises:
         IngestionError: If ingestion fails
     """
+    source = source_name or os.path.basename(path)
+    root = span("ingest.file", source=source)
     try:
-        text = read_text_from_path(path)
-        chunks = chunk_text(text, max_chars=max_chars, overlap=overlap)
-        metadatas = [
-            {"source": source_name or os.path.basename(path), "chunk_id": i}
-            for i in range(len(chunks))
-        ]
-        store.upsert(chunks, metadatas)
+        with root:
+            static = document_metadata(path, tenant, extra_metadata)
+            params = {"max_chars": max_chars, "overlap": overlap, "metadata": static}
+            digest = None
+            if manifest is not None:
+                with span("ingest.hash"):
+                    digest = file_sha256(path)
+                if manifest.is_current(source, digest, **params):
+                    log.info(
+                        "Arquivo inalterado, ingestão ignorada",
+                        extra={"extra": {"event": "ingest_skipped", "source": source}},
+                    )
+                    root.set(skipped=True)
+                    return 0
+            base = {**static, "source": source, "ingested_at": int(time.time())}
+            chunks = iter_chunks(iter_text_from_path(path), max_chars=max_chars, overlap=overlap)
+            ids: List[str] = []
+            while True:
+                # Reading and chunking are streamed, so each span covers one batch's worth
+                with span("ingest.chunk") as sp:
+                    batch = list(itertools.islice(chunks, max(batch_size, 1)))
+                    sp.set(chunks=len(batch))
+                if not batch:
+                    break
+                _upsert_chunks(store, source, batch, ids, base)
+            stale: List[str] = []
+            if manifest is not None:
+                previous = manifest.get(source)
+                if previous:
+                    current = set(ids)
+                    stale = [i for i in previous.get("ids", []) if i not in current]
+                    if stale:
+                        with span("ingest.delete_stale", chunks=len(stale)):
+                            store.delete(stale)
+                with span("ingest.manifest"):
+                    assert digest is not None  # hashed above whenever there is a manifest
+                    manifest.set(source, digest, ids, **params)
+                    manifest.save()
+            _flush(store)
+            root.set(chunks=len(ids), deleted=len(stale))
         log.info(
             "Ingestão concluída",
             extra={
                 "extra": {
                     "event": "ingest_ok",
-                    "source": source_name or os.path.basename(path),
-                    "chunks": len(chunks),
+                    "source": source,
+                    "chunks": len(ids),
+                    "deleted": len(stale),
                 }
             },
         )
+        return len(ids)
     except Exception as e:
         log.error(
             "Falha na ingestão",
             extra={"extra": {"event": "ingest_error", "err": str(e), "source": path}},
         )
         raise IngestionError(str(e))
+
+
+def remove_source(source: str, store: VectorStore, manifest: IngestManifest) -> int:
+    """
+    Delete every chunk of a previously ingested source (e.g. a removed file).
+
+    Args:
+        source: Source name as recorded in the manifest
+        store: Vector store instance
+        manifest: Manifest the source was recorded in
+
+    Returns:
+        Number of chunks deleted
+    """
+    entry = manifest.get(source)
+    if entry is None:
+        return 0
+    ids = entry.get("ids", [])
+    store.delete(ids)
+    manifest.remove(source)
+    manifest.save()
+    _flush(store)
+    log.info(
+        "Fonte removida",
+        extra={"extra": {"event": "source_removed", "source": source, "deleted": len(ids)}},
+    )
+    return len(ids)
+
+
+DEFAULT_INCLUDE = ("*.txt", "*.md", "*.pdf")
+
+
+def _matches(relpath: str, patterns: Sequence[str]) -> bool:
+    name = relpath.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(relpath, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def iter_files(
+    root: str,
+    include: Sequence[str] = DEFAULT_INCLUDE,
+    exclude: Sequence[str] = (),
+) -> Iterator[str]:
+    """
+    Walk a directory tree yielding files that match the include/exclude globs.
+
+    Patterns are matched against both the path relative to ``root`` (with ``/``
+    separators) and the bare file name. Files are yielded in sorted order.
+
+    Args:
+        root: Directory to walk
+        include: Globs a file must match to be yielded
+        exclude: Globs that exclude a file (or a whole directory) even if included
+
+    Yields:
+        File paths under ``root``
+    """
+    if not os.path.isdir(root):
+        raise IngestionError(f"Diretório não encontrado: {root}")
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        reldir = "" if reldir == "." else reldir + "/"
+        dirnames[:] = sorted(d for d in dirnames if not _matches(reldir + d, exclude))
+        for name in sorted(filenames):
+            rel = reldir + name
+            if _matches(rel, include) and not _matches(rel, exclude):
+                yield os.path.join(dirpath, name)
+
+
+def _parse_and_chunk(path: str, max_chars: int, overlap: int) -> List[str]:
+    """Process-pool worker: read and chunk one file."""
+    return list(iter_chunks(iter_text_from_path(path), max_chars=max_chars, overlap=overlap))
+
+
+def _fail(result: Dict[str, Any], error: Exception) -> None:
+    result["status"] = "error"
+    result["error"] = str(error)
+    log.error(
+        "Falha na ingestão",
+        extra={"extra": {"event": "ingest_error", "err": str(error), "source": result["path"]}},
+    )
+
+
+def ingest_many(
+    paths: Sequence[str],
+    store: VectorStore,
+    source_names: Optional[Sequence[str]] = None,
+    max_chars: int = 1200,
+    overlap: int = 120,
+    manifest: Optional[IngestManifest] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 256,
+    tenant: Optional[str] = None,
+    extra_metadata: Optional[Dict[str, Any]] = None,
+    stream_threshold: int = 32 * 1024 * 1024,
+) -> List[Dict[str, Any]]:
+    """
+    Ingest many files, parsing and chunking them in a process pool.
+
+    Chunks from different files are pooled into upserts of ``batch_size`` chunks, so
+    many small files still produce full-size embedding calls. Files larger than
+    ``stream_threshold`` bytes (and every file when parsing in this process) are read
+    and chunked as a stream instead, so no file's chunks are ever held in memory at
+    once or shipped back from a worker. A failing file is reported and the run continues.
+
+    Args:
+        paths: Files to ingest
+        store: Vector store instance
+        source_names: Optional source name per path (defaults to the file name)
+        max_chars: Maximum characters per chunk
+        overlap: Character overlap between chunks
+        manifest: Optional manifest of previously ingested files (see ``ingest_file``)
+        workers: Parser processes (None = CPU count; 0 or 1 parses in this process)
+        batch_size: Chunks per embedding/upsert call
+        tenant: Optional tenant recorded on every chunk
+        extra_metadata: Additional scalar metadata recorded on every chunk
+        stream_threshold: Size in bytes above which a file is streamed in this process
+            instead of being parsed in the pool
+
+    Returns:
+        One result per path, in input order, with ``path``, ``source``, ``status``
+        (``"ok"``, ``"skipped"`` or ``"error"``), ``chunks`` and, on failure, ``error``
+    """
+    if source_names is not None and len(source_names) != len(paths):
+        raise ValueError("source_names precisa ter o mesmo tamanho de paths.")
+    if batch_size <= 0:
+        raise ValueError("batch_size precisa ser maior que zero.")
+    if max_chars <= overlap:
+        raise IngestionError("max_chars precisa ser maior que overlap.")
+
+    with span("ingest.many", files=len(paths)):
+        sources = (
+            list(source_names) if source_names is not None else [os.path.basename(p) for p in paths]
+        )
+        results: List[Dict[str, Any]] = [
+            {"path": p, "source": s, "status": "ok", "chunks": 0} for p, s in zip(paths, sources)
+        ]
+        statics = [document_metadata(p, tenant, extra_metadata) for p in paths]
+        ingested_at = int(time.time())
+        digests: Dict[int, str] = {}
+        todo: List[int] = []
+        with span("ingest.hash", files=len(paths)):
+            for i, path in enumerate(paths):
+                if manifest is not None:
+                    try:
+                        digests[i] = file_sha256(path)
+                    except OSError as e:
+                        _fail(results[i], e)
+                        continue
+                    if manifest.is_current(
+                        sources[i],
+                        digests[i],
+                        max_chars=max_chars,
+                        overlap=overlap,
+                        metadata=statics[i],
+                    ):
+                        results[i]["status"] = "skipped"
+                        continue
+                todo.append(i)
+
+        pending: List[Tuple[int, str, Dict[str, Any], str]] = []
+        remaining: Dict[int, int] = {}
+        parsing: Set[int] = set()
+        file_ids: Dict[int, List[str]] = {}
+        stale: List[str] = []
+
+        def finish(i: int) -> None:
+            if results[i]["status"] != "ok" or manifest is None:
+                return
+            ids = file_ids.pop(i, [])
+            previous = manifest.get(sources[i])
+            if previous:
+                current = set(ids)
+                stale.extend(x for x in previous.get("ids", []) if x not in current)
+            manifest.set(
+                sources[i],
+                digests[i],
+                ids,
+                max_chars=max_chars,
+                overlap=overlap,
+                metadata=statics[i],
+            )
+
+        def flush() -> None:
+            batch = pending[:batch_size]
+            del pending[:batch_size]
+            owners = {i for i, _, _, _ in batch}
+            try:
+                with span("ingest.upsert", chunks=len(batch), files=len(owners)):
+                    store.upsert(
+                        [t for _, t, _, _ in batch],
+                        [m for _, _, m, _ in batch],
+                        [x for *_, x in batch],
+                    )
+            except Exception as e:
+                for i in owners:
+                    _fail(results[i], e)
+            for i, _, _, _ in batch:
+                remaining[i] -= 1
+            for i in owners:
+                if remaining[i] == 0 and i not in parsing:
+                    finish(i)
+
+        def collect(i: int, chunks: Iterable[str]) -> None:
+            """Queue a file's chunks, flushing full batches as they fill up."""
+            ids = file_ids[i] = []
+            remaining[i] = 0
+            parsing.add(i)
+            base = {**statics[i], "source": sources[i], "ingested_at": ingested_at}
+            try:
+                for n, chunk in enumerate(chunks):
+                    ids.append(chunk_id(sources[i], n, chunk))
+                    remaining[i] += 1
+                    pending.append((i, chunk, {**base, "chunk_id": n}, ids[-1]))
+                    if len(pending) >= batch_size:
+                        flush()
+            except Exception as e:
+                _fail(results[i], e)
+            finally:
+                parsing.discard(i)
+            results[i]["chunks"] = len(ids)
+            if remaining[i] == 0:
+                finish(i)
+
+        def stream(i: int) -> None:
+            with span("ingest.parse", source=sources[i]) as sp:
+                text = iter_text_from_path(paths[i])
+                collect(i, iter_chunks(text, max_chars=max_chars, overlap=overlap))
+                sp.set(chunks=results[i]["chunks"])
+
+        if workers is not None and workers <= 1:
+            for i in todo:
+                stream(i)
+        elif todo:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            large: List[int] = []
+            small: List[int] = []
+            for i in todo:
+                try:
+                    big = os.path.getsize(paths[i]) > stream_threshold
+                except OSError:
+                    big = False  # let the worker report the error
+                (large if big else small).append(i)
+
+            # Parsing happens in worker processes; upserts of finished files nest under this span
+            with span("ingest.parse_pool", files=len(todo), workers=workers):
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {
+                        pool.submit(_parse_and_chunk, paths[i], max_chars, overlap): i
+                        for i in small
+                    }
+                    # Large files stream here while the workers parse the small ones
+                    for i in large:
+                        stream(i)
+                    for fut in as_completed(futures):
+                        i = futures[fut]
+                        try:
+                            chunks = fut.result()
+                        except Exception as e:
+                            _fail(results[i], e)
+                            continue
+                        collect(i, chunks)
+        while pending:
+            flush()
+
+        if manifest is not None:
+            if stale:
+                try:
+                    with span("ingest.delete_stale", chunks=len(stale)):
+                        store.delete(stale)
+                except Exception as e:
+                    log.error(
+                        "Falha removendo chunks obsoletos",
+                        extra={"extra": {"event": "ingest_error", "err": str(e)}},
+                    )
+            with span("ingest.manifest"):
+                manifest.save()
+        _flush(store)
+
+    counts = {s: sum(r["status"] == s for r in results) for s in ("ok", "skipped", "error")}
+    log.info(
+        "Ingestão em lote concluída",
+        extra={
+            "extra": {
+                "event": "ingest_many_ok",
+                "files": len(results),
+                "chunks": sum(r["chunks"] for r in results if r["status"] == "ok"),
+                "deleted": len(stale),
+                **counts,
+            }
+        },
+    )
+    return results
+
+
+def ingest_directory(
+    root: str,
+    store: VectorStore,
+    include: Sequence[str] = DEFAULT_INCLUDE,
+    exclude: Sequence[str] = (),
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Ingest every matching file under a directory (see ``iter_files`` and ``ingest_many``).
+
+    Sources are named by their path relative to ``root`` (``/`` separated), so files
+    with the same name in different subdirectories do not collide.
+
+    Args:
+        root: Directory to walk
+        store: Vector store instance
+        include: Globs a file must match to be ingested
+        exclude: Globs that exclude files or directories
+        **kwargs: Forwarded to ``ingest_many``
+
+    Returns:
+        Per-file results as returned by ``ingest_many``
+    """
+    paths = list(iter_files(root, include=include, exclude=exclude))
+    sources = [os.path.relpath(p, root).replace(os.sep, "/") for p in paths]
+    return ingest_many(paths, store, source_names=sources, **kwargs)
@@ -0,0 +1,37 @@
+"""PEP 562 lazy attributes for package ``__init__`` modules."""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def attach(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Build the module ``__getattr__`` and ``__dir__`` of a package.
+
+    Each public name is imported from its submodule on first access and then cached
+    in the package namespace, so ``import rag_agent`` loads no submodule (and no
+    optional dependency) until a name is actually used.
+
+    Args:
+        package: The package's ``__name__``
+        exports: Public name -> relative module defining it (e.g. ``".core.agent"``)
+
+    Returns:
+        ``(__getattr__, __dir__)`` to assign at module level
+    """
+
+    def __getattr__(name: str) -> Any:
+        module = exports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,8 +1,33 @@
 """JSON logging configuration."""
 
+import atexit
+import copy
+import importlib
 import json
 import logging
-import time
+import queue
+import random
+import sys
+import threading
+from typing import IO, Any, Dict, List, Optional
+
+from .metrics import REGISTRY, MetricsRegistry
+
+try:
+    orjson: Any = importlib.import_module("orjson")
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    """Serialize a log record, with orjson when installed (``pip install orjson``)."""
+    if orjson is not None:
+        try:
+            encoded: bytes = orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+            return encoded.decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    return json.dumps(obj, ensure_ascii=False, default=str)
 
 
 class JsonFormatter(logging.Formatter):
@@ -13,11 +38,16 @@ class JsonFormatter(logging.Formatter):
             "level": record.levelname,
             "message": record.getMessage(),
             "logger": record.name,
-            "time": int(time.time()),
+            # Creation time, not formatting time (they differ with a queued handler)
+            "time": int(record.created),
         }
         if hasattr(record, "extra"):
-            base.update(record.extra)  # type: ignore
-        return json.dumps(base, ensure_ascii=False)
+            base.update(record.extra)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            base["exc_info"] = record.exc_text
+        return _dumps(base)
 
 
 def setup_logger(name: str = "rag") -> logging.Logger:
@@ -29,3 +59,199 @@ def setup_logger(name: str = "rag") -> logging.Logger:
         handler.setFormatter(JsonFormatter())
         logger.addHandler(handler)
     return logger
+
+
+_STOP = object()
+
+
+class QueuedJsonHandler(logging.Handler):
+    """
+    Hands records to a background thread that serializes and writes them.
+
+    ``emit`` only samples, snapshots the record (see :meth:`prepare`) and enqueues, so
+    JSON encoding and stream backpressure stay off the calling thread. Records of WARNING
+    and above are never sampled out.
+
+    Args:
+        stream: Output stream (defaults to ``sys.stderr``)
+        max_queue: Maximum records waiting to be written
+        overflow: ``"drop"`` discards records while the queue is full; ``"block"``
+            waits for room (up to ``block_timeout`` seconds, then drops)
+        block_timeout: Maximum wait in ``"block"`` mode (None = wait indefinitely)
+        sample_rates: Fraction of records kept per ``event`` (e.g. ``{"answer_ok": 0.1}``);
+            events not listed are always kept
+        batch_size: Maximum records written per stream write/flush
+        registry: Registry receiving the ``rag_log_records_dropped_total`` counter
+        seed: Seed of the sampling random generator
+    """
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        max_queue: int = 10000,
+        overflow: str = "drop",
+        block_timeout: Optional[float] = None,
+        sample_rates: Optional[Dict[str, float]] = None,
+        batch_size: int = 256,
+        registry: Optional[MetricsRegistry] = None,
+        seed: Optional[int] = None,
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError("overflow precisa ser 'drop' ou 'block'.")
+        if max_queue <= 0:
+            raise ValueError("max_queue precisa ser maior que zero.")
+        super().__init__()
+        self.stream = stream if stream is not None else sys.stderr
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.sample_rates = dict(sample_rates or {})
+        self.batch_size = batch_size
+        self.setFormatter(JsonFormatter())
+        self._queue: "queue.Queue[Any]" = queue.Queue(max_queue)
+        self._rng = random.Random(seed)
+        self.dropped = 0
+        self.sampled_out = 0
+        self.written = 0
+        self._dropped_total = (registry if registry is not None else REGISTRY).counter(
+            "rag_log_records_dropped_total",
+            "Registros de log descartados, por motivo.",
+            ["reason"],
+        )
+        self._thread = threading.Thread(target=self._run, name="rag-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _sampled_out(self, record: logging.LogRecord) -> bool:
+        if not self.sample_rates or record.levelno >= logging.WARNING:
+            return False
+        extra = getattr(record, "extra", None)
+        event = extra.get("event") if isinstance(extra, dict) else None
+        rate = self.sample_rates.get(event) if isinstance(event, str) else None
+        return rate is not None and self._rng.random() >= rate
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Snapshot ``record`` for the writer thread, like ``QueueHandler.prepare``.
+
+        The message is rendered and the ``extra`` dict (and its list/dict values) copied
+        now, so later mutation of the arguments does not change what is logged. The
+        traceback is rendered to text and ``exc_info`` dropped so frames are not kept
+        alive while the record waits in the queue.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                formatter = self.formatter or logging.Formatter()
+                record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        extra = getattr(record, "extra", None)
+        if isinstance(extra, dict):
+            record.extra = {
+                k: v.copy() if isinstance(v, (dict, list, set)) else v for k, v in extra.items()
+            }
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._sampled_out(record):
+            self.sampled_out += 1
+            self._dropped_total.inc(reason="sampled")
+            return
+        try:
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            if self.overflow == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._dropped_total.inc(reason="queue_full")
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Any] = [item]
+            while item is not _STOP and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            self._write([r for r in batch if r is not _STOP])
+            if batch[-1] is _STOP:
+                return
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.handleError(records[-1])
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and record counts (``dropped`` counts queue overflows only)."""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+        }
+
+    def close(self) -> None:
+        """Write out every queued record and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        atexit.unregister(self.close)
+        super().close()
+
+
+def configure_logging(
+    name: str = "rag",
+    level: str = "INFO",
+    queued: bool = False,
+    stream: Optional[IO[str]] = None,
+    **queue_options: Any,
+) -> logging.Handler:
+    """
+    Replace the handlers of logger ``name`` with a JSON handler.
+
+    Args:
+        name: Logger name
+        level: Log level name
+        queued: Use a :class:`QueuedJsonHandler` (background writer thread) instead of
+            a synchronous ``StreamHandler``
+        stream: Output stream (defaults to ``sys.stderr``)
+        **queue_options: ``QueuedJsonHandler`` options (``max_queue``, ``overflow``,
+            ``block_timeout``, ``sample_rates``, ``batch_size``, ``registry``, ``seed``)
+
+    Returns:
+        The installed handler
+    """
+    logger = logging.getLogger(name)
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+        old.close()
+    handler: logging.Handler
+    if queued:
+        handler = QueuedJsonHandler(stream, **queue_options)
+    else:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    return handler
@@ -0,0 +1,79 @@
+"""Persisted manifest of ingested files for incremental re-ingestion."""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..core.exceptions import IngestionError
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file's bytes without loading it whole into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """
+    JSON manifest mapping each ingested source to its file hash and chunk IDs.
+
+    It lets ingestion skip unchanged files without any embedding call and delete
+    chunks that no longer exist when a file shrinks or is removed.
+
+    Args:
+        path: JSON file holding the manifest (created on first save)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                raise IngestionError(f"Manifesto inválido em {path}: {e}")
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry for ``source`` or None."""
+        with self._lock:
+            return self._entries.get(source)
+
+    def set(self, source: str, sha256: str, ids: List[str], **params: Any) -> None:
+        """Record the hash, chunk IDs and chunking parameters of an ingested source."""
+        with self._lock:
+            self._entries[source] = {"sha256": sha256, "ids": list(ids), **params}
+
+    def remove(self, source: str) -> Optional[Dict[str, Any]]:
+        """Forget ``source`` and return its previous entry."""
+        with self._lock:
+            return self._entries.pop(source, None)
+
+    def sources(self) -> List[str]:
+        """Return every source currently recorded."""
+        with self._lock:
+            return list(self._entries)
+
+    def is_current(self, source: str, sha256: str, **params: Any) -> bool:
+        """Whether ``source`` was already ingested from identical content and parameters."""
+        entry = self.get(source)
+        if entry is None or entry.get("sha256") != sha256:
+            return False
+        return all(entry.get(k) == v for k, v in params.items())
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False)
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
@@ -0,0 +1,328 @@
+"""Per-request stage timings and an in-process metrics registry (Prometheus text format)."""
+
+import bisect
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers in-memory cache hits up to slow LLM generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 100)
+TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+_active: "contextvars.ContextVar[Optional[StageTimer]]" = contextvars.ContextVar(
+    "rag_stage_timer", default=None
+)
+
+
+class StageTimer:
+    """
+    Monotonic (``perf_counter``) timings of the stages of one request.
+
+    Time spent in a stage is accumulated, so a stage entered several times reports
+    its total.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def stage(self, name: str) -> "_Stage":
+        """Time the enclosed block as stage ``name``."""
+        return _Stage(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["StageTimer"]:
+        """Make this timer receive the stages recorded with :func:`stage` in the block."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def merge(self, other: "StageTimer") -> None:
+        """Add another timer's stages (time shared by the requests of a batch)."""
+        for name, seconds in other.stages.items():
+            self.add(name, seconds)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage timings in milliseconds, plus ``total``."""
+        out = {name: round(s * 1000, 1) for name, s in self.stages.items()}
+        out["total"] = self.elapsed_ms()
+        return out
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "t0")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self.timer = timer
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> None:
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.timer.add(self.name, time.perf_counter() - self.t0)
+
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+def stage(name: str) -> Any:
+    """Record the enclosed block on the active :class:`StageTimer`, if any."""
+    timer = _active.get()
+    if timer is None:
+        return _NO_STAGE
+    return _Stage(timer, name)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels de '{self.name}' devem ser {list(self.labelnames)}.")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def sum(self, **labels: str) -> float:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[1] if state else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+_M = TypeVar("_M", bound=_Metric)
+
+
+class MetricsRegistry:
+    """Named counters and histograms rendered together in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: Type[_M], name: str, *args: Any, **kwargs: Any) -> _M:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                created = self._metrics[name] = cls(name, *args, **kwargs)
+                return created
+            if not isinstance(metric, cls):
+                raise ValueError(f"Métrica '{name}' já registrada como {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter ``name``, creating it on first use."""
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram ``name``, creating it on first use."""
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (``CONTENT_TYPE``)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "".join(line + "\n" for m in metrics for line in m.render())
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RagMetrics:
+    """
+    The metrics recorded by ``RagAgent``.
+
+    Args:
+        registry: Registry the metrics are created in (defaults to ``REGISTRY``)
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        registry = registry if registry is not None else REGISTRY
+        self.requests = registry.counter(
+            "rag_requests_total", "Perguntas respondidas, por resultado.", ["outcome"]
+        )
+        self.errors = registry.counter(
+            "rag_errors_total", "Falhas de perguntas, por tipo de erro.", ["type"]
+        )
+        self.request_seconds = registry.histogram(
+            "rag_request_seconds", "Latência total por pergunta."
+        )
+        self.stage_seconds = registry.histogram(
+            "rag_stage_seconds", "Latência por etapa do pipeline.", ["stage"]
+        )
+        self.retrieved_chunks = registry.histogram(
+            "rag_retrieved_chunks",
+            "Chunks recuperados abaixo do limiar de distância.",
+            buckets=COUNT_BUCKETS,
+        )
+        self.context_chunks = registry.histogram(
+            "rag_context_chunks", "Chunks incluídos no prompt.", buckets=COUNT_BUCKETS
+        )
+        self.prompt_tokens = registry.histogram(
+            "rag_prompt_tokens", "Tamanho do prompt em tokens.", buckets=TOKEN_BUCKETS
+        )
+
+    def finish(self, timer: StageTimer, outcome: str, error: Optional[str] = None) -> None:
+        """Record a finished request: its outcome, stage timings and total latency."""
+        self.requests.inc(outcome=outcome)
+        if error is not None:
+            self.errors.inc(type=error)
+        for name, seconds in timer.stages.items():
+            self.stage_seconds.observe(seconds, stage=name)
+        self.request_seconds.observe(time.perf_counter() - timer.start)
+
+
+def serve_metrics(
+    port: int = 9464, host: str = "127.0.0.1", registry: Optional[MetricsRegistry] = None
+) -> Any:
+    """
+    Serve ``registry.render()`` at ``/metrics`` from a background thread.
+
+    Returns:
+        The running ``ThreadingHTTPServer`` (call ``shutdown()`` to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    source = registry if registry is not None else REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="rag-metrics", daemon=True).start()
+    return server
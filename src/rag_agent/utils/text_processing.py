@@ -1,6 +1,6 @@
 """Text processing utilities."""
 
-from typing import List
+from typing import Iterable, Iterator, List
 
 from ..core.exceptions import IngestionError
 
@@ -36,3 +36,41 @@ def chunk_text(text: str, max_chars: int = 1200, overlap: int = 120) -> List[str
         start = end - overlap
 
     return chunks
+
+
+def iter_chunks(pieces: Iterable[str], max_chars: int = 1200, overlap: int = 120) -> Iterator[str]:
+    """
+    Lazily split a stream of text pieces into overlapping chunks.
+
+    Yields exactly the chunks ``chunk_text("".join(pieces), ...)`` would return while
+    only buffering about one piece plus one chunk, so memory stays flat for
+    arbitrarily large inputs.
+
+    Args:
+        pieces: Text fragments in document order (e.g. file blocks or PDF pages)
+        max_chars: Maximum characters per chunk
+        overlap: Character overlap between chunks
+
+    Yields:
+        Text chunks
+
+    Raises:
+        IngestionError: If max_chars <= overlap
+    """
+    if max_chars <= overlap:
+        raise IngestionError("max_chars precisa ser maior que overlap.")
+
+    step = max_chars - overlap
+    buf = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        buf += piece
+        start = 0
+        # Only emit while more text follows the chunk, so the last chunk is decided at EOF
+        while len(buf) - start > max_chars:
+            yield buf[start : start + max_chars]
+            start += step
+        if start:
+            buf = buf[start:]
+    yield from chunk_text(buf, max_chars=max_chars, overlap=overlap)
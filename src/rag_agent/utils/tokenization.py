@@ -0,0 +1,106 @@
+"""Token counting helpers for prompt budgeting and request batching."""
+
+import functools
+import hashlib
+from typing import Any, Optional
+
+from ..core.protocols import Tokenizer
+from .cache import LRUCache
+from .logging import setup_logger
+
+log = setup_logger("rag")
+
+
+class HeuristicTokenizer:
+    """
+    Conservative character-based token estimate used when tiktoken is unavailable.
+
+    Args:
+        chars_per_token: Characters assumed per token (lower = more conservative)
+    """
+
+    def __init__(self, chars_per_token: float = 2.0):
+        if chars_per_token <= 0:
+            raise ValueError("chars_per_token precisa ser maior que zero.")
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        """Estimate the token count of ``text``."""
+        # Portuguese text averages well under 3 characters per token on cl100k-style vocabularies
+        return int(len(text) / self.chars_per_token) + 1
+
+
+class TiktokenTokenizer:
+    """
+    Exact token counts through ``tiktoken`` (``pip install tiktoken``).
+
+    Args:
+        model: Model name used to pick the encoding; unknown models use ``encoding``
+        encoding: Fallback encoding name
+    """
+
+    def __init__(self, model: Optional[str] = None, encoding: str = "cl100k_base"):
+        import tiktoken
+
+        enc: Any = None
+        if model:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = None
+        self.enc = enc or tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        """Return the exact token count of ``text``."""
+        return len(self.enc.encode(text, disallowed_special=()))
+
+
+class CachedTokenizer:
+    """
+    Memoizes another tokenizer's counts, keyed by a digest of the text.
+
+    Retrieved chunks repeat across questions, so most counts become dictionary hits.
+
+    Args:
+        tokenizer: Tokenizer to wrap
+        max_entries: Maximum number of memoized counts
+    """
+
+    def __init__(self, tokenizer: Tokenizer, max_entries: int = 10_000):
+        self.tokenizer = tokenizer
+        self._cache: LRUCache[int] = LRUCache(max_entries)
+
+    def count(self, text: str) -> int:
+        """Return the (memoized) token count of ``text``."""
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        n = self._cache.get(key)
+        if n is None:
+            n = self.tokenizer.count(text)
+            self._cache.put(key, n)
+        return n
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(model: Optional[str] = None) -> CachedTokenizer:
+    """
+    Return the shared cached tokenizer for ``model``.
+
+    Uses tiktoken when it is installed and its encoding can be loaded. Otherwise (not
+    installed, or offline without a cached encoding file) it falls back to
+    :class:`HeuristicTokenizer`. Models tiktoken does not know (e.g. Ollama tags) are
+    counted with ``cl100k_base``, which is an approximation for them.
+
+    Args:
+        model: Model name used to pick the tiktoken encoding (None = cl100k_base)
+    """
+    try:
+        base: Tokenizer = TiktokenTokenizer(model)
+    except ImportError:
+        base = HeuristicTokenizer()
+    except Exception as e:
+        log.warning(
+            "Tokenizer indisponível, usando estimativa por caracteres",
+            extra={"extra": {"event": "tokenizer_fallback", "model": model, "err": str(e)}},
+        )
+        base = HeuristicTokenizer()
+    return CachedTokenizer(base)
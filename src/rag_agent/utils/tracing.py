@@ -0,0 +1,264 @@
+"""Lightweight tracing: nested spans with request IDs and pluggable exporters."""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from typing import IO, Any, Dict, Generator, Optional, TypeVar, Union, cast
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "rag_span", default=None
+)
+
+_Y = TypeVar("_Y")
+_S = TypeVar("_S")
+_R = TypeVar("_R")
+
+
+class Span:
+    """
+    One timed operation, nested under the span active when it started.
+
+    Use as a context manager (see :func:`span`). Spans inherit ``trace_id`` and
+    ``request_id`` from their parent.
+    """
+
+    recording = True
+
+    __slots__ = (
+        "name",
+        "tracer",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "request_id",
+        "attributes",
+        "start",
+        "duration_ms",
+        "error",
+        "_t0",
+        "_token",
+        "_parent",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        tracer: "Tracer",
+        request_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        parent = _current.get()
+        self.name = name
+        self.tracer = tracer
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id: Optional[str] = parent.span_id if parent is not None else None
+        self.trace_id: str = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.request_id: Optional[str] = request_id or (
+            parent.request_id if parent is not None else None
+        )
+        self.attributes = attributes or {}
+        self.start = 0.0
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+        self._t0 = 0.0
+        self._token: Any = None
+        self._parent: Optional[Span] = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._parent = _current.get()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.error = exc_type.__name__
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another context: put back whatever was active when it started
+            _current.set(self._parent)
+        self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "request_id": self.request_id,
+            "start": round(self.start, 6),
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Span handed out while tracing is disabled; every operation does nothing."""
+
+    recording = False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Base tracer; records nothing. Subclasses set ``enabled`` and implement ``export``."""
+
+    enabled = False
+
+    def export(self, span: Span) -> None:
+        """Receive a finished span."""
+
+    def close(self) -> None:
+        """Release exporter resources."""
+
+
+class JsonLinesTracer(Tracer):
+    """
+    Writes every finished span as one JSON line, for offline analysis.
+
+    Children finish (and are written) before their parents; rebuild the tree from
+    ``trace_id``/``parent_id`` and order it by ``start``.
+
+    Args:
+        target: File path (appended to) or an open text stream
+    """
+
+    enabled = True
+
+    def __init__(self, target: Union[str, "os.PathLike[str]", IO[str]]):
+        if isinstance(target, (str, os.PathLike)):
+            self._stream: IO[str] = open(target, "a", encoding="utf-8")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._stream.flush()
+            if self._owned:
+                self._stream.close()
+
+
+_tracer: Tracer = Tracer()
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Tracer:
+    """
+    Install the process-wide tracer (None restores the no-op default).
+
+    Returns:
+        The previously installed tracer
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+    return previous
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, request_id: Optional[str] = None, **attributes: Any) -> Any:
+    """
+    Start a span (use as ``with span("store.search", k=5) as sp:``).
+
+    While tracing is disabled this returns a shared no-op span, so instrumentation
+    costs one attribute check.
+    """
+    tracer = _tracer
+    if not tracer.enabled:
+        return _NOOP_SPAN
+    return Span(name, tracer, request_id, attributes)
+
+
+def isolate_context(gen: Generator[_Y, _S, _R]) -> Generator[_Y, _S, _R]:
+    """
+    Run every step of ``gen`` in a private copy of the current context.
+
+    A generator that opens spans (or timers) and yields inside them would otherwise leave
+    them active in the consumer's context between items, so spans the consumer opens
+    while iterating get the wrong parent. The copy is taken now, so spans inside ``gen``
+    still nest under the span active at call time.
+    """
+    return _drive(gen, contextvars.copy_context())
+
+
+def _drive(gen: Generator[_Y, _S, _R], ctx: contextvars.Context) -> Generator[_Y, _S, _R]:
+    try:
+        item = ctx.run(next, gen)
+        while True:
+            try:
+                sent = yield item
+            except GeneratorExit:
+                ctx.run(gen.close)
+                raise
+            except BaseException as e:
+                item = ctx.run(gen.throw, e)
+            else:
+                item = ctx.run(gen.send, sent)
+    except StopIteration as stop:
+        return cast(_R, stop.value)
+
+
+def current_span() -> Any:
+    """The innermost active span, or the no-op span when there is none."""
+    active = _current.get()
+    return active if active is not None else _NOOP_SPAN
+
+
+def folded_stacks(path: str) -> Dict[str, int]:
+    """
+    Aggregate a JSON-lines span file into folded stacks for flame-graph tools.
+
+    Each key is a ``;``-joined span path from the root (e.g.
+    ``rag.ask;rag.retrieve;store.embed``) and each value the span's self time in
+    microseconds (its duration minus its children's), summed over all traces. Write
+    them as ``f"{stack} {value}"`` lines for ``flamegraph.pl`` or speedscope.
+    """
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    by_id = {r["span_id"]: r for r in records}
+    child_ms: Dict[str, float] = {}
+    for r in records:
+        if r["parent_id"] in by_id:
+            child_ms[r["parent_id"]] = child_ms.get(r["parent_id"], 0.0) + r["duration_ms"]
+
+    out: Dict[str, int] = {}
+    for r in records:
+        names, node = [], r
+        while node is not None:
+            names.append(node["name"])
+            node = by_id.get(node["parent_id"])
+        stack = ";".join(reversed(names))
+        self_us = max(0, round((r["duration_ms"] - child_ms.get(r["span_id"], 0.0)) * 1000))
+        out[stack] = out.get(stack, 0) + self_us
+    return out
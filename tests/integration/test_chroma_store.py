@@ -0,0 +1,207 @@
+"""Integration tests for ChromaStore behaviour."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent import ChromaStore
+
+
+class CountingEmbedding:
+    """Deterministic embedding provider that counts embedded texts."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(text)), ord(text[0]) if text else 0.0, 1.0] for text in texts]
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+def _store(temp_dir, name, **kwargs):
+    embedder = CountingEmbedding()
+    store = ChromaStore(collection=name, embedder=embedder, persist_dir=temp_dir, **kwargs)
+    store.upsert(
+        ["alpha document", "beta document", "gamma"],
+        [{"source": "a.txt", "chunk_id": i} for i in range(3)],
+    )
+    return store, embedder
+
+
+class TestQueryCache:
+    """Tests for the retrieval result cache."""
+
+    def test_disabled_by_default(self, temp_dir):
+        store, embedder = _store(temp_dir, "no_cache")
+        before = embedder.embedded
+        store.query("alpha", k=2)
+        store.query("alpha", k=2)
+
+        assert embedder.embedded == before + 2
+        assert store.cache_stats() == {}
+
+    def test_repeated_query_served_from_cache(self, temp_dir):
+        store, embedder = _store(temp_dir, "cache_hit", query_cache_size=16)
+        before = embedder.embedded
+
+        first = store.query("alpha", k=2)
+        second = store.query("alpha", k=2)
+        store.query("alpha", k=3)
+
+        assert first == second
+        assert embedder.embedded == before + 2
+        stats = store.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_upsert_invalidates(self, temp_dir):
+        store, embedder = _store(temp_dir, "cache_invalidate", query_cache_size=16)
+        store.query("alpha", k=5)
+        version = store.version
+
+        store.upsert(["alpha two"], [{"source": "b.txt", "chunk_id": 0}])
+        docs, _, _ = store.query("alpha", k=5)
+
+        assert store.version == version + 1
+        assert "alpha two" in docs
+        assert store.cache_stats()["size"] == 1
+
+    def test_query_many_mixes_hits_and_misses(self, temp_dir):
+        store, embedder = _store(temp_dir, "cache_many", query_cache_size=16)
+        single = store.query("alpha", k=2)
+        before = embedder.embedded
+
+        results = store.query_many(["alpha", "beta"], k=2)
+
+        assert results[0] == single
+        assert embedder.embedded == before + 1
+
+    def test_cached_results_are_copies(self, temp_dir):
+        store, _ = _store(temp_dir, "cache_copy", query_cache_size=16)
+        docs, _, _ = store.query("alpha", k=2)
+        docs.clear()
+
+        assert len(store.query("alpha", k=2)[0]) == 2
+
+    def test_cached_metadata_is_copied(self, temp_dir):
+        store, _ = _store(temp_dir, "cache_meta_copy", query_cache_size=16)
+        _, metas, _ = store.query("alpha", k=2)
+        metas[0]["source"] = "mutated"
+        metas[0]["stitched"] = True
+
+        _, again, _ = store.query("alpha", k=2)
+
+        assert again[0]["source"] != "mutated"
+        assert "stitched" not in again[0]
+
+
+class KeywordBlindEmbedding:
+    """Embedding that ignores identifiers, so only BM25 can find them."""
+
+    def embed(self, texts):
+        return [[0.0, 0.0, 1.0] if "rede" in text else [1.0, 0.0, 0.0] for text in texts]
+
+
+def _hybrid_store(temp_dir, name="hybrid", **kwargs):
+    store = ChromaStore(
+        collection=name,
+        embedder=KeywordBlindEmbedding(),
+        persist_dir=temp_dir,
+        hybrid=True,
+        hybrid_candidates=2,
+        **kwargs,
+    )
+    texts = [f"bomba manual seção {i}" for i in range(8)] + [
+        "configuração de rede ERR-4312 do controlador"
+    ]
+    ids = [f"doc{i}" for i in range(len(texts))]
+    store.upsert(texts, [{"source": "m.txt", "chunk_id": i} for i in range(len(texts))], ids)
+    return store
+
+
+class TestHybridQuery:
+    """Tests for BM25 + dense fusion in ChromaStore."""
+
+    def test_identifier_found_only_with_hybrid(self, temp_dir):
+        store = _hybrid_store(temp_dir)
+
+        dense_docs, _, _ = store.query("bomba ERR-4312", k=2, hybrid=False)
+        docs, metas, dists = store.query("bomba ERR-4312", k=2)
+
+        assert not any("ERR-4312" in d for d in dense_docs)
+        assert any("ERR-4312" in d for d in docs)
+        assert len(docs) == len(metas) == len(dists) == 2
+
+    def test_lexical_hits_keep_true_cosine_distance(self, temp_dir):
+        store = _hybrid_store(temp_dir)
+
+        docs, _, dists = store.query("bomba ERR-4312", k=2)
+        distance = dists[[i for i, d in enumerate(docs) if "ERR-4312" in d][0]]
+
+        # Orthogonal to the query embedding
+        assert distance == pytest.approx(1.0, abs=0.02)
+
+    def test_query_many_matches_query(self, temp_dir):
+        store = _hybrid_store(temp_dir)
+
+        batched = store.query_many(["bomba ERR-4312", "bomba seção 3"], k=2)
+
+        assert batched[0] == store.query("bomba ERR-4312", k=2)
+        assert batched[1] == store.query("bomba seção 3", k=2)
+
+    def test_delete_and_persistence(self, temp_dir):
+        store = _hybrid_store(temp_dir)
+        store.delete(["doc8"])
+        store.flush()
+
+        reopened = ChromaStore(
+            collection="hybrid", embedder=KeywordBlindEmbedding(), persist_dir=temp_dir, hybrid=True
+        )
+
+        assert len(reopened.bm25) == 8
+        assert reopened.bm25.search("ERR-4312") == []
+
+    def test_index_bootstrapped_from_existing_collection(self, temp_dir):
+        plain, _ = _store(temp_dir, "bootstrap")
+
+        hybrid = ChromaStore(
+            collection="bootstrap", embedder=CountingEmbedding(), persist_dir=temp_dir, hybrid=True
+        )
+
+        assert len(hybrid.bm25) == 3
+        assert hybrid.bm25.search("gamma")[0][1] > 0
+
+    def test_lost_index_save_is_reconciled(self, temp_dir):
+        store = _hybrid_store(temp_dir, bm25_save_interval=3600)
+        store.flush()
+        # Written after the last save and lost in a crash, then one more write without BM25
+        store.upsert(["nova seção ERR-7001"], [{"source": "n.txt", "chunk_id": 0}], ["doc9"])
+        plain = ChromaStore(
+            collection="hybrid", embedder=KeywordBlindEmbedding(), persist_dir=temp_dir
+        )
+        plain.upsert(["anexo ERR-8002"], [{"source": "a.txt", "chunk_id": 0}], ["doc10"])
+
+        reopened = ChromaStore(
+            collection="hybrid", embedder=KeywordBlindEmbedding(), persist_dir=temp_dir, hybrid=True
+        )
+
+        assert len(reopened.bm25) == 11
+        assert reopened.bm25.search("ERR-7001")[0][0] == "doc9"
+        assert reopened.bm25.search("ERR-8002")[0][0] == "doc10"
+
+    def test_hybrid_requires_index(self, temp_dir):
+        store, _ = _store(temp_dir, "no_index")
+
+        with pytest.raises(ValueError):
+            store.query("alpha", hybrid=True)
@@ -1,5 +1,6 @@
 """Integration tests for the full RAG pipeline."""
 
+import asyncio
 import sys
 import tempfile
 from pathlib import Path
@@ -26,6 +27,17 @@ class MockEmbedding:
         return [[float(len(text)), ord(text[0]) if text else 0.0, 1.0] for text in texts]
 
 
+class AsyncMockEmbedding(MockEmbedding):
+    """Mock embedding provider exposing the async protocol."""
+
+    def __init__(self):
+        self.async_calls = 0
+
+    async def aembed(self, texts):
+        self.async_calls += 1
+        return self.embed(texts)
+
+
 class MockLLM:
     """Mock LLM provider for testing."""
 
@@ -178,3 +190,38 @@ class TestFullPipeline:
         assert len(sources) >= 1  # At least one source should be used
 
         assert result["answer"] == "Both Python and JavaScript are programming languages."
+
+    def test_async_pipeline(self, temp_dir, sample_documents):
+        """Test aask end to end with an async-capable embedder."""
+        doc1_path, _ = sample_documents
+
+        embedder = AsyncMockEmbedding()
+        llm = MockLLM("Based on the context, this is about artificial intelligence.")
+        store = ChromaStore(collection="test_async", embedder=embedder, persist_dir=temp_dir)
+        ingest_file(doc1_path, store, source_name="doc1.txt")
+
+        agent = RagAgent(store=store, llm=llm, top_k=2, distance_threshold=0.5)
+        result = asyncio.run(agent.aask("What is this about?"))
+
+        assert "artificial intelligence" in result["answer"]
+        assert embedder.async_calls == 1
+
+    def test_ask_many_pipeline(self, temp_dir, sample_documents):
+        """Test batched questions against a real collection."""
+        doc1_path, doc2_path = sample_documents
+
+        embedder = MockEmbedding()
+        llm = MockLLM("Based on the context, this is about artificial intelligence.")
+        store = ChromaStore(collection="test_ask_many", embedder=embedder, persist_dir=temp_dir)
+        ingest_file(doc1_path, store, source_name="doc1.txt")
+        ingest_file(doc2_path, store, source_name="doc2.txt")
+
+        retrieved = store.query_many(["What is this about?", "Another question"], k=2)
+        assert len(retrieved) == 2
+        assert retrieved[0] == store.query("What is this about?", k=2)
+
+        agent = RagAgent(store=store, llm=llm, top_k=2, distance_threshold=0.5)
+        results = agent.ask_many(["What is this about?", "Another question"])
+
+        assert len(results) == 2
+        assert all("artificial intelligence" in r["answer"] for r in results)
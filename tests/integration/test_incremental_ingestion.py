@@ -0,0 +1,378 @@
+"""Integration tests for incremental re-ingestion with a manifest."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent import (
+    ChromaStore,
+    IngestionError,
+    IngestManifest,
+    chunk_text,
+    ingest_directory,
+    ingest_file,
+    ingest_many,
+    iter_text_from_path,
+    read_text_from_path,
+    remove_source,
+)
+from rag_agent.utils.ingestion import chunk_ids, iter_files
+from rag_agent.utils.tracing import Tracer, set_tracer
+
+
+class CountingEmbedding:
+    """Deterministic embedding provider that counts embedded texts."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return [[float(len(text)), ord(text[0]) if text else 0.0, 1.0] for text in texts]
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+def _write(path, paragraphs):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+class TestChunkIds:
+    """Tests for deterministic chunk IDs."""
+
+    def test_stable_across_calls(self):
+        assert chunk_ids("a.txt", ["x", "y"]) == chunk_ids("a.txt", ["x", "y"])
+
+    def test_depend_on_source_index_and_content(self):
+        base = chunk_ids("a.txt", ["x", "y"])
+        assert chunk_ids("b.txt", ["x", "y"]) != base
+        assert chunk_ids("a.txt", ["y", "x"])[0] != base[0]
+        assert chunk_ids("a.txt", ["x", "z"])[1] != base[1]
+        assert len(set(chunk_ids("a.txt", ["x", "x"]))) == 2
+
+
+class TestIncrementalIngestion:
+    """Tests for manifest-driven ingestion."""
+
+    def _setup(self, temp_dir):
+        embedder = CountingEmbedding()
+        store = ChromaStore("incremental", embedder, persist_dir=temp_dir)
+        manifest = IngestManifest(os.path.join(temp_dir, "manifest.json"))
+        return store, embedder, manifest
+
+    def test_unchanged_file_is_skipped(self, temp_dir):
+        store, embedder, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Parágrafo um. " * 40, "Parágrafo dois. " * 40])
+
+        first = ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+        embedded = embedder.embedded
+        version = store.version
+        second = ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+
+        assert first > 0
+        assert second == 0
+        assert embedder.embedded == embedded
+        assert store.version == version
+
+    def test_ingestion_steps_are_traced(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Parágrafo um. " * 40, "Parágrafo dois. " * 40])
+        spans = []
+
+        class Recording(Tracer):
+            enabled = True
+
+            def export(self, span):
+                spans.append(span.to_dict())
+
+        previous = set_tracer(Recording())
+        try:
+            chunks = ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+        finally:
+            set_tracer(previous)
+
+        names = {s["name"] for s in spans}
+        assert {"ingest.hash", "ingest.chunk", "ingest.upsert", "ingest.manifest"} <= names
+        assert {"store.upsert", "store.embed", "store.write"} <= names
+        root = next(s for s in spans if s["name"] == "ingest.file")
+        assert root["attributes"]["chunks"] == chunks
+        assert all(s["trace_id"] == root["trace_id"] for s in spans)
+
+    def test_manifest_persists_across_instances(self, temp_dir):
+        store, embedder, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Conteúdo estável. " * 20])
+        ingest_file(doc, store, manifest=manifest)
+
+        reloaded = IngestManifest(manifest.path)
+        embedded = embedder.embedded
+
+        assert ingest_file(doc, store, manifest=reloaded) == 0
+        assert embedder.embedded == embedded
+
+    def test_changed_chunking_parameters_reingest(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Texto. " * 100])
+        ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+
+        assert ingest_file(doc, store, max_chars=200, overlap=0, manifest=manifest) > 0
+
+    def test_shrunk_file_deletes_stale_chunks(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        paragraphs = [f"Seção {i}. " + "conteúdo " * 30 for i in range(5)]
+        _write(doc, paragraphs)
+        ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+        before = store.col.count()
+
+        _write(doc, paragraphs[:2])
+        ingest_file(doc, store, max_chars=300, overlap=0, manifest=manifest)
+
+        assert store.col.count() < before
+        assert sorted(store.col.get()["ids"]) == sorted(manifest.get("doc.txt")["ids"])
+
+    def test_reingest_without_manifest_does_not_duplicate(self, temp_dir):
+        store, _, _ = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Texto repetido. " * 50])
+        ingest_file(doc, store)
+        count = store.col.count()
+        ingest_file(doc, store)
+
+        assert store.col.count() == count
+
+    def test_chunks_carry_filterable_metadata(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "guia.md")
+        _write(doc, ["Conteúdo do guia. " * 30])
+
+        ingest_file(doc, store, manifest=manifest, tenant="acme", extra_metadata={"versao": 2})
+
+        metas = store.col.get(include=["metadatas"])["metadatas"]
+        assert {m["doc_type"] for m in metas} == {"md"}
+        assert {m["tenant"] for m in metas} == {"acme"}
+        assert {m["versao"] for m in metas} == {2}
+        assert all(isinstance(m["ingested_at"], int) for m in metas)
+        docs, _, _ = store.query("guia", k=1, where={"tenant": "outro"})
+        assert docs == []
+
+    def test_changed_metadata_reingests(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Texto. " * 50])
+        ingest_file(doc, store, manifest=manifest, tenant="a")
+
+        assert ingest_file(doc, store, manifest=manifest, tenant="a") == 0
+        assert ingest_file(doc, store, manifest=manifest, tenant="b") > 0
+        assert {m["tenant"] for m in store.col.get()["metadatas"]} == {"b"}
+
+    def test_invalid_extra_metadata(self, temp_dir):
+        store, _, _ = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Texto."])
+
+        with pytest.raises(IngestionError):
+            ingest_file(doc, store, extra_metadata={"source": "outro"})
+        with pytest.raises(IngestionError):
+            ingest_file(doc, store, extra_metadata={"tags": ["a", "b"]})
+
+    def test_remove_source(self, temp_dir):
+        store, _, manifest = self._setup(temp_dir)
+        doc = os.path.join(temp_dir, "doc.txt")
+        _write(doc, ["Será removido. " * 30])
+        ingest_file(doc, store, manifest=manifest)
+        os.remove(doc)
+
+        deleted = remove_source("doc.txt", store, manifest)
+
+        assert deleted > 0
+        assert store.col.count() == 0
+        assert manifest.get("doc.txt") is None
+        assert remove_source("doc.txt", store, manifest) == 0
+
+
+class RecordingStore:
+    """Minimal store that records upsert batch sizes."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.metadatas = []
+        self.ids = set()
+        self.deleted = []
+        self.fail_on = fail_on
+
+    def upsert(self, texts, metadatas, ids=None):
+        if self.fail_on and any(self.fail_on in t for t in texts):
+            raise RuntimeError("upsert falhou")
+        self.batches.append(len(texts))
+        self.metadatas.extend(metadatas)
+        self.ids.update(ids)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        self.ids.difference_update(ids)
+
+
+def _tree(root):
+    os.makedirs(os.path.join(root, "sub"))
+    os.makedirs(os.path.join(root, "skip"))
+    for i in range(6):
+        _write(os.path.join(root, f"doc{i}.txt"), [f"Documento {i}. " * 10])
+    _write(os.path.join(root, "sub", "doc0.txt"), ["Outro documento. " * 10])
+    _write(os.path.join(root, "skip", "ignored.txt"), ["Ignorado."])
+    _write(os.path.join(root, "notes.log"), ["Fora do include."])
+
+
+class TestDirectoryIngestion:
+    """Tests for ingest_directory / ingest_many."""
+
+    def test_iter_files_globs(self, temp_dir):
+        _tree(temp_dir)
+        rel = [
+            os.path.relpath(p, temp_dir).replace(os.sep, "/")
+            for p in iter_files(temp_dir, exclude=["skip"])
+        ]
+
+        assert "sub/doc0.txt" in rel
+        assert "notes.log" not in rel
+        assert not any(r.startswith("skip/") for r in rel)
+        assert len(rel) == 7
+
+    def test_small_files_fill_batches(self, temp_dir):
+        _tree(temp_dir)
+        store = RecordingStore()
+
+        results = ingest_directory(
+            temp_dir, store, exclude=["skip"], workers=1, batch_size=4, max_chars=1000
+        )
+
+        assert [r["status"] for r in results] == ["ok"] * 7
+        assert store.batches == [4, 3]
+        assert {r["source"] for r in results} >= {"doc0.txt", "sub/doc0.txt"}
+
+    def test_failures_do_not_stop_the_run(self, temp_dir):
+        good = os.path.join(temp_dir, "good.txt")
+        _write(good, ["Bom. " * 10])
+        store = RecordingStore()
+
+        results = ingest_many([os.path.join(temp_dir, "missing.txt"), good], store, workers=1)
+
+        assert results[0]["status"] == "error"
+        assert "error" in results[0]
+        assert results[1]["status"] == "ok"
+        assert store.batches == [1]
+
+    def test_upsert_failure_marks_only_batch_files(self, temp_dir):
+        paths = []
+        for name in ("a.txt", "b.txt"):
+            paths.append(os.path.join(temp_dir, name))
+            _write(paths[-1], [f"{name} conteúdo"])
+        store = RecordingStore(fail_on="b.txt")
+
+        results = ingest_many(paths, store, workers=1, batch_size=1)
+
+        assert [r["status"] for r in results] == ["ok", "error"]
+
+    def test_metadata_recorded_per_file(self, temp_dir):
+        _tree(temp_dir)
+        store = RecordingStore()
+
+        ingest_directory(temp_dir, store, exclude=["skip"], workers=1, tenant="acme")
+
+        assert {m["tenant"] for m in store.metadatas} == {"acme"}
+        assert {m["doc_type"] for m in store.metadatas} == {"txt"}
+        assert len({m["ingested_at"] for m in store.metadatas}) == 1
+
+    def test_process_pool_with_manifest(self, temp_dir):
+        docs = os.path.join(temp_dir, "docs")
+        os.makedirs(docs)
+        for i in range(4):
+            _write(os.path.join(docs, f"d{i}.md"), [f"Texto {i}. " * 50])
+        embedder = CountingEmbedding()
+        store = ChromaStore("pool", embedder, persist_dir=temp_dir)
+        manifest = IngestManifest(os.path.join(temp_dir, "manifest.json"))
+
+        first = ingest_directory(
+            docs, store, workers=2, max_chars=200, overlap=20, manifest=manifest
+        )
+        embedded = embedder.embedded
+        second = ingest_directory(
+            docs, store, workers=2, max_chars=200, overlap=20, manifest=manifest
+        )
+
+        assert all(r["status"] == "ok" for r in first)
+        assert store.col.count() == sum(r["chunks"] for r in first)
+        assert all(r["status"] == "skipped" for r in second)
+        assert embedder.embedded == embedded
+
+
+class TestStreamingIngestion:
+    """Tests for incremental reading and bounded upsert batches."""
+
+    def test_iter_text_matches_read(self, temp_dir):
+        doc = os.path.join(temp_dir, "big.txt")
+        _write(doc, [f"Linha {i} com acentuação çãé." for i in range(500)])
+
+        pieces = list(iter_text_from_path(doc, block_size=37))
+
+        assert len(pieces) > 1
+        assert max(len(p) for p in pieces) <= 37
+        assert "".join(pieces) == read_text_from_path(doc)
+
+    def test_missing_file(self, temp_dir):
+        with pytest.raises(IngestionError):
+            list(iter_text_from_path(os.path.join(temp_dir, "missing.txt")))
+
+    def test_upserts_in_bounded_batches(self, temp_dir):
+        doc = os.path.join(temp_dir, "big.txt")
+        _write(doc, ["Conteúdo longo. " * 400])
+        store = RecordingStore()
+
+        n = ingest_file(doc, store, max_chars=100, overlap=10, batch_size=8)
+
+        expected = chunk_text(read_text_from_path(doc), max_chars=100, overlap=10)
+        assert n == len(expected)
+        assert max(store.batches) == 8
+        assert sum(store.batches) == n
+        assert store.ids == set(chunk_ids("big.txt", expected))
+
+    def test_many_streams_large_files_in_bounded_batches(self, temp_dir):
+        big = os.path.join(temp_dir, "big.txt")
+        _write(big, ["Conteúdo longo. " * 400])
+        small = os.path.join(temp_dir, "small.txt")
+        _write(small, ["Pequeno. " * 5])
+        store = RecordingStore()
+        manifest = IngestManifest(os.path.join(temp_dir, "manifest.json"))
+
+        results = ingest_many(
+            [big, small],
+            store,
+            workers=2,
+            max_chars=100,
+            overlap=10,
+            batch_size=8,
+            manifest=manifest,
+            stream_threshold=1024,
+        )
+
+        expected = chunk_text(read_text_from_path(big), max_chars=100, overlap=10)
+        assert [r["status"] for r in results] == ["ok", "ok"]
+        assert results[0]["chunks"] == len(expected)
+        assert max(store.batches) == 8
+        assert set(chunk_ids("big.txt", expected)) <= store.ids
+        assert manifest.get("big.txt")["ids"] == chunk_ids("big.txt", expected)
+        assert manifest.get("small.txt") is not None
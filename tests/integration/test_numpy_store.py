@@ -0,0 +1,481 @@
+"""Integration tests for the NumPy flat vector store."""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent import ChromaStore, EmbeddingError, NumpyStore, RagAgent
+from rag_agent.storage import BaseVectorStore
+
+
+class TableEmbedding:
+    """Embedding provider returning fixed pseudo-random vectors per text."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        out = []
+        for text in texts:
+            rng = np.random.default_rng(abs(hash(text)) % (2**32))
+            out.append(rng.standard_normal(self.dim).tolist())
+        return out
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+def _corpus(n):
+    texts = [f"documento número {i}" for i in range(n)]
+    metas = [{"source": "corpus.txt", "chunk_id": i} for i in range(n)]
+    ids = [f"doc{i}" for i in range(n)]
+    return texts, metas, ids
+
+
+def _brute_force(embedder, texts, query, k):
+    mat = np.asarray(embedder.embed(texts), dtype=np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+    q = np.asarray(embedder.embed([query])[0], dtype=np.float32)
+    q /= np.linalg.norm(q)
+    sims = mat @ q
+    order = np.argsort(-sims)[:k]
+    return [texts[i] for i in order], [float(1 - sims[i]) for i in order]
+
+
+class TestNumpyStore:
+    """Tests for NumpyStore search, persistence and maintenance."""
+
+    def test_exact_top_k(self, temp_dir):
+        embedder = TableEmbedding()
+        store = NumpyStore("exact", embedder, persist_dir=temp_dir, initial_capacity=8)
+        texts, metas, ids = _corpus(100)
+        store.upsert(texts, metas, ids)
+
+        docs, got_metas, dists = store.query("consulta qualquer", k=5)
+        expected_docs, expected_dists = _brute_force(embedder, texts, "consulta qualquer", 5)
+
+        assert docs == expected_docs
+        assert dists == pytest.approx(expected_dists, abs=1e-5)
+        assert got_metas[0]["source"] == "corpus.txt"
+        assert dists == sorted(dists)
+
+    def test_query_many_matches_query(self, temp_dir):
+        store = NumpyStore("many", TableEmbedding(), persist_dir=temp_dir)
+        store.upsert(*_corpus(30))
+
+        batched = store.query_many(["a", "b", "c"], k=4)
+
+        for (docs, metas, dists), q in zip(batched, ("a", "b", "c")):
+            single_docs, single_metas, single_dists = store.query(q, k=4)
+            assert docs == single_docs
+            assert metas == single_metas
+            assert dists == pytest.approx(single_dists, abs=1e-5)
+
+    def test_k_larger_than_collection(self, temp_dir):
+        store = NumpyStore("small", TableEmbedding(), persist_dir=temp_dir)
+        assert store.query("vazio", k=3) == ([], [], [])
+        store.upsert(*_corpus(2))
+
+        docs, _, _ = store.query("x", k=10)
+
+        assert len(docs) == 2
+
+    def test_persistence_roundtrip(self, temp_dir):
+        embedder = TableEmbedding()
+        store = NumpyStore("persist", embedder, persist_dir=temp_dir, initial_capacity=4)
+        texts, metas, ids = _corpus(20)
+        store.upsert(texts, metas, ids)
+        store.delete(["doc3", "doc7"])
+        store.upsert(["documento atualizado"], [{"source": "new.txt", "chunk_id": 0}], ["doc5"])
+        before = store.query("pergunta", k=6)
+        store.close()
+
+        reopened = NumpyStore("persist", embedder, persist_dir=temp_dir)
+
+        assert reopened.query("pergunta", k=6) == before
+        assert reopened._count() == 18
+
+    def test_deleted_rows_are_reused(self, temp_dir):
+        store = NumpyStore("reuse", TableEmbedding(), persist_dir=temp_dir, initial_capacity=4)
+        store.upsert(*_corpus(4))
+        store.delete(["doc1"])
+        store.upsert(["novo"], [{"source": "n", "chunk_id": 0}], ["new"])
+
+        docs, _, _ = store.query("novo", k=4)
+
+        assert store._rows == 4
+        assert "novo" in docs
+        assert "documento número 1" not in docs
+
+    def test_torn_log_line_is_ignored(self, temp_dir):
+        store = NumpyStore("torn", TableEmbedding(), persist_dir=temp_dir)
+        store.upsert(*_corpus(3))
+        store.close()
+        with open(os.path.join(temp_dir, "torn.log.jsonl"), "a", encoding="utf-8") as f:
+            f.write('{"id": "doc9", "ro')
+
+        assert NumpyStore("torn", TableEmbedding(), persist_dir=temp_dir)._count() == 3
+
+    def test_log_compaction(self, temp_dir):
+        store = NumpyStore("compact", TableEmbedding(), persist_dir=temp_dir)
+        texts, metas, ids = _corpus(10)
+        for _ in range(120):
+            store.upsert(texts, metas, ids)
+        store.flush()
+
+        with open(os.path.join(temp_dir, "compact.log.jsonl"), encoding="utf-8") as f:
+            assert sum(1 for _ in f) == 10
+        assert NumpyStore("compact", TableEmbedding(), persist_dir=temp_dir)._count() == 10
+
+    def test_dimension_mismatch(self, temp_dir):
+        store = NumpyStore("dims", TableEmbedding(dim=8), persist_dir=temp_dir)
+        store.upsert(*_corpus(2))
+        store.embedder = TableEmbedding(dim=4)
+
+        with pytest.raises(EmbeddingError):
+            store.upsert(["outro"], [{"source": "x", "chunk_id": 0}])
+
+    def test_write_bumps_version_and_clears_cache(self, temp_dir):
+        embedder = TableEmbedding()
+        store = NumpyStore("cache", embedder, persist_dir=temp_dir, query_cache_size=8)
+        store.upsert(*_corpus(5))
+        store.query("q", k=2)
+        calls = embedder.calls
+        store.query("q", k=2)
+        assert embedder.calls == calls
+
+        store.delete(["doc0"])
+        store.query("q", k=2)
+        assert embedder.calls == calls + 1
+
+    def test_write_during_search_is_not_cached(self, temp_dir):
+        store = NumpyStore("cache", TableEmbedding(), persist_dir=temp_dir, query_cache_size=8)
+        store.upsert(*_corpus(5))
+        search = store._dense_search_many
+
+        def search_then_write(*args, **kwargs):
+            hits = search(*args, **kwargs)
+            store._dense_search_many = search
+            store.delete(["doc0"])  # lands between the search and the cache put
+            return hits
+
+        store._dense_search_many = search_then_write
+        assert store.query("documento número 0", k=2)[0][0] == "documento número 0"
+
+        docs, _, _ = store.query("documento número 0", k=2)
+        assert "documento número 0" not in docs
+
+    def test_hybrid_mode(self, temp_dir):
+        store = NumpyStore("hybrid", TableEmbedding(), persist_dir=temp_dir, hybrid=True)
+        texts, metas, ids = _corpus(50)
+        texts[17] = "falha ERR-4312 no controlador"
+        store.upsert(texts, metas, ids)
+
+        docs, _, _ = store.query("ERR-4312", k=3)
+
+        assert "falha ERR-4312 no controlador" in docs
+
+
+class TestStoreInterchangeability:
+    """RagAgent works with either store backend."""
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_agent_answers_with_store(self, temp_dir, store_cls):
+        embedder = TableEmbedding()
+        store = store_cls("agent_store", embedder, persist_dir=temp_dir)
+        store.upsert(["texto relevante"], [{"source": "a.txt", "chunk_id": 0}])
+        llm = Mock()
+        llm.answer.return_value = "Resposta [chunk_id=0]"
+        agent = RagAgent(store=store, llm=llm, distance_threshold=0.01)
+
+        result = agent.ask("texto relevante")
+
+        assert result["used_chunks"][0]["source"] == "a.txt"
+        assert result["used_chunks"][0]["distance"] == pytest.approx(0.0, abs=1e-5)
+        # The store breaks retrieval down into query embedding and search
+        assert {"embed", "search", "retrieve"} <= set(result["timings_ms"])
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_aask_with_sync_embedder_keeps_store_timings(self, temp_dir, store_cls):
+        store = store_cls("agent_store", TableEmbedding(), persist_dir=temp_dir)
+        store.upsert(["texto relevante"], [{"source": "a.txt", "chunk_id": 0}])
+        llm = Mock(spec=["answer"])
+        llm.answer.return_value = "Resposta [chunk_id=0]"
+        agent = RagAgent(store=store, llm=llm, distance_threshold=0.01)
+
+        result = asyncio.run(agent.aask("texto relevante"))
+
+        assert {"embed", "search", "retrieve"} <= set(result["timings_ms"])
+
+    def test_backends_must_implement_primitives(self, temp_dir):
+        class Partial(BaseVectorStore):
+            def _count(self):
+                return 0
+
+        with pytest.raises(TypeError):
+            Partial("partial", TableEmbedding(), persist_dir=temp_dir)
+
+
+class TestWhereFilters:
+    """Metadata-scoped retrieval on both store backends."""
+
+    def _store(self, store_cls, temp_dir, **kwargs):
+        store = store_cls("filtered", TableEmbedding(), persist_dir=temp_dir, **kwargs)
+        texts = [f"trecho {i} do manual" for i in range(40)]
+        metas = [
+            {"source": f"manual_{i % 4}.pdf", "chunk_id": i // 4, "tenant": f"t{i % 2}"}
+            for i in range(40)
+        ]
+        store.upsert(texts, metas, ids=[f"c{i}" for i in range(40)])
+        return store, texts, metas
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_top_k_within_scope(self, temp_dir, store_cls):
+        store, texts, _ = self._store(store_cls, temp_dir)
+
+        docs, metas, _ = store.query(texts[1], k=5, where={"source": "manual_1.pdf"})
+        scoped, smetas, _ = store.query(
+            texts[1], k=20, where={"source": "manual_1.pdf", "chunk_id": {"$lt": 3}}
+        )
+
+        assert docs[0] == texts[1]
+        assert len(docs) == 5
+        assert {m["source"] for m in metas} == {"manual_1.pdf"}
+        assert len(scoped) == 3
+        assert all(m["chunk_id"] < 3 for m in smetas)
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_hybrid_respects_filter(self, temp_dir, store_cls):
+        store, texts, _ = self._store(store_cls, temp_dir, hybrid=True)
+
+        _, metas, _ = store.query("manual", k=10, where={"tenant": "t0"})
+
+        assert metas and {m["tenant"] for m in metas} == {"t0"}
+
+    def test_filtered_results_are_cached_per_filter(self, temp_dir):
+        store, texts, _ = self._store(NumpyStore, temp_dir, query_cache_size=8)
+
+        a = store.query(texts[0], k=3, where={"source": "manual_0.pdf"})
+        b = store.query(texts[0], k=3, where={"source": "manual_2.pdf"})
+
+        assert a != b
+        assert store.query(texts[0], k=3, where={"source": "manual_2.pdf"}) == b
+        assert store.cache_stats()["hits"] == 1
+
+    def test_subset_and_mask_paths_agree(self, temp_dir, monkeypatch):
+        store, texts, _ = self._store(NumpyStore, temp_dir)
+        where = {"source": {"$in": ["manual_0.pdf", "manual_3.pdf"]}}
+
+        monkeypatch.setattr(NumpyStore, "SUBSET_FRACTION", 1.0)
+        subset = store.query_many(texts[:4], k=6, where=where)
+        monkeypatch.setattr(NumpyStore, "SUBSET_FRACTION", 0.0)
+        store._bump_version()
+        masked = store.query_many(texts[:4], k=6, where=where)
+
+        for (d1, _, s1), (d2, _, s2) in zip(subset, masked):
+            assert d1 == d2
+            assert s1 == pytest.approx(s2, abs=1e-5)
+
+    def test_mask_follows_writes(self, temp_dir):
+        store, texts, _ = self._store(NumpyStore, temp_dir)
+        where = {"tenant": "t9"}
+        assert store.query(texts[0], k=3, where=where) == ([], [], [])
+
+        store.upsert(["novo trecho"], [{"source": "novo.pdf", "tenant": "t9"}], ids=["n1"])
+
+        assert store.query(texts[0], k=3, where=where)[0] == ["novo trecho"]
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_agent_source_scope(self, temp_dir, store_cls):
+        store, texts, _ = self._store(store_cls, temp_dir)
+        llm = Mock()
+        llm.answer.return_value = "Resposta"
+        agent = RagAgent(store=store, llm=llm, distance_threshold=2.0)
+
+        result = agent.ask(texts[2], source=["manual_3.pdf"])
+
+        assert {c["source"] for c in result["used_chunks"]} == {"manual_3.pdf"}
+
+
+class FixedEmbedding:
+    """Embedding provider returning a preset vector per text (the first one otherwise)."""
+
+    def __init__(self, table):
+        self.table = table
+        self.default = next(iter(table.values()))
+
+    def embed(self, texts):
+        return [self.table.get(t, self.default) for t in texts]
+
+
+class TestContextAssembly:
+    """MMR and chunk stitching against real stores."""
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_query_vectors_returns_stored_embeddings(self, temp_dir, store_cls):
+        embedder = TableEmbedding()
+        store = store_cls("vectors", embedder, persist_dir=temp_dir, query_cache_size=8)
+        texts, metas, ids = _corpus(10)
+        store.upsert(texts, metas, ids=ids)
+
+        for _ in range(2):  # second round is served from the query cache
+            docs, _, dists, vectors = store.query_vectors([texts[3]], k=3)[0]
+            assert docs[0] == texts[3]
+            stored = np.asarray(embedder.embed([texts[3]])[0])
+            cos = float(np.dot(stored, vectors[0])) / (
+                np.linalg.norm(stored) * np.linalg.norm(vectors[0])
+            )
+            assert cos == pytest.approx(1.0, abs=1e-2)
+            assert len(vectors) == len(docs) == len(dists)
+
+    @pytest.mark.parametrize("store_cls", [ChromaStore, NumpyStore])
+    def test_agent_drops_duplicates_and_stitches(self, temp_dir, store_cls):
+        text = "".join(f"Frase {i} sobre o tema. " for i in range(20))
+        first, second = text[:300], text[260:]
+        unrelated = "Outro documento relevante."
+        embedder = FixedEmbedding(
+            {
+                "pergunta": [1.0, 0.0, 0.0],
+                first: [1.0, 0.1, 0.0],
+                second: [1.0, 0.6, 0.0],
+                first + " ": [1.0, 0.1, 0.0],
+                unrelated: [1.0, -0.3, 0.2],
+            }
+        )
+        store = store_cls("assembly", embedder, persist_dir=temp_dir)
+        store.upsert(
+            [first, second, first + " ", unrelated],
+            [
+                {"source": "a.txt", "chunk_id": 0},
+                {"source": "a.txt", "chunk_id": 1},
+                {"source": "copia.txt", "chunk_id": 0},
+                {"source": "b.txt", "chunk_id": 0},
+            ],
+        )
+        llm = Mock()
+        llm.answer.return_value = "Resposta"
+        agent = RagAgent(
+            store=store,
+            llm=llm,
+            top_k=3,
+            distance_threshold=1.0,
+            mmr_lambda=0.7,
+            merge_adjacent=True,
+        )
+
+        result = agent.ask("pergunta")
+
+        used = [(c["source"], c["chunk_id"]) for c in result["used_chunks"]]
+        assert sorted(used) == [("a.txt", 0), ("a.txt", 1), ("b.txt", 0)]
+        prompt = llm.answer.call_args[0][0]
+        assert prompt.count("Frase 12 sobre") == 1
+        assert text in prompt
+        assert "chunk_id=0,1 source=a.txt" in prompt
+
+
+class ClusteredEmbedding:
+    """Embedding provider with a fixed clustered vector per text."""
+
+    def __init__(self, n_docs=400, dim=64, seed=0):
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((20, dim))
+        docs = centers[rng.integers(0, 20, n_docs)] + 0.6 * rng.standard_normal((n_docs, dim))
+        queries = centers[rng.integers(0, 20, 30)] + 0.6 * rng.standard_normal((30, dim))
+        self.table = {f"d{i}": v.tolist() for i, v in enumerate(docs)}
+        self.table.update({f"q{i}": v.tolist() for i, v in enumerate(queries)})
+
+    def embed(self, texts):
+        return [self.table[t] for t in texts]
+
+
+def _quantized_store(temp_dir, name, embedder, **kwargs):
+    store = NumpyStore(name, embedder, persist_dir=temp_dir, **kwargs)
+    texts = [f"d{i}" for i in range(400)]
+    store.upsert(texts, [{"source": "s", "chunk_id": i} for i in range(400)], texts)
+    return store
+
+
+def _recall(store, exact, k=10):
+    hits = 0
+    for i in range(30):
+        got = set(store.query(f"q{i}", k=k)[0])
+        hits += len(got & set(exact.query(f"q{i}", k=k)[0]))
+    return hits / (30 * k)
+
+
+class TestQuantization:
+    """Tests for the compact float16/int8 representations."""
+
+    @pytest.mark.parametrize(
+        "dtype,scale,ratio,min_recall",
+        [
+            ("float16", "vector", 0.5, 0.97),
+            ("int8", "vector", 0.27, 0.85),
+            ("int8", "dimension", 0.25, 0.85),
+        ],
+    )
+    def test_memory_and_recall(self, temp_dir, dtype, scale, ratio, min_recall):
+        embedder = ClusteredEmbedding()
+        exact = _quantized_store(temp_dir, "exact", embedder)
+        store = _quantized_store(temp_dir, f"{dtype}_{scale}", embedder, dtype=dtype, scale=scale)
+
+        assert store.stats()["index_bytes"] <= exact.stats()["index_bytes"] * ratio
+        assert _recall(store, exact) >= min_recall
+
+    def test_rescore_returns_exact_distances(self, temp_dir):
+        embedder = ClusteredEmbedding()
+        exact = _quantized_store(temp_dir, "exact", embedder)
+        store = _quantized_store(temp_dir, "rescored", embedder, dtype="int8", rescore=4)
+
+        docs, _, dists = store.query("q3", k=5)
+        exact_docs, _, exact_dists = exact.query("q3", k=5)
+
+        assert _recall(store, exact) >= 0.98
+        assert dists == pytest.approx([exact_dists[exact_docs.index(d)] for d in docs], abs=1e-5)
+        assert store.stats()["full_bytes"] == exact.stats()["index_bytes"]
+
+    def test_small_blocks_match_single_pass(self, temp_dir, monkeypatch):
+        embedder = ClusteredEmbedding()
+        store = _quantized_store(temp_dir, "blocks", embedder, dtype="int8")
+        expected = store.query("q1", k=8)
+        store._query_cache = None
+        monkeypatch.setattr(NumpyStore, "BLOCK_ROWS", 7)
+
+        docs, _, dists = store.query("q1", k=8)
+
+        assert docs == expected[0]
+        assert dists == pytest.approx(expected[2], abs=1e-5)
+
+    def test_reopen_quantized(self, temp_dir):
+        embedder = ClusteredEmbedding()
+        store = _quantized_store(temp_dir, "reopen", embedder, dtype="int8", scale="dimension")
+        before = store.query("q2", k=5)
+        store.close()
+
+        reopened = NumpyStore(
+            "reopen", embedder, persist_dir=temp_dir, dtype="int8", scale="dimension"
+        )
+
+        assert reopened.query("q2", k=5) == before
+        with pytest.raises(ValueError):
+            NumpyStore("reopen", embedder, persist_dir=temp_dir)
+
+    def test_invalid_options(self, temp_dir):
+        with pytest.raises(ValueError):
+            NumpyStore("bad", TableEmbedding(), persist_dir=temp_dir, dtype="int4")
+        with pytest.raises(ValueError):
+            NumpyStore("bad", TableEmbedding(), persist_dir=temp_dir, scale="row")
@@ -0,0 +1,370 @@
+"""Integration tests for the HTTP server."""
+
+import http.client
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent import NumpyStore, RagAgent
+from rag_agent.server import ConcurrencyLimiter, RagServer, _serve_until_signal
+from rag_agent.utils.metrics import MetricsRegistry
+
+
+class WordEmbedding:
+    """Deterministic bag-of-words embedding (one hashed dimension per word)."""
+
+    def embed(self, texts):
+        out = []
+        for text in texts:
+            vec = [0.0] * 1024
+            for word in text.lower().split():
+                vec[zlib.crc32(word.strip(".,?!").encode()) % 1024] += 1.0
+            out.append(vec)
+        return out
+
+
+class GatedLLM:
+    """LLM whose calls wait on ``gate`` (set by default), for backpressure tests."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Semaphore(0)
+
+    def answer(self, prompt):
+        self.started.release()
+        self.gate.wait(5)
+        return "A garantia é de doze meses [chunk_id=0]."
+
+    def stream(self, prompt):
+        yield from ["A garantia ", "é de doze meses ", "[chunk_id=0]."]
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for testing."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield tmpdir
+
+
+@pytest.fixture
+def make_server(temp_dir):
+    """Start servers over a fresh NumpyStore; all are shut down after the test."""
+    servers = []
+
+    def make(**options):
+        store = NumpyStore("docs", WordEmbedding(), persist_dir=os.path.join(temp_dir, "db"))
+        agent = RagAgent(store=store, llm=GatedLLM(), distance_threshold=0.9)
+        options.setdefault("registry", MetricsRegistry())
+        server = RagServer(agent, port=0, **options).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.agent.llm.gate.set()
+        if not server.draining:
+            server.shutdown(timeout=5)
+
+
+def request(server, method, path, body=None, headers=None):
+    """Send one request; returns ``(status, headers, body bytes)``."""
+    host, port = server._httpd.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode()
+    conn.request(method, path, body=data, headers=headers or {})
+    resp = conn.getresponse()
+    payload = resp.read()
+    conn.close()
+    return resp.status, dict(resp.getheaders()), payload
+
+
+def ingest(server, text, source="manual.txt"):
+    status, _, payload = request(server, "POST", "/ingest", {"text": text, "source": source})
+    assert status == 200, payload
+    return json.loads(payload)
+
+
+DOC = "A garantia do produto é de doze meses.\n\nO suporte atende em dias úteis."
+
+
+class TestRoutes:
+    """Tests for the ask, stream, ingest and probe endpoints."""
+
+    def test_probes(self, make_server):
+        server = make_server()
+
+        assert request(server, "GET", "/healthz")[0] == 200
+        status, _, payload = request(server, "GET", "/readyz")
+        assert status == 200
+        assert json.loads(payload)["status"] == "ready"
+
+    def test_ingest_then_ask(self, make_server):
+        server = make_server()
+        assert ingest(server, DOC)["chunks"] == 1
+
+        status, headers, payload = request(
+            server,
+            "POST",
+            "/ask",
+            {"question": "Qual a garantia do produto?"},
+            {"X-Request-ID": "req-1"},
+        )
+
+        result = json.loads(payload)
+        assert status == 200
+        assert headers["X-Request-ID"] == "req-1"
+        assert result["request_id"] == "req-1"
+        assert "doze meses" in result["answer"]
+        assert result["used_chunks"][0]["source"] == "manual.txt"
+
+    def test_answer_not_found_is_404(self, make_server):
+        server = make_server()
+        ingest(server, DOC)
+
+        status, _, payload = request(server, "POST", "/ask", {"question": "xyz qwerty?"})
+
+        assert status == 404
+        assert json.loads(payload)["error"] == "AnswerNotFoundError"
+
+    def test_stream_ndjson(self, make_server):
+        server = make_server()
+        ingest(server, DOC)
+
+        status, headers, payload = request(
+            server, "POST", "/ask/stream", {"question": "Qual a garantia do produto?"}
+        )
+
+        events = [json.loads(line) for line in payload.decode().splitlines()]
+        assert status == 200
+        assert headers["Content-Type"].startswith("application/x-ndjson")
+        assert {e["type"] for e in events[:-1]} == {"token"}
+        assert events[-1]["type"] == "done"
+        assert "doze meses" in events[-1]["answer"]
+
+    def test_ingest_path_confined_to_root(self, make_server, temp_dir):
+        root = os.path.join(temp_dir, "docs")
+        os.makedirs(root)
+        with open(os.path.join(root, "faq.md"), "w", encoding="utf-8") as f:
+            f.write(DOC)
+        server = make_server(ingest_root=root)
+
+        ok = request(server, "POST", "/ingest", {"path": "faq.md"})
+        escape = request(server, "POST", "/ingest", {"path": "../db/docs.json"})
+
+        assert ok[0] == 200
+        assert json.loads(ok[2])["source"] == "faq.md"
+        assert escape[0] == 400
+
+    def test_bad_requests(self, make_server):
+        server = make_server(max_body_bytes=1024)
+
+        assert request(server, "POST", "/ask", {})[0] == 400
+        assert request(server, "POST", "/ask", b"[1, 2]")[0] == 400
+        assert request(server, "POST", "/ingest", {"text": "x"})[0] == 400
+        body = {"text": "x", "source": "a.txt", "tenant": {"id": 1}}
+        assert request(server, "POST", "/ingest", body)[0] == 400
+        assert request(server, "GET", "/ask")[0] == 405
+        assert request(server, "POST", "/nope", {})[0] == 404
+        assert request(server, "POST", "/ask", {"question": "x" * 2000})[0] == 413
+
+    def test_invalid_filter_is_400(self, make_server):
+        server = make_server()
+        ingest(server, DOC)
+
+        for route in ("/ask", "/ask/stream"):
+            status, _, payload = request(
+                server, "POST", route, {"question": "garantia?", "where": {"$foo": 1}}
+            )
+            assert status == 400, payload
+            assert "$foo" in json.loads(payload)["message"]
+            body = {"question": "garantia?", "source": [1]}
+            assert request(server, "POST", route, body)[0] == 400
+
+    def test_keep_alive_after_unknown_route(self, make_server):
+        server = make_server()
+        host, port = server._httpd.server_address[:2]
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+
+        conn.request("POST", "/nope", body=b'{"a": 1}')
+        first = conn.getresponse()
+        first.read()
+        if first.will_close:
+            conn.close()
+        conn.request("GET", "/healthz")
+
+        assert first.status == 404
+        assert conn.getresponse().status == 200
+
+    def test_metrics(self, make_server):
+        server = make_server()
+        request(server, "GET", "/healthz")
+
+        status, headers, payload = request(server, "GET", "/metrics")
+
+        assert status == 200
+        assert 'rag_http_requests_total{route="/healthz",status="200"} 1' in payload.decode()
+
+
+class TestBackpressure:
+    """Tests for admission control and shedding."""
+
+    def _hold(self, server, n):
+        """Start ``n`` asks that block in the LLM; returns the threads and their results."""
+        server.agent.llm.gate.clear()
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    request(server, "POST", "/ask", {"question": "Qual a garantia?"})[0]
+                )
+            )
+            for _ in range(n)
+        ]
+        for t in threads:
+            t.start()
+        return threads, results
+
+    def test_queue_full_is_429(self, make_server):
+        server = make_server(max_inflight=1, max_queue=1, queue_timeout=5)
+        ingest(server, DOC)
+        threads, results = self._hold(server, 1)
+        assert server.agent.llm.started.acquire(timeout=5)
+        queued, queued_results = self._hold(server, 1)
+        while server.limiter.queued < 1:
+            time.sleep(0.01)
+
+        status, headers, payload = request(server, "POST", "/ask", {"question": "garantia?"})
+
+        assert status == 429
+        assert headers["Retry-After"] == "1"
+        assert json.loads(payload)["message"] == "queue_full"
+        server.agent.llm.gate.set()
+        for t in threads + queued:
+            t.join()
+        assert results + queued_results == [200, 200]
+
+    def test_queue_timeout_is_503(self, make_server):
+        server = make_server(max_inflight=1, max_queue=4, queue_timeout=0.05)
+        ingest(server, DOC)
+        threads, results = self._hold(server, 1)
+        assert server.agent.llm.started.acquire(timeout=5)
+
+        status, _, payload = request(server, "POST", "/ask", {"question": "garantia?"})
+
+        assert status == 503
+        assert json.loads(payload)["message"] == "queue_timeout"
+        server.agent.llm.gate.set()
+        for t in threads:
+            t.join()
+        counter = server.registry.counter("rag_http_rejected_total", "", ["reason"])
+        assert counter.value(reason="queue_timeout") == 1
+
+    def test_ingest_does_not_take_question_slots(self, make_server):
+        server = make_server(max_inflight=1, max_queue=0)
+        ingest(server, DOC)
+        threads, results = self._hold(server, 1)
+        assert server.agent.llm.started.acquire(timeout=5)
+
+        ingest(server, "O suporte também atende aos sábados.", source="sabado.txt")
+
+        server.agent.llm.gate.set()
+        for t in threads:
+            t.join()
+        assert results == [200]
+
+    def test_ingest_queue_full_leaves_questions_alone(self, make_server):
+        server = make_server(max_ingest_queue=0)
+        ingest(server, DOC)
+        server.ingest_limiter.acquire()  # an ingestion in progress
+
+        status, _, payload = request(server, "POST", "/ingest", {"text": "x", "source": "x.txt"})
+        asked = request(server, "POST", "/ask", {"question": "Qual a garantia?"})[0]
+
+        server.ingest_limiter.release()
+        assert status == 429
+        assert json.loads(payload)["message"] == "queue_full"
+        assert asked == 200
+
+    def test_shutdown_drains_in_flight(self, make_server):
+        server = make_server()
+        ingest(server, DOC)
+        threads, results = self._hold(server, 2)
+        assert server.agent.llm.started.acquire(timeout=5)
+        assert server.agent.llm.started.acquire(timeout=5)
+
+        threading.Timer(0.1, server.agent.llm.gate.set).start()
+        assert server.shutdown(timeout=5) is True
+        for t in threads:
+            t.join()
+        assert results == [200, 200]
+
+    def test_sigterm_drains_in_flight(self, temp_dir):
+        store = NumpyStore("docs", WordEmbedding(), persist_dir=os.path.join(temp_dir, "db"))
+        agent = RagAgent(store=store, llm=GatedLLM(), distance_threshold=0.9)
+        server = RagServer(agent, port=0, registry=MetricsRegistry())
+        held = {}
+
+        def client():
+            while not server.ready:
+                time.sleep(0.01)
+            ingest(server, DOC)
+            held["threads"], held["results"] = self._hold(server, 1)
+            assert server.agent.llm.started.acquire(timeout=5)
+            threading.Timer(0.1, server.agent.llm.gate.set).start()
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        previous = signal.getsignal(signal.SIGTERM)
+        threading.Thread(target=client).start()
+
+        assert _serve_until_signal(server, timeout=5) is True
+        for t in held["threads"]:
+            t.join()
+        assert held["results"] == [200]
+        assert server.draining
+        assert signal.getsignal(signal.SIGTERM) is previous
+
+
+class TestConcurrencyLimiter:
+    """Tests for ConcurrencyLimiter."""
+
+    def test_admits_up_to_limit_then_queues(self):
+        limiter = ConcurrencyLimiter(max_inflight=2, max_queue=0, queue_timeout=0)
+
+        assert limiter.acquire() is None
+        assert limiter.acquire() is None
+        assert limiter.acquire() == "queue_full"
+        limiter.release()
+        assert limiter.acquire() is None
+
+    def test_queued_request_gets_released_slot(self):
+        limiter = ConcurrencyLimiter(max_inflight=1, max_queue=1, queue_timeout=5)
+        limiter.acquire()
+        outcome = []
+        waiter = threading.Thread(target=lambda: outcome.append(limiter.acquire()))
+        waiter.start()
+        while limiter.queued < 1:
+            time.sleep(0.01)
+
+        limiter.release()
+        waiter.join()
+
+        assert outcome == [None]
+        assert limiter.in_flight == 1
+        assert limiter.wait_idle(timeout=0.01) is False
+        limiter.release()
+        assert limiter.wait_idle(timeout=0.01) is True
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            ConcurrencyLimiter(max_inflight=0)
@@ -1,8 +1,9 @@
 """Tests for the main RagAgent class."""
 
+import asyncio
 import sys
 from pathlib import Path
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 
@@ -10,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
 from rag_agent.core.agent import RagAgent
 from rag_agent.core.exceptions import AnswerNotFoundError, LLMError, RetrievalError
+from rag_agent.utils.metrics import MetricsRegistry
 
 
 class TestRagAgent:
@@ -149,6 +151,24 @@ class TestRagAgent:
 
         assert result["request_id"] == "custom-123"
 
+    def test_scoped_ask_passes_where_and_skips_answer_cache(self):
+        """source/where reach the store as one filter; the answer cache is bypassed."""
+        self.mock_store.query.return_value = (
+            ["Document content"],
+            [{"chunk_id": 0, "source": "a.pdf"}],
+            [0.1],
+        )
+        self.mock_llm.answer.return_value = "Answer"
+        self.agent.answer_cache = Mock()
+
+        self.agent.ask("Question", where={"tenant": "acme"}, source="a.pdf")
+
+        self.mock_store.query.assert_called_once_with(
+            "Question", k=3, where={"$and": [{"tenant": "acme"}, {"source": "a.pdf"}]}
+        )
+        self.agent.answer_cache.embed_question.assert_not_called()
+        self.agent.answer_cache.add.assert_not_called()
+
     def test_context_size_limiting(self):
         """Test that context is limited by max_context_chars."""
         # Create agent with small context limit
@@ -172,3 +192,569 @@ class TestRagAgent:
         assert "chunk_id=0" in prompt
         # Count of "A" characters should be less than 160 (2 * 80)
         assert prompt.count("A") <= 80
+
+    def _stitched_store(self, extra=()):
+        """Store returning two adjacent 1.5k-char chunks (a 3k span once stitched)."""
+        docs = ["A" * 1500, "B" * 1500] + [d for d, _, _ in extra]
+        metas = [{"chunk_id": 0, "source": "a.txt"}, {"chunk_id": 1, "source": "a.txt"}]
+        metas += [m for _, m, _ in extra]
+        self.mock_store.query.return_value = (docs, metas, [0.1, 0.2] + [d for _, _, d in extra])
+        self.mock_store.query_many.return_value = [self.mock_store.query.return_value]
+
+    def test_oversized_stitched_span_is_skipped(self):
+        """A span over max_context_chars doesn't stop smaller contexts from being packed."""
+        self._stitched_store([("Curto", {"chunk_id": 7, "source": "b.txt"}, 0.25)])
+        self.mock_llm.answer.return_value = "Resposta [chunk_id=7]"
+        agent = RagAgent(
+            self.mock_store, self.mock_llm, max_context_chars=2000, merge_adjacent=True
+        )
+
+        result = agent.ask("Pergunta?")
+
+        assert [c["chunk_id"] for c in result["used_chunks"]] == [7]
+        assert "A" * 1500 not in self.mock_llm.answer.call_args[0][0]
+
+    def test_nothing_fits_is_not_found(self):
+        """The LLM is not called with an empty context."""
+        self._stitched_store()
+        agent = RagAgent(
+            self.mock_store, self.mock_llm, max_context_chars=2000, merge_adjacent=True
+        )
+
+        with pytest.raises(AnswerNotFoundError):
+            agent.ask("Pergunta?")
+        assert isinstance(agent.ask_many(["Pergunta?"])[0], AnswerNotFoundError)
+        self.mock_llm.answer.assert_not_called()
+
+
+class WordTokenizer:
+    """Deterministic tokenizer: one token per whitespace-separated word."""
+
+    def count(self, text):
+        return len(text.split())
+
+
+class TestTokenBudget:
+    """Tests for token-budget context packing."""
+
+    def _contexts(self, n, words=50):
+        return [
+            (" ".join(["palavra"] * words), {"chunk_id": i, "source": "doc.txt"}, 0.1)
+            for i in range(n)
+        ]
+
+    def test_packs_within_window(self):
+        """The prompt plus the reserved answer tokens fits the context window."""
+        agent = RagAgent(
+            store=Mock(),
+            llm=Mock(),
+            context_window=300,
+            answer_tokens=64,
+            tokenizer=WordTokenizer(),
+        )
+
+        prompt, used, tokens = agent._pack_prompt("Pergunta?", self._contexts(6))
+
+        assert 0 < len(used) < 6
+        assert tokens["prompt_tokens"] == WordTokenizer().count(prompt)
+        assert tokens["prompt_tokens"] <= 300 - 64
+        assert f"chunk_id={len(used) - 1}" in prompt
+        assert f"chunk_id={len(used)}" not in prompt
+
+    def test_larger_window_fits_more_chunks(self):
+        """Chunk count follows the token budget, not the character limit."""
+        small = RagAgent(Mock(), Mock(), context_window=300, tokenizer=WordTokenizer())
+        large = RagAgent(
+            Mock(), Mock(), max_context_chars=10, context_window=2000, tokenizer=WordTokenizer()
+        )
+
+        _, used_small, _ = small._pack_prompt("Q", self._contexts(10))
+        _, used_large, _ = large._pack_prompt("Q", self._contexts(10))
+
+        assert len(used_large) > len(used_small)
+
+    def test_token_counts_reported(self):
+        """ask reports prompt/context token counts and only the packed chunks."""
+        store = Mock()
+        contexts = self._contexts(6)
+        store.query.return_value = (
+            [c[0] for c in contexts],
+            [c[1] for c in contexts],
+            [c[2] for c in contexts],
+        )
+        llm = Mock()
+        llm.answer.return_value = "Resposta [chunk_id=0]"
+        agent = RagAgent(
+            store=store, llm=llm, context_window=300, answer_tokens=64, tokenizer=WordTokenizer()
+        )
+
+        result = agent.ask("Pergunta?")
+
+        assert result["prompt_tokens"] <= 236
+        assert result["context_tokens"] > 0
+        assert len(result["used_chunks"]) < 6
+        sent = llm.answer.call_args[0][0]
+        assert WordTokenizer().count(sent) == result["prompt_tokens"]
+
+    def test_oversized_context_is_skipped(self):
+        """A context over the token budget doesn't stop smaller ones from being packed."""
+        contexts = [self._contexts(1, words=400)[0], self._contexts(2, words=5)[1]]
+        agent = RagAgent(
+            Mock(), Mock(), context_window=300, answer_tokens=64, tokenizer=WordTokenizer()
+        )
+
+        _, used, _ = agent._pack_prompt("Q", contexts)
+
+        assert [m["chunk_id"] for _, m, _ in used] == [1]
+
+    def test_nothing_fits_is_not_found(self):
+        """When no context fits the window the LLM is not called."""
+        store = Mock()
+        store.query.return_value = (["palavra " * 400], [{"chunk_id": 0}], [0.1])
+        llm = Mock()
+        agent = RagAgent(
+            store, llm, context_window=300, answer_tokens=64, tokenizer=WordTokenizer()
+        )
+
+        with pytest.raises(AnswerNotFoundError):
+            agent.ask("Pergunta?")
+        llm.answer.assert_not_called()
+
+    def test_char_budget_does_not_load_a_tokenizer(self, monkeypatch):
+        """Without a context window the default path never resolves a tokenizer."""
+
+        def unavailable(model=None):
+            raise AssertionError("tokenizer resolved in char-budget mode")
+
+        monkeypatch.setattr("rag_agent.core.agent.get_tokenizer", unavailable)
+        agent = RagAgent(Mock(), Mock())
+
+        prompt, used, tokens = agent._pack_prompt("Q", self._contexts(2, words=5))
+
+        assert len(used) == 2
+        assert tokens["prompt_tokens"] > 0
+
+    def test_token_budget_uses_llm_model(self, monkeypatch):
+        """The default tokenizer is picked for the LLM's model."""
+        models = []
+
+        def fake_get_tokenizer(model=None):
+            models.append(model)
+            return WordTokenizer()
+
+        monkeypatch.setattr("rag_agent.core.agent.get_tokenizer", fake_get_tokenizer)
+        llm = Mock()
+        llm.model = "gpt-4o-mini"
+        agent = RagAgent(Mock(), llm, context_window=300)
+
+        agent._pack_prompt("Q", self._contexts(2))
+
+        assert models == ["gpt-4o-mini"]
+
+
+class KeywordReranker:
+    """Reranker scoring passages by how often they contain the query's last word."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def score(self, query, passages):
+        self.calls.append(list(passages))
+        if self.fail:
+            raise RuntimeError("modelo indisponível")
+        word = query.split()[-1]
+        return [float(p.count(word)) for p in passages]
+
+
+class TestRerank:
+    """Tests for the reranking stage between retrieval and prompt packing."""
+
+    def _store(self, texts):
+        store = Mock()
+        store.query.return_value = (
+            texts,
+            [{"chunk_id": i, "source": "doc.txt"} for i in range(len(texts))],
+            [0.1 + 0.01 * i for i in range(len(texts))],
+        )
+        return store
+
+    def test_over_fetches_and_keeps_best(self):
+        store = self._store(["nada", "gato gato", "cão", "gato", "gato gato gato"])
+        llm = Mock()
+        llm.answer.return_value = "Resposta"
+        reranker = KeywordReranker()
+        agent = RagAgent(
+            store, llm, top_k=2, reranker=reranker, rerank_candidates=5, rerank_top_n=2
+        )
+
+        result = agent.ask("fale do gato")
+
+        store.query.assert_called_once_with("fale do gato", k=5)
+        assert len(reranker.calls) == 1 and len(reranker.calls[0]) == 5
+        assert [c["chunk_id"] for c in result["used_chunks"]] == [4, 1]
+
+    def test_min_score_skips_llm(self):
+        store = self._store(["nada", "cão"])
+        llm = Mock()
+        agent = RagAgent(store, llm, reranker=KeywordReranker(), rerank_min_score=1.0)
+
+        with pytest.raises(AnswerNotFoundError):
+            agent.ask("fale do gato")
+        llm.answer.assert_not_called()
+
+    def test_reranker_failure_falls_back_to_distance_order(self):
+        store = self._store(["a", "b", "c", "d"])
+        llm = Mock()
+        llm.answer.return_value = "Resposta"
+        agent = RagAgent(store, llm, top_k=2, reranker=KeywordReranker(fail=True))
+
+        result = agent.ask("pergunta")
+
+        assert [c["chunk_id"] for c in result["used_chunks"]] == [0, 1]
+
+    def test_ask_many_and_aask_rerank(self):
+        store = self._store(["nada", "gato"])
+        store.query_many.return_value = [store.query.return_value]
+        llm = Mock()
+        llm.answer.return_value = "Resposta"
+        agent = RagAgent(store, llm, reranker=KeywordReranker(), rerank_top_n=1)
+
+        batch = agent.ask_many(["fale do gato"])
+        single = asyncio.run(agent.aask("fale do gato"))
+
+        assert [c["chunk_id"] for c in batch[0]["used_chunks"]] == [1]
+        assert [c["chunk_id"] for c in single["used_chunks"]] == [1]
+
+
+class TestRagAgentAsync:
+    """Tests for the asyncio path of RagAgent."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.hit = (
+            ["Document content"],
+            [{"chunk_id": 0, "source": "test.txt"}],
+            [0.1],
+        )
+
+    def test_aask_uses_async_providers(self):
+        """Test that native async store and LLM methods are awaited."""
+        store = Mock(spec=["query", "aquery"])
+        store.aquery = AsyncMock(return_value=self.hit)
+        llm = Mock(spec=["answer", "aanswer"])
+        llm.aanswer = AsyncMock(return_value=" Async answer ")
+        agent = RagAgent(store=store, llm=llm, top_k=2)
+
+        result = asyncio.run(agent.aask("Question", request_id="rid-1"))
+
+        assert result["answer"] == "Async answer"
+        assert result["request_id"] == "rid-1"
+        store.aquery.assert_awaited_once_with("Question", k=2)
+        store.query.assert_not_called()
+        llm.answer.assert_not_called()
+
+    def test_aask_falls_back_to_sync_providers(self):
+        """Test that sync-only providers run in the executor."""
+        store = Mock(spec=["query"])
+        store.query.return_value = self.hit
+        llm = Mock(spec=["answer"])
+        llm.answer.return_value = "Sync answer"
+        agent = RagAgent(store=store, llm=llm)
+
+        result = asyncio.run(agent.aask("Question"))
+
+        assert result["answer"] == "Sync answer"
+        store.query.assert_called_once_with("Question", k=5)
+
+    def test_aask_many_in_flight(self):
+        """Test that concurrent aask calls overlap on the event loop."""
+        state = {"in_flight": 0, "max": 0}
+
+        async def slow_answer(prompt):
+            state["in_flight"] += 1
+            state["max"] = max(state["max"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            return "Answer"
+
+        store = Mock(spec=["query", "aquery"])
+        store.aquery = AsyncMock(return_value=self.hit)
+        llm = Mock(spec=["answer", "aanswer"])
+        llm.aanswer = slow_answer
+        agent = RagAgent(store=store, llm=llm)
+
+        async def run():
+            return await asyncio.gather(*(agent.aask(f"Q{i}") for i in range(20)))
+
+        results = asyncio.run(run())
+
+        assert len(results) == 20
+        assert state["max"] == 20
+
+    def test_aask_guardrail_and_errors(self):
+        """Test that aask keeps the sync error semantics."""
+        store = Mock(spec=["query", "aquery"])
+        store.aquery = AsyncMock(return_value=self.hit)
+        llm = Mock(spec=["answer", "aanswer"])
+        llm.aanswer = AsyncMock(return_value="Não encontrado nos documentos.")
+        agent = RagAgent(store=store, llm=llm)
+
+        with pytest.raises(AnswerNotFoundError):
+            asyncio.run(agent.aask("Question"))
+
+        llm.aanswer = AsyncMock(side_effect=Exception("timeout"))
+        with pytest.raises(LLMError):
+            asyncio.run(agent.aask("Question"))
+
+        store.aquery = AsyncMock(side_effect=Exception("Database error"))
+        with pytest.raises(RetrievalError):
+            asyncio.run(agent.aask("Question"))
+
+
+class TestRagAgentAskMany:
+    """Tests for batched question answering."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.store = Mock(spec=["query", "query_many"])
+        self.llm = Mock(spec=["answer"])
+        self.agent = RagAgent(store=self.store, llm=self.llm, top_k=2, distance_threshold=0.3)
+
+    def test_single_vectorized_query(self):
+        """Test that all questions go to the store in one call."""
+        hit = (["Content"], [{"chunk_id": 0, "source": "a.txt"}], [0.1])
+        self.store.query_many.return_value = [hit, hit, hit]
+        self.llm.answer.return_value = "Answer"
+
+        results = self.agent.ask_many(["Q1", "Q2", "Q3"], request_ids=["a", "b", "c"])
+
+        self.store.query_many.assert_called_once_with(["Q1", "Q2", "Q3"], k=2)
+        self.store.query.assert_not_called()
+        assert [r["request_id"] for r in results] == ["a", "b", "c"]
+        assert self.llm.answer.call_count == 3
+
+    def test_per_item_errors_in_order(self):
+        """Test that failures are returned per question without aborting the batch."""
+        hit = (["Content"], [{"chunk_id": 0, "source": "a.txt"}], [0.1])
+        miss = (["Far"], [{"chunk_id": 1, "source": "a.txt"}], [0.9])
+        self.store.query_many.return_value = [hit, miss, hit, hit]
+
+        def answer(prompt):
+            if "Q3" in prompt:
+                return "Não encontrado nos documentos."
+            if "Q4" in prompt:
+                raise Exception("API error")
+            return "Answer"
+
+        self.llm.answer.side_effect = answer
+
+        results = self.agent.ask_many(["Q1", "Q2", "Q3", "Q4"])
+
+        assert results[0]["answer"] == "Answer"
+        assert isinstance(results[1], AnswerNotFoundError)
+        assert isinstance(results[2], AnswerNotFoundError)
+        assert isinstance(results[3], LLMError)
+        assert self.llm.answer.call_count == 3
+
+    def test_retrieval_failure_applies_to_all(self):
+        """Test that a failed batch query yields a RetrievalError per question."""
+        self.store.query_many.side_effect = Exception("Database error")
+
+        results = self.agent.ask_many(["Q1", "Q2"])
+
+        assert len(results) == 2
+        assert all(isinstance(r, RetrievalError) for r in results)
+
+    def test_mismatched_request_ids(self):
+        """Test that request_ids must align with questions."""
+        with pytest.raises(ValueError):
+            self.agent.ask_many(["Q1", "Q2"], request_ids=["only-one"])
+
+    def test_store_without_query_many(self):
+        """Test the per-question fallback for stores without batch support."""
+        store = Mock(spec=["query"])
+        store.query.return_value = (["Content"], [{"chunk_id": 0}], [0.1])
+        self.llm.answer.return_value = "Answer"
+        agent = RagAgent(store=store, llm=self.llm)
+
+        results = agent.ask_many(["Q1", "Q2"])
+
+        assert store.query.call_count == 2
+        assert all(r["answer"] == "Answer" for r in results)
+
+
+class StreamingLLM:
+    """LLM stub that streams fixed fragments and records cancellation."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.produced = 0
+        self.closed = False
+
+    def answer(self, prompt):
+        return "".join(self.pieces)
+
+    def stream(self, prompt):
+        try:
+            for piece in self.pieces:
+                self.produced += 1
+                yield piece
+        finally:
+            self.closed = True
+
+
+class TestRagAgentStream:
+    """Tests for streaming answer generation."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.store = Mock(spec=["query"])
+        self.store.query.return_value = (
+            ["Document content"],
+            [{"chunk_id": 0, "source": "test.txt"}],
+            [0.1],
+        )
+
+    def test_tokens_then_done(self):
+        """Test that tokens are yielded before the final result."""
+        llm = StreamingLLM(["The ", "answer ", "is 42."])
+        agent = RagAgent(store=self.store, llm=llm)
+
+        events = list(agent.ask_stream("Question", request_id="s-1"))
+
+        tokens = [e["text"] for e in events if e["type"] == "token"]
+        done = events[-1]
+        assert tokens == ["The ", "answer ", "is 42."]
+        assert done["type"] == "done"
+        assert done["answer"] == "The answer is 42."
+        assert done["request_id"] == "s-1"
+        assert done["ttft_ms"] is not None
+        assert done["used_chunks"][0]["chunk_id"] == 0
+
+    def test_refusal_prefix_aborts_early(self):
+        """Test that a refusal at the start cancels generation."""
+        llm = StreamingLLM(["'Não ", "encontrado ", "nos documentos", ".'", " extra"] * 20)
+        agent = RagAgent(store=self.store, llm=llm)
+
+        events = []
+        with pytest.raises(AnswerNotFoundError):
+            for event in agent.ask_stream("Question"):
+                events.append(event)
+
+        assert events == []
+        assert llm.produced == 3
+        assert llm.closed
+
+    def test_ambiguous_prefix_is_released(self):
+        """Test that text resembling the refusal prefix is emitted once it diverges."""
+        llm = StreamingLLM(["Não ", "é ", "simples."])
+        agent = RagAgent(store=self.store, llm=llm)
+
+        events = list(agent.ask_stream("Question"))
+
+        tokens = [e["text"] for e in events if e["type"] == "token"]
+        assert tokens == ["Não é ", "simples."]
+        assert events[-1]["answer"] == "Não é simples."
+
+    def test_empty_stream_not_found(self):
+        """Test that an empty stream triggers the guardrail."""
+        agent = RagAgent(store=self.store, llm=StreamingLLM([]))
+
+        with pytest.raises(AnswerNotFoundError):
+            list(agent.ask_stream("Question"))
+
+    def test_consumer_close_cancels_provider(self):
+        """Test that closing the stream early closes the provider stream."""
+        llm = StreamingLLM(["A", "B", "C", "D"])
+        agent = RagAgent(store=self.store, llm=llm)
+
+        gen = agent.ask_stream("Question")
+        assert next(gen)["text"] == "A"
+        gen.close()
+
+        assert llm.closed
+        assert llm.produced == 1
+
+    def test_stream_errors_wrapped(self):
+        """Test that provider failures mid-stream become LLMError."""
+
+        class Failing(StreamingLLM):
+            def stream(self, prompt):
+                yield "partial"
+                raise RuntimeError("connection reset")
+
+        agent = RagAgent(store=self.store, llm=Failing([]))
+
+        with pytest.raises(LLMError):
+            list(agent.ask_stream("Question"))
+
+    def test_non_streaming_provider_fallback(self):
+        """Test that providers without stream() still work."""
+        llm = Mock(spec=["answer"])
+        llm.answer.return_value = "Full answer"
+        agent = RagAgent(store=self.store, llm=llm)
+
+        events = list(agent.ask_stream("Question"))
+
+        assert events[0] == {"type": "token", "text": "Full answer"}
+        assert events[-1]["answer"] == "Full answer"
+
+
+class TestMetrics:
+    """Tests for per-stage timings and request metrics."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.store = Mock(spec=["query", "query_many"])
+        self.store.query.return_value = (["Content"], [{"chunk_id": 0, "source": "a"}], [0.1])
+        self.llm = Mock(spec=["answer"])
+        self.llm.answer.return_value = "Answer"
+        self.registry = MetricsRegistry()
+        self.agent = RagAgent(store=self.store, llm=self.llm, metrics=self.registry)
+
+    def _requests(self, outcome):
+        return self.registry.counter("rag_requests_total", "", ["outcome"]).value(outcome=outcome)
+
+    def test_result_has_stage_timings(self):
+        """Test that the result breaks the latency down by stage."""
+        result = self.agent.ask("Question")
+
+        timings = result["timings_ms"]
+        assert {"retrieve", "pack", "llm", "total"} <= set(timings)
+        assert timings["total"] == result["latency_ms"]
+        assert timings["llm"] <= timings["total"]
+
+    def test_outcomes_and_error_types(self):
+        """Test that answers, not-found results and errors are counted."""
+        self.agent.ask("Question")
+        self.llm.answer.return_value = "Não encontrado nos documentos."
+        with pytest.raises(AnswerNotFoundError):
+            self.agent.ask("Question")
+        self.llm.answer.side_effect = Exception("API error")
+        with pytest.raises(LLMError):
+            self.agent.ask("Question")
+
+        assert self._requests("ok") == 1
+        assert self._requests("not_found") == 1
+        assert self._requests("error") == 1
+        errors = self.registry.counter("rag_errors_total", "", ["type"])
+        assert errors.value(type="LLMError") == 1
+        stages = self.registry.histogram("rag_stage_seconds", "", ["stage"])
+        assert stages.count(stage="llm") == 3
+
+    def test_ask_many_and_stream_recorded(self):
+        """Test that batched and streamed questions are recorded per question."""
+        hit = (["Content"], [{"chunk_id": 0, "source": "a"}], [0.1])
+        miss = (["Far"], [{"chunk_id": 1, "source": "a"}], [0.9])
+        self.store.query_many.return_value = [hit, miss]
+
+        results = self.agent.ask_many(["Q1", "Q2"])
+        events = list(self.agent.ask_stream("Q3"))
+
+        assert "retrieve" in results[0]["timings_ms"]
+        assert "llm" in events[-1]["timings_ms"]
+        assert self._requests("ok") == 2
+        assert self._requests("not_found") == 1
+        chunks = self.registry.histogram("rag_retrieved_chunks", "")
+        assert chunks.count() == 3
@@ -0,0 +1,101 @@
+"""Tests for the BM25 inverted index."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.storage.bm25 import BM25Index, tokenize
+
+DOCS = {
+    "a": "O erro ERR-4312 ocorre quando a bomba perde pressão.",
+    "b": "Procedimento de manutenção preventiva da bomba hidráulica.",
+    "c": "A peça PN-88.10B substitui o selo mecânico.",
+    "d": "Configuração de rede e endereços IP do controlador.",
+}
+
+
+@pytest.fixture
+def index():
+    """Index populated with a few Portuguese documents."""
+    idx = BM25Index()
+    idx.add(list(DOCS), list(DOCS.values()))
+    return idx
+
+
+class TestTokenize:
+    """Tests for BM25 term extraction."""
+
+    def test_lowercases_and_folds_accents(self):
+        """Accented and unaccented spellings produce the same terms."""
+        assert tokenize("Manutenção PRESSÃO") == tokenize("manutencao pressao")
+
+    def test_compound_identifiers(self):
+        """Identifiers are indexed whole and by their parts."""
+        terms = tokenize("Código ERR-4312 e PN-88.10B")
+        assert {"err-4312", "err", "4312", "pn-88.10b", "pn", "88", "10b"} <= set(terms)
+
+
+class TestBM25Index:
+    """Tests for BM25 scoring and maintenance."""
+
+    def test_exact_identifier_ranks_first(self, index):
+        """Exact identifiers retrieve the document that contains them."""
+        assert index.search("o que significa ERR-4312?", k=2)[0][0] == "a"
+        assert index.search("PN-88.10B", k=1)[0][0] == "c"
+
+    def test_scores_sorted_and_k_respected(self, index):
+        """Results are sorted by score and capped at k."""
+        results = index.search("bomba pressão manutenção", k=2)
+        assert len(results) == 2
+        assert results[0][1] >= results[1][1]
+
+    def test_no_match(self, index):
+        """Unknown terms return no results."""
+        assert index.search("inexistente") == []
+        assert BM25Index().search("bomba") == []
+
+    def test_delete_and_replace(self, index):
+        """Deleted documents disappear and re-added IDs use their new text."""
+        index.delete(["a"])
+        assert index.search("ERR-4312") == []
+        index.add(["b"], ["Novo texto sobre ERR-4312"])
+        assert index.search("ERR-4312")[0][0] == "b"
+        assert index.search("hidráulica") == []
+        assert len(index) == 3
+
+    def test_compaction_keeps_results(self):
+        """Heavy deletion compacts the index without changing results."""
+        idx = BM25Index()
+        ids = [f"doc{i}" for i in range(3000)]
+        idx.add(ids, [f"texto comum termo{i}" for i in range(3000)])
+        idx.delete(ids[:2000])
+
+        assert len(idx._ids) == 1000
+        assert idx.search("termo2500", k=1)[0][0] == "doc2500"
+        assert idx.search("termo10") == []
+
+    def test_persistence_roundtrip(self, index):
+        """A saved index loads with identical results."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "idx.bm25.npz")
+            index.delete(["d"])
+            index.save(path)
+            loaded = BM25Index(path)
+
+            assert len(loaded) == len(index)
+            for query in ("ERR-4312", "bomba", "selo mecânico", "rede"):
+                assert loaded.search(query) == index.search(query)
+
+    def test_save_if_due(self, index):
+        """Automatic saves only happen with pending changes and a path."""
+        assert not index.save_if_due(0)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index.path = os.path.join(tmpdir, "idx.npz")
+            assert index.save_if_due(0)
+            assert not index.save_if_due(0)
+            assert os.path.exists(index.path)
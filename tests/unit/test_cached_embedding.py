@@ -0,0 +1,178 @@
+"""Tests for the caching embedding wrapper."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.exceptions import EmbeddingError
+from rag_agent.providers.cached_embedding import CachedEmbedding, embedder_model_name
+from rag_agent.utils.cache import LRUCache
+
+
+class CountingEmbedding:
+    """Embedding provider that records every call."""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.5, 0.25] for t in texts]
+
+
+class TestLRUCache:
+    """Tests for the LRUCache helper."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "a" becomes most recent
+        cache.put("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(max_entries=4)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            LRUCache(max_entries=0)
+
+    def test_ttl_expiry(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("rag_agent.utils.cache.time.monotonic", lambda: now[0])
+        cache = LRUCache(max_entries=4, ttl=5.0)
+        cache.put("a", 1)
+
+        now[0] = 104.0
+        assert cache.get("a") == 1
+        now[0] = 105.5
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+
+class TestCachedEmbedding:
+    """Tests for the CachedEmbedding wrapper."""
+
+    def test_model_name_detection(self):
+        assert embedder_model_name(CountingEmbedding()) == "fake-model"
+        assert embedder_model_name(object()) == "object"
+
+    def test_only_misses_reach_provider(self):
+        inner = CountingEmbedding()
+        cached = CachedEmbedding(inner)
+
+        first = cached.embed(["alpha", "beta"])
+        second = cached.embed(["beta", "gamma", "alpha"])
+
+        assert inner.calls == [["alpha", "beta"], ["gamma"]]
+        assert second[0] == first[1]
+        assert second[2] == first[0]
+        stats = cached.stats()
+        assert stats["memory_hits"] == 2
+        assert stats["misses"] == 3
+        assert stats["provider_calls"] == 2
+
+    def test_duplicate_texts_single_request(self):
+        inner = CountingEmbedding()
+        cached = CachedEmbedding(inner)
+
+        vectors = cached.embed(["same", "same", "other"])
+
+        assert inner.calls == [["same", "other"]]
+        assert vectors[0] == vectors[1]
+        assert len(vectors) == 3
+
+    def test_results_are_copies(self):
+        cached = CachedEmbedding(CountingEmbedding())
+        first = cached.embed(["x", "x"])
+        first[0][0] = -1.0
+
+        assert first[1][0] == 1.0
+        assert cached.embed(["x"]) == [[1.0, 0.5, 0.25]]
+
+    def test_counters_are_thread_safe(self):
+        cached = CachedEmbedding(CountingEmbedding())
+        cached.embed(["x"])
+
+        threads = [
+            threading.Thread(target=lambda: [cached.embed(["x"]) for _ in range(200)])
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert cached.stats()["memory_hits"] == 1600
+
+    def test_all_hits_skip_provider(self):
+        inner = CountingEmbedding()
+        cached = CachedEmbedding(inner)
+        cached.embed(["x"])
+        cached.embed(["x"])
+
+        assert len(inner.calls) == 1
+        assert cached.stats()["hit_rate"] == 0.5
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "emb.sqlite")
+        inner = CountingEmbedding()
+        cached = CachedEmbedding(inner, cache_path=path)
+        original = cached.embed(["persisted text"])
+        cached.close()
+
+        inner2 = CountingEmbedding()
+        reopened = CachedEmbedding(inner2, cache_path=path)
+        again = reopened.embed(["persisted text"])
+
+        assert inner2.calls == []
+        assert reopened.stats()["disk_hits"] == 1
+        assert again[0] == pytest.approx(original[0])
+        reopened.close()
+
+    def test_model_name_partitions_keys(self, tmp_path):
+        path = str(tmp_path / "emb.sqlite")
+        CachedEmbedding(CountingEmbedding(), cache_path=path, model_name="a").embed(["t"])
+
+        inner = CountingEmbedding()
+        CachedEmbedding(inner, cache_path=path, model_name="b").embed(["t"])
+
+        assert inner.calls == [["t"]]
+
+    def test_disk_size_eviction(self, tmp_path):
+        # Each 3-dim float32 vector takes 12 bytes; budget allows two of them
+        cached = CachedEmbedding(
+            CountingEmbedding(), cache_path=str(tmp_path / "emb.sqlite"), max_disk_bytes=24
+        )
+        cached.embed(["one"])
+        cached.embed(["two"])
+        cached.embed(["three"])
+
+        assert cached.stats()["disk_bytes"] <= 24
+
+    def test_provider_count_mismatch(self):
+        class Broken:
+            def embed(self, texts):
+                return []
+
+        with pytest.raises(EmbeddingError):
+            CachedEmbedding(Broken()).embed(["a"])
@@ -0,0 +1,79 @@
+"""Tests for context assembly helpers."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.context import mmr_select, overlap_length, stitch_adjacent
+from rag_agent.utils.text_processing import chunk_text
+
+
+def _ctx(text, source, chunk_id, dist):
+    return (text, {"source": source, "chunk_id": chunk_id}, dist)
+
+
+class TestOverlapLength:
+    """Tests for suffix/prefix overlap detection."""
+
+    def test_finds_longest_overlap(self):
+        assert overlap_length("abcdefghij", "ghijklmn", min_overlap=2) == 4
+
+    def test_short_matches_ignored(self):
+        assert overlap_length("fim.", ". novo", min_overlap=4) == 0
+
+
+class TestStitchAdjacent:
+    """Tests for merging consecutive chunks."""
+
+    def test_reconstructs_original_text(self):
+        text = "".join(f"Frase número {i} do documento. " for i in range(40))
+        chunks = chunk_text(text, max_chars=200, overlap=40)
+        contexts = [_ctx(c, "doc.txt", i, 0.1 + i / 100) for i, c in enumerate(chunks)]
+
+        stitched = stitch_adjacent(list(reversed(contexts)))
+
+        assert len(stitched) == 1
+        merged, meta, dist = stitched[0]
+        assert merged == text
+        assert meta["chunk_ids"] == list(range(len(chunks)))
+        assert dist == 0.1
+
+    def test_only_consecutive_same_source(self):
+        contexts = [
+            _ctx("A" * 50, "a.txt", 3, 0.1),
+            _ctx("B" * 50, "b.txt", 4, 0.2),
+            _ctx("C" * 50, "a.txt", 5, 0.3),
+            _ctx("D" * 50, "a.txt", 4, 0.4),
+        ]
+
+        stitched = stitch_adjacent(contexts)
+
+        assert [m.get("chunk_ids") for _, m, _ in stitched] == [[3, 4, 5], None]
+        assert stitched[0][0] == "A" * 50 + "D" * 50 + "C" * 50
+        assert stitched[1][1]["source"] == "b.txt"
+
+    def test_non_integer_ids_pass_through(self):
+        contexts = [_ctx("x", "a.txt", "intro", 0.1), _ctx("y", "a.txt", None, 0.2)]
+
+        assert stitch_adjacent(contexts) == contexts
+
+
+class TestMMRSelect:
+    """Tests for maximal-marginal-relevance selection."""
+
+    def test_drops_near_duplicates(self):
+        vectors = [[1.0, 0.0], [0.999, 0.01], [0.0, 1.0]]
+
+        picked = mmr_select([0.9, 0.89, 0.5], vectors, k=3)
+
+        assert picked == [0, 2]
+
+    def test_prefers_diverse_candidates(self):
+        vectors = [[1.0, 0.0], [0.9, 0.3], [0.0, 1.0]]
+
+        assert mmr_select([0.9, 0.85, 0.6], vectors, k=2, lambda_=1.0) == [0, 1]
+        assert mmr_select([0.9, 0.85, 0.6], vectors, k=2, lambda_=0.5) == [0, 2]
+
+    def test_empty(self):
+        assert mmr_select([], [], k=3) == []
@@ -0,0 +1,105 @@
+"""Tests for embedding providers."""
+
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.exceptions import EmbeddingError
+from rag_agent.providers.embeddings import OpenAIEmbedding, batch_by_limits
+
+
+class FakeEmbeddingsAPI:
+    """Stand-in for ``client.embeddings`` that records requests."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.requests = []
+        self.delay = delay
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.requests.append(list(input))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("rate limited")
+            # Return items out of order to check index-based reassembly
+            data = [
+                types.SimpleNamespace(index=i, embedding=[float(len(t))])
+                for i, t in enumerate(input)
+            ]
+            return types.SimpleNamespace(data=list(reversed(data)))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Install a fake ``openai`` module exposing a controllable client."""
+    api = FakeEmbeddingsAPI()
+
+    class FakeClient:
+        def __init__(self):
+            self.embeddings = api
+
+    monkeypatch.setitem(sys.modules, "openai", types.SimpleNamespace(OpenAI=FakeClient))
+    return api
+
+
+class TestBatchByLimits:
+    """Tests for the batch splitting helper."""
+
+    def test_item_limit(self):
+        batches = batch_by_limits(["a"] * 5, len, max_items=2, max_tokens=100)
+        assert batches == [[0, 1], [2, 3], [4]]
+
+    def test_token_limit(self):
+        texts = ["aaaa", "bb", "cccc", "d"]
+        batches = batch_by_limits(texts, len, max_items=10, max_tokens=6)
+        assert batches == [[0, 1], [2, 3]]
+
+    def test_oversized_text_gets_own_batch(self):
+        batches = batch_by_limits(["x" * 50, "y"], len, max_items=10, max_tokens=10)
+        assert batches == [[0], [1]]
+
+
+class TestOpenAIEmbedding:
+    """Tests for OpenAIEmbedding batching and ordering."""
+
+    def test_results_in_input_order(self, fake_openai):
+        embedder = OpenAIEmbedding(max_batch_items=2)
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+        vectors = embedder.embed(texts)
+
+        assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert len(fake_openai.requests) == 3
+
+    def test_bounded_concurrency(self, fake_openai):
+        fake_openai.delay = 0.02
+        embedder = OpenAIEmbedding(max_batch_items=1, max_concurrency=3)
+
+        embedder.embed([str(i) for i in range(9)])
+
+        assert 1 < fake_openai.max_in_flight <= 3
+
+    def test_empty_input(self, fake_openai):
+        assert OpenAIEmbedding().embed([]) == []
+        assert fake_openai.requests == []
+
+    def test_errors_wrapped(self, fake_openai):
+        fake_openai.fail = True
+        with pytest.raises(EmbeddingError):
+            OpenAIEmbedding(max_batch_items=1).embed(["a", "b"])
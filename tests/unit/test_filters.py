@@ -0,0 +1,83 @@
+"""Tests for metadata where-filters."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.storage.filters import matches_where, normalize_where, scoped_where
+
+
+class TestNormalizeWhere:
+    """Tests for filter validation and normalization."""
+
+    def test_empty(self):
+        assert normalize_where(None) is None
+        assert normalize_where({}) is None
+
+    def test_single_field_unchanged(self):
+        assert normalize_where({"source": "a.pdf"}) == {"source": "a.pdf"}
+
+    def test_multiple_fields_become_and(self):
+        where = normalize_where({"tenant": "acme", "doc_type": {"$in": ["pdf", "md"]}})
+
+        assert where == {"$and": [{"tenant": "acme"}, {"doc_type": {"$in": ["pdf", "md"]}}]}
+
+    def test_single_element_logical_unwrapped(self):
+        assert normalize_where({"$or": [{"source": "a"}]}) == {"source": "a"}
+
+    @pytest.mark.parametrize(
+        "where",
+        [{"$xor": []}, {"source": {"$like": "a"}}, {"n": {"$gt": 1, "$lt": 3}}, {"$and": []}],
+    )
+    def test_invalid(self, where):
+        with pytest.raises(ValueError):
+            normalize_where(where)
+
+
+class TestScopedWhere:
+    """Tests for combining filters with source restrictions."""
+
+    def test_source_only(self):
+        assert scoped_where(source="a.pdf") == {"source": "a.pdf"}
+        assert scoped_where(source=["a", "b"]) == {"source": {"$in": ["a", "b"]}}
+
+    def test_combined(self):
+        assert scoped_where({"tenant": "acme"}, "a.pdf") == {
+            "$and": [{"tenant": "acme"}, {"source": "a.pdf"}]
+        }
+
+    def test_nothing(self):
+        assert scoped_where() is None
+
+
+class TestMatchesWhere:
+    """Tests for evaluating filters in Python."""
+
+    META = {"source": "a.pdf", "tenant": "acme", "ingested_at": 100, "draft": False}
+
+    @pytest.mark.parametrize(
+        "where,expected",
+        [
+            ({"source": "a.pdf"}, True),
+            ({"source": "b.pdf"}, False),
+            ({"ingested_at": {"$gte": 100}}, True),
+            ({"ingested_at": {"$lt": 100}}, False),
+            ({"tenant": {"$in": ["acme", "globex"]}}, True),
+            ({"tenant": {"$nin": ["acme"]}}, False),
+            ({"tenant": {"$ne": "globex"}}, True),
+            ({"missing": {"$gte": 1}}, False),
+            ({"source": {"$gt": 5}}, False),
+            ({"$and": [{"source": "a.pdf"}, {"draft": False}]}, True),
+            ({"$or": [{"source": "b.pdf"}, {"tenant": "acme"}]}, True),
+            ({"source": "a.pdf", "tenant": "globex"}, False),
+        ],
+    )
+    def test_operators(self, where, expected):
+        assert matches_where(self.META, where) is expected
+
+    def test_deleted_rows_never_match(self):
+        assert matches_where(None, {"source": "a.pdf"}) is False
+        assert matches_where(None, None) is True
@@ -0,0 +1,86 @@
+"""Tests for lazy attribute loading of the public API."""
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).parent.parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+PACKAGES = [
+    "rag_agent",
+    "rag_agent.core",
+    "rag_agent.providers",
+    "rag_agent.storage",
+    "rag_agent.utils",
+]
+
+HEAVY_MODULES = ["chromadb", "numpy", "torch", "sentence_transformers", "openai", "httpx"]
+
+
+def loaded_modules(statement):
+    """Modules in ``sys.modules`` after running ``statement`` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{statement}\nimport sys, json; print(json.dumps(sorted(sys.modules)))",
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    ).stdout
+    return set(json.loads(out.splitlines()[-1]))
+
+
+class TestColdStart:
+    """Importing the package must not load submodules or optional dependencies."""
+
+    def test_import_loads_no_submodules(self):
+        modules = loaded_modules("import rag_agent")
+        loaded = {m for m in modules if m.startswith("rag_agent.")}
+        assert loaded <= {"rag_agent.utils", "rag_agent.utils.lazy"}
+
+    def test_public_api_loads_no_heavy_dependencies(self):
+        modules = loaded_modules("from rag_agent import *")
+        assert "rag_agent.core.agent" in modules
+        assert not [m for m in HEAVY_MODULES if m in modules]
+        assert "asyncio" not in modules
+
+
+class TestLazyAttributes:
+    """Tests for the PEP 562 ``__getattr__``/``__dir__`` of each package."""
+
+    @pytest.mark.parametrize("name", PACKAGES)
+    def test_all_names_resolve(self, name):
+        package = importlib.import_module(name)
+        for attr in package.__all__:
+            assert getattr(package, attr) is not None
+            assert attr in dir(package)
+
+    def test_resolves_to_defining_module(self):
+        import rag_agent
+        from rag_agent.core.agent import RagAgent
+        from rag_agent.storage import NumpyStore
+
+        assert rag_agent.RagAgent is RagAgent
+        assert rag_agent.NumpyStore is NumpyStore
+        assert "RagAgent" in vars(rag_agent)  # cached after first access
+
+    def test_unknown_attribute(self):
+        import rag_agent
+
+        with pytest.raises(AttributeError, match="no_such_name"):
+            rag_agent.no_such_name
+
+    def test_from_import(self):
+        from rag_agent.utils import chunk_text, span
+
+        assert callable(chunk_text) and callable(span)
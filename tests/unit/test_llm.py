@@ -0,0 +1,146 @@
+"""Tests for LLM providers."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.exceptions import LLMError
+from rag_agent.providers.llm import OllamaChat, _shared_session
+
+
+class FakeResponse:
+    """Minimal ``requests.Response`` stand-in."""
+
+    def __init__(self, payload=None, lines=None, status_error=None):
+        self.payload = payload or {}
+        self.lines = lines or []
+        self.status_error = status_error
+        self.closed = False
+        self.lines_read = 0
+
+    def raise_for_status(self):
+        if self.status_error:
+            raise self.status_error
+
+    def json(self):
+        return self.payload
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.lines_read += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRequests:
+    """Records posted payloads and returns a prepared response."""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.calls.append({"url": url, "json": json, "timeout": timeout, "stream": stream})
+        return self.response
+
+
+@pytest.fixture
+def ollama():
+    """OllamaChat instance pointing at a fake server."""
+    return OllamaChat(model="test-model", host="http://ollama:11434")
+
+
+def _line(content, done=False):
+    return json.dumps({"message": {"content": content}, "done": done}).encode()
+
+
+class TestOllamaChat:
+    """Tests for the Ollama provider."""
+
+    def test_answer(self, ollama):
+        fake = FakeRequests(FakeResponse(payload={"message": {"content": "Resposta"}}))
+        ollama.session = fake
+
+        assert ollama.answer("prompt") == "Resposta"
+        call = fake.calls[0]
+        assert call["url"] == "http://ollama:11434/api/chat"
+        assert call["json"]["stream"] is False
+        assert call["json"]["model"] == "test-model"
+
+    def test_stream_yields_fragments(self, ollama):
+        response = FakeResponse(lines=[_line("Olá"), b"", _line(" mundo"), _line("", done=True)])
+        fake = FakeRequests(response)
+        ollama.session = fake
+
+        assert list(ollama.stream("prompt")) == ["Olá", " mundo"]
+        assert fake.calls[0]["json"]["stream"] is True
+        assert fake.calls[0]["stream"] is True
+        assert response.closed
+
+    def test_stream_close_drops_connection(self, ollama):
+        response = FakeResponse(lines=[_line(str(i)) for i in range(100)])
+        ollama.session = FakeRequests(response)
+
+        gen = ollama.stream("prompt")
+        next(gen)
+        gen.close()
+
+        assert response.closed
+        assert response.lines_read == 1
+
+    def test_stream_error_line(self, ollama):
+        response = FakeResponse(lines=[json.dumps({"error": "model not found"}).encode()])
+        ollama.session = FakeRequests(response)
+
+        with pytest.raises(LLMError):
+            list(ollama.stream("prompt"))
+
+    def test_http_error_wrapped(self, ollama):
+        response = FakeResponse(status_error=RuntimeError("500"))
+        ollama.session = FakeRequests(response)
+
+        with pytest.raises(LLMError):
+            ollama.answer("prompt")
+        with pytest.raises(LLMError):
+            list(ollama.stream("prompt"))
+
+    def test_session_shared_across_instances(self):
+        a = OllamaChat(pool_maxsize=4, max_retries=1)
+        b = OllamaChat(model="other", pool_maxsize=4, max_retries=1)
+        c = OllamaChat(pool_maxsize=8, max_retries=1)
+
+        assert a.session is b.session
+        assert a.session is not c.session
+        assert _shared_session(4, 1) is a.session
+        adapter = a.session.get_adapter("http://localhost:11434")
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 1
+
+    def test_residency_options(self, ollama):
+        fake = FakeRequests(FakeResponse(payload={"message": {"content": "ok"}}))
+        tuned = OllamaChat(keep_alive=-1, num_ctx=4096, num_predict=256)
+        tuned.session = fake
+
+        tuned.answer("prompt")
+
+        payload = fake.calls[0]["json"]
+        assert payload["keep_alive"] == -1
+        assert payload["options"]["num_ctx"] == 4096
+        assert payload["options"]["num_predict"] == 256
+
+    def test_context_sized_from_prompt(self):
+        chat = OllamaChat(max_ctx=16384)
+
+        assert chat._context_size("short prompt") == 2048
+        assert chat._context_size("x" * 12000) == 8192
+        assert chat._context_size("x" * 100000) == 16384
+        assert "num_predict" not in chat._payload("p")["options"]
+
+    def test_keep_alive_omitted_when_none(self):
+        assert "keep_alive" not in OllamaChat(keep_alive=None)._payload("p")
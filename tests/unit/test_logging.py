@@ -3,12 +3,21 @@
 import json
 import logging
 import sys
+import threading
 from io import StringIO
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
-from rag_agent.utils.logging import JsonFormatter, setup_logger
+import pytest
+
+from rag_agent.utils.logging import (
+    JsonFormatter,
+    QueuedJsonHandler,
+    configure_logging,
+    setup_logger,
+)
+from rag_agent.utils.metrics import MetricsRegistry
 
 
 class TestJsonFormatter:
@@ -124,3 +133,153 @@ class TestSetupLogger:
         assert parsed["level"] == "INFO"
         assert parsed["message"] == "Test log message"
         assert parsed["logger"] == "test_output"
+
+
+class BlockedStream(StringIO):
+    """Stream whose writes wait until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, s):
+        self.release.wait(5)
+        return super().write(s)
+
+
+def make_record(event=None, level=logging.INFO, msg="msg"):
+    record = logging.LogRecord("test_queue", level, "", 0, msg, (), None)
+    if event is not None:
+        record.extra = {"event": event}
+    return record
+
+
+class TestQueuedJsonHandler:
+    """Tests for QueuedJsonHandler."""
+
+    def test_records_written_on_close(self):
+        stream = StringIO()
+        handler = QueuedJsonHandler(stream, registry=MetricsRegistry())
+        for i in range(5):
+            handler.emit(make_record(event="e", msg=f"m{i}"))
+        handler.close()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["message"] for line in lines] == [f"m{i}" for i in range(5)]
+        assert lines[0]["event"] == "e"
+        assert handler.stats()["written"] == 5
+
+    def test_drop_policy_counts_overflow(self):
+        stream = BlockedStream()
+        registry = MetricsRegistry()
+        handler = QueuedJsonHandler(stream, max_queue=2, batch_size=1, registry=registry)
+        for _ in range(20):
+            handler.emit(make_record())
+        dropped = handler.stats()["dropped"]
+        stream.release.set()
+        handler.close()
+
+        assert dropped > 0
+        assert handler.stats()["written"] + dropped == 20
+        counter = registry.counter("rag_log_records_dropped_total", "", ["reason"])
+        assert counter.value(reason="queue_full") == dropped
+
+    def test_block_policy_times_out(self):
+        stream = BlockedStream()
+        handler = QueuedJsonHandler(
+            stream, max_queue=1, overflow="block", block_timeout=0.01, registry=MetricsRegistry()
+        )
+        for _ in range(5):
+            handler.emit(make_record())
+        assert handler.stats()["dropped"] > 0
+        stream.release.set()
+        handler.close()
+
+    def test_sampling_keeps_warnings(self):
+        stream = StringIO()
+        handler = QueuedJsonHandler(
+            stream, sample_rates={"answer_ok": 0.0}, registry=MetricsRegistry(), seed=1
+        )
+        handler.emit(make_record(event="answer_ok"))
+        handler.emit(make_record(event="answer_ok", level=logging.WARNING))
+        handler.emit(make_record(event="other"))
+        handler.close()
+
+        events = [json.loads(line)["level"] for line in stream.getvalue().splitlines()]
+        assert events == ["WARNING", "INFO"]
+        assert handler.stats()["sampled_out"] == 1
+
+    def test_sampling_rate_is_approximate(self):
+        handler = QueuedJsonHandler(
+            StringIO(), sample_rates={"answer_ok": 0.25}, registry=MetricsRegistry(), seed=0
+        )
+        for _ in range(2000):
+            handler.emit(make_record(event="answer_ok"))
+        handler.close()
+        assert 400 < handler.stats()["written"] < 600
+
+    def test_invalid_overflow(self):
+        with pytest.raises(ValueError):
+            QueuedJsonHandler(StringIO(), overflow="spill")
+
+    def test_record_snapshotted_at_emit(self):
+        stream = BlockedStream()
+        handler = QueuedJsonHandler(stream, batch_size=1, registry=MetricsRegistry())
+        handler.emit(make_record())  # occupies the writer until released
+        args = ["antes"]
+        chunks = [1, 2]
+        record = logging.LogRecord("test_queue", logging.INFO, "", 0, "valor=%s", (args,), None)
+        record.extra = {"event": "e", "chunks": chunks}
+        handler.emit(record)
+        args[0] = "depois"
+        chunks.append(3)
+        stream.release.set()
+        handler.close()
+
+        line = json.loads(stream.getvalue().splitlines()[-1])
+        assert line["message"] == "valor=['antes']"
+        assert line["chunks"] == [1, 2]
+
+    def test_exception_rendered_before_queueing(self):
+        stream = StringIO()
+        handler = QueuedJsonHandler(stream, registry=MetricsRegistry())
+        try:
+            raise ValueError("falhou")
+        except ValueError:
+            record = logging.LogRecord(
+                "test_queue", logging.ERROR, "", 0, "erro", (), sys.exc_info()
+            )
+        prepared = handler.prepare(record)
+        handler.emit(record)
+        handler.close()
+
+        assert prepared.exc_info is None
+        assert "ValueError: falhou" in prepared.exc_text
+        assert "ValueError: falhou" in json.loads(stream.getvalue())["exc_info"]
+
+
+class TestConfigureLogging:
+    """Tests for configure_logging."""
+
+    def test_queued_replaces_handlers(self):
+        stream = StringIO()
+        logger = setup_logger("test_configure")
+        handler = configure_logging(
+            "test_configure", queued=True, stream=stream, registry=MetricsRegistry()
+        )
+        assert logger.handlers == [handler]
+        assert isinstance(handler, QueuedJsonHandler)
+
+        logger.info("ok", extra={"extra": {"event": "answer_ok"}})
+        handler.close()
+        assert json.loads(stream.getvalue())["event"] == "answer_ok"
+        logger.removeHandler(handler)
+
+    def test_sync_handler(self):
+        stream = StringIO()
+        handler = configure_logging("test_configure_sync", level="warning", stream=stream)
+        logger = logging.getLogger("test_configure_sync")
+        logger.info("hidden")
+        logger.warning("shown")
+        assert not isinstance(handler, QueuedJsonHandler)
+        assert json.loads(stream.getvalue())["message"] == "shown"
@@ -0,0 +1,92 @@
+"""Tests for stage timings and the metrics registry."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.utils.metrics import MetricsRegistry, StageTimer, stage
+
+
+class TestStageTimer:
+    """Tests for per-request stage timings."""
+
+    def test_stages_accumulate(self):
+        timer = StageTimer()
+        with timer.stage("llm"):
+            time.sleep(0.002)
+        with timer.stage("llm"):
+            time.sleep(0.002)
+
+        timings = timer.as_dict()
+
+        assert timings["llm"] >= 4.0
+        assert timings["total"] >= timings["llm"]
+
+    def test_module_stage_records_on_active_timer(self):
+        timer = StageTimer()
+        with stage("embed"):
+            pass
+        assert timer.stages == {}
+
+        with timer.activate():
+            with stage("embed"):
+                pass
+        with stage("search"):
+            pass
+
+        assert set(timer.stages) == {"embed"}
+
+    def test_merge(self):
+        timer, shared = StageTimer(), StageTimer()
+        with shared.activate(), stage("search"):
+            pass
+        timer.merge(shared)
+        timer.merge(shared)
+
+        assert timer.stages["search"] == 2 * shared.stages["search"]
+
+
+class TestMetricsRegistry:
+    """Tests for counters, histograms and the Prometheus text format."""
+
+    def test_counter_render(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("rag_requests_total", "Perguntas.", ["outcome"])
+        requests.inc(outcome="ok")
+        requests.inc(2, outcome='not "found"')
+
+        text = registry.render()
+
+        assert "# HELP rag_requests_total Perguntas.\n" in text
+        assert "# TYPE rag_requests_total counter\n" in text
+        assert 'rag_requests_total{outcome="ok"} 1\n' in text
+        assert 'rag_requests_total{outcome="not \\"found\\""} 2\n' in text
+
+    def test_histogram_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram("rag_prompt_tokens", "Tokens.", buckets=[10, 100])
+        for value in (5, 10, 50, 500):
+            hist.observe(value)
+
+        lines = registry.render().splitlines()
+
+        assert 'rag_prompt_tokens_bucket{le="10"} 2' in lines
+        assert 'rag_prompt_tokens_bucket{le="100"} 3' in lines
+        assert 'rag_prompt_tokens_bucket{le="+Inf"} 4' in lines
+        assert "rag_prompt_tokens_sum 565" in lines
+        assert "rag_prompt_tokens_count 4" in lines
+
+    def test_get_or_create(self):
+        registry = MetricsRegistry()
+        assert registry.counter("a_total", "A.") is registry.counter("a_total", "A.")
+        with pytest.raises(ValueError):
+            registry.histogram("a_total", "A.")
+
+    def test_label_names_enforced(self):
+        counter = MetricsRegistry().counter("a_total", "A.", ["type"])
+        with pytest.raises(ValueError):
+            counter.inc(kind="x")
@@ -0,0 +1,208 @@
+"""Tests for the shared model registry and provider warm-up."""
+
+import gc
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.agent import RagAgent
+from rag_agent.providers.cached_embedding import CachedEmbedding
+from rag_agent.providers.embeddings import SentenceTransformerEmbedding
+from rag_agent.providers.registry import ModelRegistry, model_key
+from rag_agent.providers.rerank import CrossEncoderReranker
+
+
+class FakeArray(list):
+    def tolist(self):
+        return list(self)
+
+
+class FakeSentenceTransformer:
+    """Stand-in for ``sentence_transformers.SentenceTransformer`` that counts loads."""
+
+    loads = 0
+
+    def __init__(self, model_name, device=None):
+        FakeSentenceTransformer.loads += 1
+        self.model_name = model_name
+        self.device = device
+        self.encoded = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False):
+        self.encoded.append(list(texts))
+        return FakeArray([[float(len(t)), 1.0] for t in texts])
+
+
+class FakeCrossEncoder:
+    """Stand-in for ``sentence_transformers.CrossEncoder`` that counts loads."""
+
+    loads = 0
+
+    def __init__(self, model_name, max_length=None, device=None):
+        FakeCrossEncoder.loads += 1
+        self.predicted = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.predicted.append(list(pairs))
+        return [0.5 for _ in pairs]
+
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    """Install a fake ``sentence_transformers`` module."""
+    FakeSentenceTransformer.loads = 0
+    FakeCrossEncoder.loads = 0
+    module = types.SimpleNamespace(
+        SentenceTransformer=FakeSentenceTransformer, CrossEncoder=FakeCrossEncoder
+    )
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    return module
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry()
+
+
+class TestModelRegistry:
+    """Tests for ModelRegistry."""
+
+    def test_acquire_loads_once_and_counts_references(self, registry):
+        key = model_key("kind", "m", device="cpu")
+        loads = []
+
+        a = registry.acquire(key, lambda: loads.append(1) or object())
+        b = registry.acquire(key, lambda: loads.append(1) or object())
+
+        assert a.model is b.model
+        assert loads == [1]
+        assert registry.stats()[0]["refs"] == 2
+
+        a.release()
+        a.release()  # idempotent
+        assert registry.get(key) is b.model
+        b.release()
+        assert registry.get(key) is None
+        assert len(registry) == 0
+
+    def test_options_are_part_of_the_key(self, registry):
+        a = registry.acquire(model_key("kind", "m", device="cpu"), object)
+        b = registry.acquire(model_key("kind", "m", device="cuda"), object)
+
+        assert a.model is not b.model
+        assert len(registry) == 2
+
+    def test_failed_load_is_not_cached(self, registry):
+        key = model_key("kind", "m")
+
+        def broken():
+            raise RuntimeError("sem memória")
+
+        with pytest.raises(RuntimeError):
+            registry.acquire(key, broken)
+        assert len(registry) == 0
+        assert registry.acquire(key, lambda: "ok").model == "ok"
+
+    def test_concurrent_acquires_share_one_load(self, registry):
+        key = model_key("kind", "m")
+        loads = []
+
+        def slow_loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return object()
+
+        handles = []
+        threads = [
+            threading.Thread(target=lambda: handles.append(registry.acquire(key, slow_loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert loads == [1]
+        assert len({id(h.model) for h in handles}) == 1
+        assert registry.stats()[0]["refs"] == 8
+
+    def test_warmup_runs_once_per_model(self, registry):
+        key = model_key("kind", "m")
+        a = registry.acquire(key, object)
+        b = registry.acquire(key, object)
+        calls = []
+
+        assert a.warmup(lambda: calls.append(1)) is True
+        assert b.warmup(lambda: calls.append(1)) is False
+        assert calls == [1]
+        assert registry.stats()[0]["warm"] is True
+
+
+class TestSharedProviders:
+    """Providers load through the registry and warm up on request."""
+
+    def test_embedders_share_one_model(self, fake_st, registry):
+        a = SentenceTransformerEmbedding("m", registry=registry)
+        b = SentenceTransformerEmbedding("m", registry=registry)
+        c = SentenceTransformerEmbedding("m", device="cpu", registry=registry)
+
+        assert a.model is b.model
+        assert a.model is not c.model
+        assert FakeSentenceTransformer.loads == 2
+        assert a.embed(["abc"]) == [[3.0, 1.0]]
+
+    def test_unloads_with_last_instance(self, fake_st, registry):
+        a = SentenceTransformerEmbedding("m", registry=registry)
+        b = SentenceTransformerEmbedding("m", registry=registry)
+
+        a.close()
+        assert len(registry) == 1
+        del b
+        gc.collect()
+        assert len(registry) == 0
+
+    def test_private_copy(self, fake_st, registry):
+        a = SentenceTransformerEmbedding("m", registry=registry, shared=False)
+        b = SentenceTransformerEmbedding("m", registry=registry, shared=False)
+
+        assert a.model is not b.model
+        assert len(registry) == 0
+
+    def test_embedder_warmup(self, fake_st, registry):
+        a = SentenceTransformerEmbedding("m", registry=registry, warmup=True)
+        b = SentenceTransformerEmbedding("m", registry=registry)
+
+        assert a.model.encoded == [["warm-up"]]
+        assert b.warmup() is False
+        assert len(a.model.encoded) == 1
+
+    def test_reranker_shares_and_warms_up(self, fake_st, registry):
+        a = CrossEncoderReranker(registry=registry)
+        b = CrossEncoderReranker(registry=registry)
+
+        assert a.model is b.model
+        assert a.warmup() is True
+        assert a.model.predicted == [[("warm-up", "warm-up")]]
+        assert CrossEncoderReranker(max_length=256, registry=registry).model is not a.model
+
+    def test_agent_warmup(self, fake_st, registry):
+        embedder = CachedEmbedding(SentenceTransformerEmbedding("m", registry=registry))
+        reranker = CrossEncoderReranker(registry=registry)
+        store = types.SimpleNamespace(embedder=embedder)
+        agent = RagAgent(store=store, llm=object(), reranker=reranker)
+
+        assert agent.warmup() == {"embedder": True, "reranker": True}
+        assert agent.warmup() == {"embedder": False, "reranker": False}
+        assert embedder.stats()["provider_calls"] == 0  # the cache is bypassed
+
+    def test_agent_warmup_skips_remote_providers(self):
+        store = types.SimpleNamespace(embedder=object())
+        agent = RagAgent(store=store, llm=object())
+
+        assert agent.warmup() == {}
@@ -0,0 +1,72 @@
+"""Tests for the cross-encoder reranker."""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.exceptions import RetrievalError
+from rag_agent.providers.rerank import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Stand-in for ``sentence_transformers.CrossEncoder`` that records predict calls."""
+
+    instances = []
+
+    def __init__(self, model_name, max_length=None, device=None):
+        self.model_name = model_name
+        self.device = device
+        self.calls = []
+        FakeCrossEncoder.instances.append(self)
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append((list(pairs), batch_size))
+        if any(p == "falha" for _, p in pairs):
+            raise RuntimeError("erro no modelo")
+        return [float(len(p)) for _, p in pairs]
+
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    """Install a fake ``sentence_transformers`` module."""
+    FakeCrossEncoder.instances = []
+    module = types.SimpleNamespace(CrossEncoder=FakeCrossEncoder)
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    return FakeCrossEncoder
+
+
+class TestCrossEncoderReranker:
+    """Tests for CrossEncoderReranker."""
+
+    def test_scores_all_pairs_in_one_call(self, fake_st):
+        reranker = CrossEncoderReranker(batch_size=8)
+
+        scores = reranker.score("pergunta", ["a", "abc", "ab"])
+
+        model = fake_st.instances[0]
+        assert scores == [1.0, 3.0, 2.0]
+        assert len(model.calls) == 1
+        assert model.calls[0] == ([("pergunta", "a"), ("pergunta", "abc"), ("pergunta", "ab")], 8)
+        assert model.device == "cpu"
+
+    def test_empty_passages_skip_model(self, fake_st):
+        reranker = CrossEncoderReranker()
+
+        assert reranker.score("pergunta", []) == []
+        assert fake_st.instances[0].calls == []
+
+    def test_model_errors_wrapped(self, fake_st):
+        reranker = CrossEncoderReranker()
+
+        with pytest.raises(RetrievalError):
+            reranker.score("pergunta", ["falha"])
+
+    def test_missing_dependency(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+
+        with pytest.raises(RetrievalError):
+            CrossEncoderReranker()
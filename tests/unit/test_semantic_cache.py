@@ -0,0 +1,179 @@
+"""Tests for the semantic answer cache."""
+
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.core.agent import RagAgent
+from rag_agent.core.semantic_cache import SemanticAnswerCache
+
+
+class KeywordEmbedding:
+    """Embeds questions by keyword presence so paraphrases land close together."""
+
+    KEYWORDS = ["config", "install", "price"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        out = []
+        for text in texts:
+            lower = text.lower()
+            out.append([1.0 if k in lower else 0.0 for k in self.KEYWORDS] + [0.1])
+        return out
+
+
+class TestSemanticAnswerCache:
+    """Tests for SemanticAnswerCache lookups and invalidation."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = SemanticAnswerCache(KeywordEmbedding(), threshold=0.95, max_entries=3)
+
+    def test_similar_question_hits(self):
+        vec = self.cache.embed_question("How do I configure it?")
+        self.cache.add(vec, "Use settings.", [{"chunk_id": 1}], version=0)
+
+        found = self.cache.lookup(self.cache.embed_question("Configuration steps?"), version=0)
+
+        assert found is not None
+        entry, sim = found
+        assert entry["answer"] == "Use settings."
+        assert sim >= 0.95
+
+    def test_dissimilar_question_misses(self):
+        self.cache.add(self.cache.embed_question("configure"), "A", [], version=0)
+
+        assert self.cache.lookup(self.cache.embed_question("price?"), version=0) is None
+        assert self.cache.stats()["misses"] == 1
+
+    def test_version_change_invalidates(self):
+        vec = self.cache.embed_question("configure")
+        self.cache.add(vec, "A", [], version=1)
+
+        assert self.cache.lookup(vec, version=2) is None
+        assert len(self.cache) == 0
+        assert self.cache.stats()["invalidations"] == 1
+
+    def test_stale_version_never_rolls_back(self):
+        vec = self.cache.embed_question("configure")
+        self.cache.add(vec, "new", [], version=2)
+
+        self.cache.add(vec, "old", [], version=1)  # computed before the last write
+        found = self.cache.lookup(vec, version=2)
+
+        assert found[0]["answer"] == "new"
+        assert self.cache.lookup(vec, version=1) is None
+        assert len(self.cache) == 1
+        assert self.cache.stats()["invalidations"] == 0
+
+    def test_entries_are_copies(self):
+        vec = self.cache.embed_question("configure")
+        chunks = [{"chunk_id": 1}]
+        self.cache.add(vec, "A", chunks, version=0)
+        chunks[0]["chunk_id"] = 99
+
+        entry, _ = self.cache.lookup(vec, version=0)
+        entry["used_chunks"][0]["source"] = "x"
+        entry["used_chunks"].clear()
+
+        assert self.cache.lookup(vec, version=0)[0]["used_chunks"] == [{"chunk_id": 1}]
+
+    def test_capacity_replaces_least_recently_used(self):
+        e = self.cache.embed_question
+        self.cache.add(e("config"), "config", [], version=0)
+        self.cache.add(e("install"), "install", [], version=0)
+        self.cache.add(e("price"), "price", [], version=0)
+        self.cache.lookup(e("config"), version=0)
+        self.cache.add(e("config install"), "both", [], version=0)
+
+        assert len(self.cache) == 3
+        assert self.cache.lookup(e("install"), version=0) is None
+        assert self.cache.lookup(e("config"), version=0)[0]["answer"] == "config"
+
+    def test_growth_beyond_initial_block(self):
+        cache = SemanticAnswerCache(KeywordEmbedding(), max_entries=200)
+
+        def one_hot(i):
+            return [1.0 if j == i else 0.0 for j in range(150)]
+
+        for i in range(150):
+            cache.add(one_hot(i), str(i), [], version=0)
+
+        assert len(cache) == 150
+        assert cache.lookup(one_hot(149), version=0)[0]["answer"] == "149"
+        assert cache.lookup(one_hot(3), version=0)[0]["answer"] == "3"
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            SemanticAnswerCache(KeywordEmbedding(), max_entries=0)
+
+
+class TestAgentAnswerCache:
+    """Tests for RagAgent integration with the answer cache."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.store = Mock(spec=["query", "query_many", "version"])
+        self.store.version = 0
+        self.store.query.return_value = (
+            ["Content"],
+            [{"chunk_id": 7, "source": "doc.txt"}],
+            [0.1],
+        )
+        self.llm = Mock(spec=["answer"])
+        self.llm.answer.return_value = "Use settings."
+        self.cache = SemanticAnswerCache(KeywordEmbedding())
+        self.agent = RagAgent(store=self.store, llm=self.llm, answer_cache=self.cache)
+
+    def test_paraphrase_served_from_cache(self):
+        first = self.agent.ask("How do I configure it?")
+        second = self.agent.ask("Configuration steps?", request_id="r-2")
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["answer"] == "Use settings."
+        assert second["request_id"] == "r-2"
+        assert second["used_chunks"] == first["used_chunks"]
+        assert self.store.query.call_count == 1
+        assert self.llm.answer.call_count == 1
+
+    def test_ingestion_invalidates(self):
+        self.agent.ask("How do I configure it?")
+        self.store.version = 1
+        result = self.agent.ask("How do I configure it?")
+
+        assert result["cached"] is False
+        assert self.llm.answer.call_count == 2
+
+    def test_not_found_is_not_cached(self):
+        self.llm.answer.return_value = "Não encontrado nos documentos."
+        for _ in range(2):
+            with pytest.raises(Exception):
+                self.agent.ask("How do I configure it?")
+
+        assert len(self.cache) == 0
+
+    def test_ask_many_uses_cache(self):
+        self.agent.ask("How do I configure it?")
+        self.store.query_many.return_value = [self.store.query.return_value]
+
+        results = self.agent.ask_many(["configure?", "install?"])
+
+        assert results[0]["cached"] is True
+        assert results[1]["cached"] is False
+        self.store.query_many.assert_called_once_with(["install?"], k=5)
+
+    def test_stream_cache_hit(self):
+        self.agent.ask("How do I configure it?")
+
+        events = list(self.agent.ask_stream("configure"))
+
+        assert events[0] == {"type": "token", "text": "Use settings."}
+        assert events[-1]["cached"] is True
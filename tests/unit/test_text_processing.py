@@ -8,7 +8,7 @@ import pytest
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 
 from rag_agent.core.exceptions import IngestionError
-from rag_agent.utils.text_processing import chunk_text
+from rag_agent.utils.text_processing import chunk_text, iter_chunks
 
 
 class TestChunkText:
@@ -80,3 +80,37 @@ class TestChunkText:
             full_text += chunk[5:]  # Skip overlap
 
         assert full_text == text
+
+
+class TestIterChunks:
+    """Tests for the streaming chunker."""
+
+    @pytest.mark.parametrize("max_chars,overlap", [(10, 3), (20, 0), (7, 6), (50, 10)])
+    @pytest.mark.parametrize("piece_size", [1, 3, 10, 64, 1000])
+    def test_matches_chunk_text(self, max_chars, overlap, piece_size):
+        """Chunks are identical to chunk_text over the joined pieces."""
+        text = "".join(f"palavra{i} " for i in range(120))
+        pieces = [text[i : i + piece_size] for i in range(0, len(text), piece_size)]
+
+        assert list(iter_chunks(pieces, max_chars, overlap)) == chunk_text(text, max_chars, overlap)
+
+    @pytest.mark.parametrize("length", [0, 1, 9, 10, 11, 17, 24])
+    def test_boundary_lengths(self, length):
+        """Texts around the chunk boundaries chunk the same way."""
+        text = "x" * length
+        assert list(iter_chunks([text[:5], text[5:]], 10, 3)) == chunk_text(text, 10, 3)
+
+    def test_is_lazy(self):
+        """Chunks are produced before the input is exhausted."""
+
+        def pieces():
+            yield "a" * 100
+            raise AssertionError("input consumed too early")
+
+        gen = iter_chunks(pieces(), max_chars=10, overlap=2)
+        assert next(gen) == "a" * 10
+
+    def test_invalid_parameters(self):
+        """Invalid parameters raise IngestionError."""
+        with pytest.raises(IngestionError):
+            list(iter_chunks(["abc"], max_chars=10, overlap=10))
@@ -0,0 +1,70 @@
+"""Tests for token counting helpers."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent.utils import tokenization
+from rag_agent.utils.tokenization import CachedTokenizer, HeuristicTokenizer, get_tokenizer
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that counts how often it is called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return len(text.split())
+
+
+class TestHeuristicTokenizer:
+    """Tests for the character-based estimate."""
+
+    def test_conservative_estimate(self):
+        """The default estimate assumes two characters per token."""
+        assert HeuristicTokenizer().count("a" * 100) == 51
+        assert HeuristicTokenizer(chars_per_token=4).count("a" * 100) == 26
+
+    def test_invalid_ratio(self):
+        """A non-positive ratio is rejected."""
+        with pytest.raises(ValueError):
+            HeuristicTokenizer(chars_per_token=0)
+
+
+class TestCachedTokenizer:
+    """Tests for memoized token counts."""
+
+    def test_repeated_texts_hit_the_cache(self):
+        """Each distinct text is only tokenized once."""
+        base = CountingTokenizer()
+        tok = CachedTokenizer(base)
+
+        assert tok.count("um dois três") == 3
+        assert tok.count("um dois três") == 3
+        assert tok.count("quatro") == 1
+        assert base.calls == 2
+
+    def test_get_tokenizer_is_shared(self):
+        """The default tokenizer is created once per model."""
+        assert get_tokenizer() is get_tokenizer()
+        assert get_tokenizer().count("olá mundo") > 0
+
+    def test_get_tokenizer_falls_back_on_load_failure(self, monkeypatch):
+        """An encoding that cannot be loaded (e.g. offline) degrades to the estimate."""
+
+        def offline(model=None):
+            raise ConnectionError("sem rede")
+
+        monkeypatch.setattr(tokenization, "TiktokenTokenizer", offline)
+        try:
+            tok = get_tokenizer("modelo-offline")
+        finally:
+            get_tokenizer.cache_clear()
+
+        assert isinstance(tok.tokenizer, HeuristicTokenizer)
+        assert tok.count("olá mundo") > 0
@@ -0,0 +1,235 @@
+"""Tests for tracing spans and exporters."""
+
+import asyncio
+import contextvars
+import io
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from rag_agent import NumpyStore
+from rag_agent.core.agent import RagAgent
+from rag_agent.core.exceptions import AnswerNotFoundError
+from rag_agent.utils.metrics import MetricsRegistry
+from rag_agent.utils.tracing import (
+    JsonLinesTracer,
+    Tracer,
+    current_span,
+    folded_stacks,
+    get_tracer,
+    isolate_context,
+    set_tracer,
+    span,
+)
+
+
+class RecordingTracer(Tracer):
+    """Tracer keeping finished spans in memory."""
+
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def by_name(self, name):
+        return [s for s in self.spans if s["name"] == name]
+
+
+@pytest.fixture
+def tracer():
+    """Install a recording tracer for the duration of a test."""
+    recording = RecordingTracer()
+    previous = set_tracer(recording)
+    yield recording
+    set_tracer(previous)
+
+
+class TestSpans:
+    """Tests for span nesting and export."""
+
+    def test_disabled_by_default(self):
+        assert get_tracer().enabled is False
+        with span("anything", k=5) as sp:
+            sp.set(x=1)
+            assert sp.recording is False
+            assert current_span() is sp
+
+    def test_nesting_and_request_id(self, tracer):
+        with span("root", request_id="r1") as root:
+            with span("child", k=3) as child:
+                assert current_span() is child
+            root.set(done=True)
+
+        child, root = tracer.spans
+        assert child["parent_id"] == root["span_id"]
+        assert child["trace_id"] == root["trace_id"]
+        assert child["request_id"] == "r1"
+        assert child["attributes"] == {"k": 3}
+        assert root["parent_id"] is None
+        assert root["attributes"] == {"done": True}
+
+    def test_error_recorded(self, tracer):
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+
+        assert tracer.spans[0]["error"] == "ValueError"
+
+    def test_exit_in_other_context_restores_parent(self, tracer):
+        with span("outer") as outer:
+            inner = span("inner")
+            contextvars.copy_context().run(inner.__enter__)
+            inner.__exit__(None, None, None)
+
+            assert current_span() is outer
+
+    def test_isolated_generator_keeps_spans_private(self, tracer):
+        def produce():
+            with span("producer"):
+                yield current_span()
+                yield current_span()
+
+        with span("consumer") as outer:
+            items = []
+            for item in isolate_context(produce()):
+                items.append(item)
+                assert current_span() is outer
+
+        assert items[0] is items[1]
+        assert tracer.by_name("producer")[0]["parent_id"] == outer.span_id
+
+    def test_json_lines_exporter(self):
+        stream = io.StringIO()
+        previous = set_tracer(JsonLinesTracer(stream))
+        try:
+            with span("a", request_id="r1"):
+                with span("b"):
+                    pass
+        finally:
+            set_tracer(previous).close()
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [r["name"] for r in records] == ["b", "a"]
+        assert records[0]["duration_ms"] <= records[1]["duration_ms"]
+        assert records[0]["request_id"] == "r1"
+
+    def test_folded_stacks(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        previous = set_tracer(JsonLinesTracer(str(path)))
+        try:
+            for _ in range(2):
+                with span("a"):
+                    with span("b"):
+                        pass
+        finally:
+            set_tracer(previous).close()
+
+        stacks = folded_stacks(str(path))
+
+        assert set(stacks) == {"a", "a;b"}
+        assert all(v >= 0 for v in stacks.values())
+
+
+class TestAgentTracing:
+    """Tests for spans emitted by RagAgent."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.store = Mock(spec=["query", "query_many"])
+        self.store.query.return_value = (["Content"], [{"chunk_id": 0, "source": "a"}], [0.1])
+        self.llm = Mock(spec=["answer"])
+        self.llm.answer.return_value = "Answer"
+        self.agent = RagAgent(store=self.store, llm=self.llm, metrics=MetricsRegistry())
+
+    def test_ask_span_tree(self, tracer):
+        self.agent.ask("Question", request_id="r1")
+
+        root = tracer.by_name("rag.ask")[0]
+        children = {s["name"]: s for s in tracer.spans if s["parent_id"] == root["span_id"]}
+        assert {"rag.retrieve", "rag.select", "rag.prompt", "rag.generate"} <= set(children)
+        assert all(s["request_id"] == "r1" for s in tracer.spans)
+        assert children["rag.select"]["attributes"] == {"candidates": 1, "kept": 1}
+        assert children["rag.prompt"]["attributes"]["prompt_bytes"] > 0
+        assert children["rag.generate"]["attributes"]["provider"] == "Mock"
+
+    def test_not_found_marks_root(self, tracer):
+        self.llm.answer.return_value = "Não encontrado nos documentos."
+        with pytest.raises(AnswerNotFoundError):
+            self.agent.ask("Question")
+
+        assert tracer.by_name("rag.ask")[0]["error"] == "AnswerNotFoundError"
+
+    def test_aask_executor_spans_stay_nested(self, tracer):
+        asyncio.run(self.agent.aask("Question", request_id="r2"))
+
+        root = tracer.by_name("rag.ask")[0]
+        generate = tracer.by_name("rag.generate")[0]
+        assert generate["parent_id"] == root["span_id"]
+        assert generate["request_id"] == "r2"
+
+    def test_aask_store_spans_under_retrieve(self, tracer, tmp_path):
+        embedder = Mock(spec=["embed"])
+        embedder.embed.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+        store = NumpyStore("traced", embedder, persist_dir=str(tmp_path))
+        store.upsert(["Content"], [{"chunk_id": 0, "source": "a"}])
+        agent = RagAgent(store=store, llm=self.llm, metrics=MetricsRegistry())
+
+        asyncio.run(agent.aask("Question", request_id="r4"))
+
+        retrieve = tracer.by_name("rag.retrieve")[0]
+        for name in ("store.embed", "store.search"):
+            child = tracer.by_name(name)[-1]
+            assert child["parent_id"] == retrieve["span_id"]
+            assert child["trace_id"] == retrieve["trace_id"]
+            assert child["request_id"] == "r4"
+
+    def test_ask_many_generation_under_batch(self, tracer):
+        hit = (["Content"], [{"chunk_id": 0, "source": "a"}], [0.1])
+        self.store.query_many.return_value = [hit, hit]
+
+        self.agent.ask_many(["Q1", "Q2"], request_ids=["a", "b"])
+
+        batch = tracer.by_name("rag.ask_many")[0]
+        generate = tracer.by_name("rag.generate")
+        assert sorted(s["request_id"] for s in generate) == ["a", "b"]
+        assert all(s["parent_id"] == batch["span_id"] for s in generate)
+
+    def test_stream_spans_do_not_leak_to_consumer(self, tracer):
+        self.llm = Mock(spec=["answer", "stream"])
+        self.llm.stream.return_value = iter(["Resposta ", "longa ", "[chunk_id=0]"])
+        agent = RagAgent(store=self.store, llm=self.llm, metrics=MetricsRegistry())
+
+        with span("consumer") as outer:
+            for event in agent.ask_stream("Question", request_id="r3"):
+                assert current_span() is outer
+                with span("consumer.handle", type=event["type"]):
+                    pass
+            assert current_span() is outer
+
+        root = tracer.by_name("rag.ask_stream")[0]
+        assert root["parent_id"] == outer.span_id
+        assert tracer.by_name("rag.generate")[0]["parent_id"] == root["span_id"]
+        handled = tracer.by_name("consumer.handle")
+        assert len(handled) >= 2
+        assert all(s["parent_id"] == outer.span_id for s in handled)
+
+    def test_stream_closed_early_restores_consumer_span(self, tracer):
+        self.llm = Mock(spec=["answer", "stream"])
+        self.llm.stream.return_value = iter(["Resposta ", "longa ", "[chunk_id=0]"])
+        agent = RagAgent(store=self.store, llm=self.llm, metrics=MetricsRegistry())
+
+        with span("consumer") as outer:
+            events = agent.ask_stream("Question")
+            next(events)
+            events.close()
+            assert current_span() is outer
+
+        assert tracer.by_name("rag.ask_stream")[0]["parent_id"] == outer.span_id